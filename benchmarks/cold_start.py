@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+OAuth Server Cold Start Benchmark
+
+Starts oauth_server.py as a fresh process several times and measures how
+long each takes to answer its liveness and readiness checks, the window an
+autoscaled instance spends before it can take traffic. Results are written
+as JSON (see benchmarks/results.py).
+
+Usage:
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --runs 20 --production --workers 2
+    python benchmarks/cold_start.py --live-path /health --ready-path /health   # older servers
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from typing import Dict, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_threads_api import ROOT, free_port  # noqa: E402
+from benchmarks.results import latency_summary, write_results  # noqa: E402
+
+
+def wait_for(client: httpx.Client, url: str, process: subprocess.Popen, start: float,
+             timeout: float = 60) -> Optional[float]:
+    """Seconds from `start` until `url` answers 200, or None if the server exited or timed out"""
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            if client.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def run_once(args) -> Dict:
+    port = free_port()
+    command = [sys.executable, 'oauth_server.py', '--port', str(port)]
+    if args.production:
+        command += ['--production', '--workers', str(args.workers)]
+    env = {
+        **os.environ,
+        'THREADS_CLIENT_ID': 'benchmark',
+        'THREADS_CLIENT_SECRET': 'benchmark',
+        'FIREBASE_PRIVATE_KEY_PATH': args.firebase_key or os.devnull + '.missing'
+    }
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            live = wait_for(client, args.live_path, process, start)
+            ready = wait_for(client, args.ready_path, process, start)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    if live is None or ready is None:
+        raise RuntimeError(f"{' '.join(command)} did not become ready")
+    return {'live_s': live, 'ready_s': ready}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure oauth_server.py time to liveness and readiness")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--production', action='store_true', help="start in production mode")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes with --production")
+    parser.add_argument('--live-path', default='/health/live')
+    parser.add_argument('--ready-path', default='/health/ready')
+    parser.add_argument('--firebase-key', help="service account key, to include Firebase initialisation")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    params = {k: v for k, v in vars(args).items() if k not in ('output', 'firebase_key')}
+    params['firebase'] = bool(args.firebase_key)
+
+    runs = []
+    for i in range(args.runs):
+        runs.append(run_once(args))
+        print(f"run {i + 1:>3}: live {runs[-1]['live_s']:.3f}s ready {runs[-1]['ready_s']:.3f}s")
+
+    results = []
+    for phase in ('live', 'ready'):
+        summary = latency_summary([run[f"{phase}_s"] for run in runs])
+        results.append({'scenario': 'production' if args.production else 'development', 'phase': phase, **summary})
+        print(f"{phase:<6} p50 {summary['p50_ms']:.0f}ms p95 {summary['p95_ms']:.0f}ms max {summary['max_ms']:.0f}ms")
+
+    print(f"\nResults written to {write_results('cold_start', params, results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
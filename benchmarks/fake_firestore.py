@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Fake Firestore Client
+
+An in-memory stand-in for the parts of the Firestore client the updater
+and the OAuth server write through: collection().document().set()/get(),
+get_all() with field masks, and batch() with set() and commit(). Like the
+real service, a batch with more than 500 writes is rejected. Every
+document write or batch commit sleeps for `latency_ms` to model the
+network round trip.
+
+Usage:
+    from benchmarks.fake_firestore import FakeFirestore
+    updater = ThreadsDataUpdater(db=FakeFirestore())
+    oauth_server.firebase.use(FakeFirestore(latency_ms=80))
+"""
+
+import time
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id: str, data: Optional[Dict]):
+        self.id = doc_id
+        self.exists = data is not None
+        self.data = data
+
+    def to_dict(self) -> Optional[Dict]:
+        return dict(self.data) if self.data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, db: 'FakeFirestore', collection: str, doc_id: str):
+        self.db = db
+        self.collection = collection
+        self.id = doc_id
+
+    def set(self, data: Dict, merge: bool = False):
+        self.db.round_trip()
+        self.db.apply([(self, data, merge)])
+
+    def get(self) -> FakeSnapshot:
+        self.db.round_trip()
+        with self.db.lock:
+            return FakeSnapshot(self.id, self.db.documents.get(self.collection, {}).get(self.id))
+
+
+class FakeCollection:
+    def __init__(self, db: 'FakeFirestore', name: str):
+        self.db = db
+        self.name = name
+
+    def document(self, doc_id: str) -> FakeDocument:
+        return FakeDocument(self.db, self.name, doc_id)
+
+
+class FakeBatch:
+    def __init__(self, db: 'FakeFirestore'):
+        self.db = db
+        self.writes: List[Tuple[FakeDocument, Dict, bool]] = []
+
+    def set(self, ref: FakeDocument, data: Dict, merge: bool = False):
+        self.writes.append((ref, data, merge))
+
+    def commit(self):
+        if len(self.writes) > MAX_BATCH_WRITES:
+            raise ValueError(f"maximum {MAX_BATCH_WRITES} writes allowed per request")
+        self.db.round_trip()
+        self.db.apply(self.writes)
+
+
+class FakeFirestore:
+    """Documents by collection and id, with write counters and injected latency or failures"""
+
+    def __init__(self, latency_ms: float = 0.0, fail_commits: int = 0):
+        self.latency_ms = latency_ms
+        # The next `fail_commits` round trips raise, to exercise retries
+        self.fail_commits = fail_commits
+        self.documents: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+        self.round_trips = 0
+        # Number of writes in each committed batch, in commit order
+        self.commits: List[int] = []
+        self.writes = 0
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def get_all(self, refs: List[FakeDocument], field_paths: Optional[List[str]] = None) -> Iterator[FakeSnapshot]:
+        snapshots = []
+        with self.lock:
+            for ref in refs:
+                data = self.documents.get(ref.collection, {}).get(ref.id)
+                if data is not None and field_paths is not None:
+                    data = {field: data[field] for field in field_paths if field in data}
+                snapshots.append(FakeSnapshot(ref.id, data))
+        return iter(snapshots)
+
+    def round_trip(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self.lock:
+            self.round_trips += 1
+            if self.fail_commits > 0:
+                self.fail_commits -= 1
+                raise ConnectionError("fake Firestore unavailable")
+
+    def apply(self, writes: List[Tuple[FakeDocument, Dict, bool]]):
+        with self.lock:
+            for ref, data, merge in writes:
+                collection = self.documents.setdefault(ref.collection, {})
+                collection[ref.id] = {**collection.get(ref.id, {}), **data} if merge else dict(data)
+                self.writes += 1
+            self.commits.append(len(writes))
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Fake Threads Graph API
+
+A local stand-in for graph.threads.net for offline testing and benchmarks.
+Serves deterministic synthetic profile_posts with cursor paging, /me and
+/oauth/access_token, and can inject latency, errors and quota throttling.
+Usage is reported in an X-App-Usage header like the real API.
+
+Usage:
+    python benchmarks/fake_threads_api.py --port 9000 --latency-ms 50 --quota 600
+    THREADS_API_BASE_URL=http://localhost:9000/v1.0 python update_data.py
+"""
+
+import os
+import time
+import zlib
+import socket
+import random
+import asyncio
+import argparse
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DESIGN_SNIPPETS = [
+    'New design system components are live', 'UI polish for the composer',
+    'Typography updates across the app', 'Figma community file for our icons',
+    'Prototype of the new onboarding flow', 'Brand refresh: colors and layout'
+]
+
+OTHER_SNIPPETS = [
+    'Thanks for joining the live event', 'Reels are getting longer',
+    'Community update for this week', 'Tips for creators to grow their audience',
+    'Shipping improvements to search', 'Say hello to our newest feature'
+]
+
+
+@dataclass
+class FakeApiConfig:
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    page_size: int = 25
+    posts_per_account: int = 100
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    quota: int = 0
+    window_s: float = 60.0
+    seed: int = 42
+
+
+class FakeThreadsApi:
+    """State for one fake API instance: config, quota window and counters"""
+
+    def __init__(self, config: FakeApiConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.calls = deque()
+        self.stats = {'requests': 0, 'throttled': 0, 'errors': 0}
+        self.epoch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    def usage_pct(self) -> float:
+        if not self.config.quota:
+            return 0.0
+        now = time.monotonic()
+        while self.calls and self.calls[0] < now - self.config.window_s:
+            self.calls.popleft()
+        return 100.0 * len(self.calls) / self.config.quota
+
+    def posts_for(self, username: str) -> List[Dict]:
+        """Deterministic newest-first posts for an account"""
+        rng = random.Random(f"{self.config.seed}:{username}")
+        posts = []
+        for i in range(self.config.posts_per_account):
+            timestamp = self.epoch - timedelta(hours=i * 3 + rng.randint(0, 2))
+            is_image = rng.random() < 0.3
+            text = rng.choice(DESIGN_SNIPPETS if rng.random() < 0.5 else OTHER_SNIPPETS)
+            posts.append({
+                'id': f"{username}_{self.config.posts_per_account - i}",
+                'media_product_type': 'THREADS',
+                'media_type': 'IMAGE' if is_image else 'TEXT_POST',
+                'media_url': f"https://example.invalid/{username}/{i}.jpg" if is_image else None,
+                'permalink': f"https://www.threads.net/@{username}/post/{i}",
+                'username': username,
+                'text': f"{text} #{i}",
+                'topic_tag': 'Design' if rng.random() < 0.2 else None,
+                'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%S+0000'),
+                'shortcode': f"{username}{i}",
+                'is_quote_post': False
+            })
+        return posts
+
+    async def gate(self) -> Optional[JSONResponse]:
+        """Apply latency, quota, throttling and error injection to one request"""
+        self.stats['requests'] += 1
+        delay = self.config.latency_ms + self.rng.uniform(0, self.config.latency_jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        usage = self.usage_pct()
+        if (self.config.quota and usage >= 100) or self.rng.random() < self.config.throttle_rate:
+            self.stats['throttled'] += 1
+            return JSONResponse(
+                {'error': {'message': 'Application request limit reached', 'type': 'OAuthException', 'code': 4}},
+                status_code=429,
+                headers=self.usage_headers()
+            )
+
+        self.calls.append(time.monotonic())
+        if self.rng.random() < self.config.error_rate:
+            self.stats['errors'] += 1
+            return JSONResponse({'error': {'message': 'Service unavailable', 'code': 2}}, status_code=503)
+
+        return None
+
+    def usage_headers(self) -> Dict[str, str]:
+        usage = round(self.usage_pct())
+        return {'X-App-Usage': f'{{"call_count":{usage},"total_cputime":{usage // 2},"total_time":{usage // 2}}}'}
+
+
+def create_app(config: Optional[FakeApiConfig] = None) -> FastAPI:
+    api = FakeThreadsApi(config or FakeApiConfig())
+    app = FastAPI(title="Fake Threads API")
+    app.state.api = api
+
+    @app.get("/v1.0/profile_posts")
+    async def profile_posts(username: str, limit: int = 25, after: Optional[str] = None):
+        rejected = await api.gate()
+        if rejected:
+            return rejected
+
+        posts = api.posts_for(username)
+        start = int(after) if after and after.isdigit() else 0
+        page_size = min(limit, api.config.page_size)
+        page = posts[start:start + page_size]
+
+        body = {'data': page}
+        if start + page_size < len(posts):
+            body['paging'] = {'cursors': {'before': str(start), 'after': str(start + page_size)}}
+        return JSONResponse(body, headers=api.usage_headers())
+
+    @app.get("/v1.0/me")
+    async def me(request: Request):
+        rejected = await api.gate()
+        if rejected:
+            return rejected
+
+        token = request.query_params.get('access_token', '')
+        if not token or token == 'invalid':
+            return JSONResponse({'error': {'message': 'Invalid OAuth access token', 'code': 190}}, status_code=400)
+        return JSONResponse({
+            'id': str(zlib.crc32(token.encode('utf-8'))),
+            'username': f"user_{token[:8]}",
+            'name': 'Fake User',
+            'threads_profile_picture_url': None,
+            'threads_biography': ''
+        }, headers=api.usage_headers())
+
+    @app.post("/oauth/access_token")
+    async def access_token(request: Request):
+        rejected = await api.gate()
+        if rejected:
+            return rejected
+
+        # Parsed by hand: request.form() needs python-multipart, which is not a dependency
+        code = parse_qs((await request.body()).decode('utf-8')).get('code', [''])[0]
+        return JSONResponse({'access_token': f"token-{code}", 'user_id': str(zlib.crc32(code.encode('utf-8')))})
+
+    @app.get("/_stats")
+    async def stats():
+        return {**api.stats, 'usage_pct': api.usage_pct()}
+
+    return app
+
+
+def free_port(host: str = '127.0.0.1') -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class ServerProcess:
+    """Runs a server command as a subprocess, ready once `health_path` answers.
+
+    Keeps the server off the benchmark's own interpreter and GIL.
+    """
+
+    def __init__(self, args: List[str], port: int, health_path: str, env: Optional[Dict] = None):
+        self.url = f"http://127.0.0.1:{port}"
+        self.args = args
+        self.health_path = health_path
+        self.env = {**os.environ, **(env or {})}
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> 'ServerProcess':
+        self.process = subprocess.Popen(
+            self.args, cwd=ROOT, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{' '.join(self.args)} exited with {self.process.returncode}")
+            try:
+                if httpx.get(self.url + self.health_path, timeout=1).status_code < 500:
+                    return self
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError(f"{' '.join(self.args)} did not become ready")
+
+    def __exit__(self, *exc):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class BackgroundServer:
+    """Runs an ASGI app with uvicorn on a free local port in a daemon thread"""
+
+    def __init__(self, app, host: str = '127.0.0.1', port: int = 0):
+        import uvicorn
+
+        port = port or free_port(host)
+
+        self.url = f"http://{host}:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> 'BackgroundServer':
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run a fake Threads Graph API server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0)
+    parser.add_argument('--page-size', type=int, default=25)
+    parser.add_argument('--posts-per-account', type=int, default=100)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--quota', type=int, default=0, help="calls allowed per window (0 = unlimited)")
+    parser.add_argument('--window-s', type=float, default=60.0)
+    return parser.parse_args()
+
+
+def main():
+    import uvicorn
+
+    args = parse_args()
+    config = FakeApiConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        page_size=args.page_size,
+        posts_per_account=args.posts_per_account,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        quota=args.quota,
+        window_s=args.window_s
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == '__main__':
+    main()
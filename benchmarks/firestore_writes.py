@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Firestore Write Check
+
+Saves synthetic threads through ThreadsDataUpdater and the Firestore
+thread store into the in-memory FakeFirestore and checks the chunked
+writer: a first save goes out in batches of at most 500 writes, saving
+the same threads again with new likes/replies writes nothing, and editing
+a few threads writes only those. Exits non-zero when a check fails.
+
+Usage:
+    python benchmarks/firestore_writes.py
+    python benchmarks/firestore_writes.py --threads 5000
+"""
+
+import os
+import sys
+import math
+import argparse
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_firestore import FakeFirestore, MAX_BATCH_WRITES  # noqa: E402
+from update_data import ThreadsDataUpdater  # noqa: E402
+
+
+def make_posts(count: int) -> List[Dict]:
+    """Synthetic API posts spread over a handful of accounts"""
+    start = datetime(2025, 1, 1)
+    return [{
+        'id': f"post-{i}",
+        'username': ('meta', 'threads', 'instagram', 'facebook')[i % 4],
+        'text': f"Design update number {i}",
+        'media_type': 'IMAGE' if i % 3 == 0 else 'TEXT_POST',
+        'media_url': f"https://cdn.example.com/{i}.jpg",
+        'timestamp': (start + timedelta(minutes=i)).isoformat(),
+        'permalink': f"https://www.threads.net/post/{i}",
+        'topic_tag': None
+    } for i in range(count)]
+
+
+def save(updater: ThreadsDataUpdater, db: FakeFirestore, threads: List[Dict]) -> Dict:
+    """Save threads and report what reached the fake client"""
+    commits_before = len(db.commits)
+    start = time.perf_counter()
+    result = updater.save_threads(threads)
+    return {**result, 'commits': db.commits[commits_before:], 'seconds': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check chunked, diff-aware Firestore writes")
+    parser.add_argument('--threads', type=int, default=1203)
+    parser.add_argument('--edits', type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ.setdefault('THREADS_ACCESS_TOKEN', 'fake-token')
+    os.environ['THREADS_STORE'] = 'firestore'
+    db = FakeFirestore()
+    updater = ThreadsDataUpdater(db=db)
+    posts = make_posts(args.threads)
+    failures = []
+
+    def check(condition: bool, message: str):
+        if not condition:
+            failures.append(message)
+
+    first = save(updater, db, [updater.transform_post_to_thread(post) for post in posts])
+    check(first['written'] == args.threads, f"first save wrote {first['written']} of {args.threads} threads")
+    check(len(first['commits']) == math.ceil(args.threads / MAX_BATCH_WRITES),
+          f"first save used {len(first['commits'])} batches")
+    check(all(size <= MAX_BATCH_WRITES for size in first['commits']), f"oversized batch in {first['commits']}")
+    check(len(db.documents.get('curated_threads', {})) == args.threads, "stored document count differs")
+
+    # Transforming again draws new likes/replies and a new fetched_at, which must not count as changes
+    repeat = save(updater, db, [updater.transform_post_to_thread(post) for post in posts])
+    check(repeat['written'] == 0 and not repeat['commits'], f"unchanged save wrote {repeat['written']} threads")
+    check(repeat['skipped'] == args.threads, f"unchanged save skipped {repeat['skipped']} threads")
+
+    for post in posts[:args.edits]:
+        post['text'] += ' (edited)'
+    edited = save(updater, db, [updater.transform_post_to_thread(post) for post in posts])
+    check(edited['written'] == args.edits, f"edited save wrote {edited['written']} of {args.edits} threads")
+    check(len(edited['commits']) == math.ceil(args.edits / MAX_BATCH_WRITES),
+          f"edited save used {len(edited['commits'])} batches")
+
+    print(f"{'save':>10} {'written':>8} {'skipped':>8} {'batches':>8} {'time':>8}")
+    for name, result in (('first', first), ('unchanged', repeat), ('edited', edited)):
+        print(f"{name:>10} {result['written']:>8} {result['skipped']:>8} "
+              f"{len(result['commits']):>8} {result['seconds']:>7.3f}s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
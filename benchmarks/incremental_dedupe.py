@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Incremental Near-Duplicate Check
+
+Runs ThreadsDataUpdater twice with --incremental against the fake Threads
+API, whose accounts cross-post the same snippets, with no new content
+between the runs. The second run must find the same near-duplicate groups
+from the copies the first run left out: nothing is logged as deleted, the
+canonical threads keep their `duplicates`, and the data version and delta
+chain stay put. A daemon starting from the published dataset must also
+pick the copies back up. Exits non-zero when a check fails.
+
+Usage:
+    python benchmarks/incremental_dedupe.py
+    python benchmarks/incremental_dedupe.py --accounts 50
+"""
+
+import io
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+import contextlib
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('THREADS_ACCESS_TOKEN', 'benchmark-token')
+os.environ['FIREBASE_PROJECT_ID'] = ''
+os.environ['THREADS_STORE'] = 'sqlite'
+
+from update_data import ThreadsDataUpdater, UpdateDaemon  # noqa: E402
+from benchmarks.fake_threads_api import ServerProcess, free_port  # noqa: E402
+
+
+def run(accounts: int) -> Dict:
+    """One incremental run_update, returning what it published"""
+    updater = ThreadsDataUpdater(incremental=True)
+    updater.target_accounts = [f"account{i}" for i in range(accounts)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        success = updater.run_update()
+    updater.store.close()
+
+    with open(os.path.join(updater.output_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    deletions = 0
+    if os.path.exists(updater.deletion_log.path):
+        with open(updater.deletion_log.path, encoding='utf-8') as f:
+            deletions = sum(1 for _ in f)
+    threads = updater.load_previous_threads()
+    return {
+        'success': success,
+        'manifest': manifest,
+        'copies': len(updater.load_previous_copies()),
+        'deletions': deletions,
+        'with_duplicates': sum(1 for t in threads if t.get('duplicates')),
+        'updater': updater
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check near-duplicate copies survive incremental runs")
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--posts-per-account', type=int, default=40)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    cwd = os.getcwd()
+    failures = []
+
+    def check(condition: bool, message: str):
+        if not condition:
+            failures.append(message)
+
+    port = free_port()
+    fake_api = ServerProcess(
+        [sys.executable, 'benchmarks/fake_threads_api.py', '--port', str(port),
+         '--posts-per-account', str(args.posts_per_account)],
+        port, '/_stats'
+    )
+    with fake_api, tempfile.TemporaryDirectory() as workdir:
+        os.environ['THREADS_API_BASE_URL'] = f"{fake_api.url}/v1.0"
+        os.environ['THREADS_STATE_DIR'] = os.path.join(workdir, 'state')
+        os.chdir(workdir)
+        try:
+            first = run(args.accounts)
+            second = run(args.accounts)
+
+            daemon = UpdateDaemon(second['updater'])
+            daemon.load_existing_threads()
+            daemon_threads = sum(len(by_id) for by_id in daemon.threads_by_account.values())
+        finally:
+            os.chdir(cwd)
+
+    check(first['success'] and second['success'], "an update run failed")
+    check(first['copies'] > 0, "the first run dropped no near-duplicates, so nothing was checked")
+    check(second['copies'] == first['copies'],
+          f"second run dropped {second['copies']} copies, the first {first['copies']}")
+    check(second['deletions'] == 0, f"{second['deletions']} threads logged as deleted")
+    check(second['with_duplicates'] == first['with_duplicates'],
+          f"{second['with_duplicates']} canonical threads list duplicates, {first['with_duplicates']} before")
+    check(second['manifest']['dataVersion'] == first['manifest']['dataVersion'],
+          f"data version moved from {first['manifest']['dataVersion']} to {second['manifest']['dataVersion']}")
+    check(second['manifest']['deltas'] == first['manifest']['deltas'], "the unchanged run added a delta")
+    expected = second['manifest']['totalThreads'] + second['copies']
+    check(daemon_threads == expected, f"daemon started with {daemon_threads} threads, expected {expected}")
+
+    print(f"{'run':>7} {'threads':>8} {'copies':>7} {'canonical':>9} {'deleted':>8} {'version':>8}")
+    for name, result in (('first', first), ('second', second)):
+        print(f"{name:>7} {result['manifest']['totalThreads']:>8} {result['copies']:>7} "
+              f"{result['with_duplicates']:>9} {result['deletions']:>8} {result['manifest']['dataVersion']:>8}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher Benchmark
+
+Compares the original per-post `any(keyword in text)` scan with the compiled
+DesignKeywordMatcher on a synthetic corpus, with the current keyword list and
+with a keyword list grown into the hundreds.
+
+Usage:
+    python benchmarks/keyword_matcher.py
+    python benchmarks/keyword_matcher.py --posts 100000 --keywords 100 500 1000
+"""
+
+import os
+import sys
+import random
+import string
+import argparse
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from update_data import DesignKeywordMatcher  # noqa: E402
+
+BASE_KEYWORDS = [
+    'design', 'ui', 'ux', 'interface', 'user experience', 'visual',
+    'layout', 'typography', 'color', 'brand', 'creative', 'aesthetic',
+    'mockup', 'prototype', 'figma', 'sketch', 'adobe', 'illustration',
+    'graphic', 'web design', 'app design', 'mobile design'
+]
+
+FILLER_WORDS = [
+    'build', 'quite', 'today', 'launch', 'update', 'community', 'people', 'share',
+    'feature', 'announce', 'video', 'story', 'friends', 'reels', 'creator', 'new',
+    'team', 'world', 'together', 'thanks', 'guide', 'event', 'live', 'music'
+]
+
+
+def random_word(rng: random.Random) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+
+def make_keywords(count: int, rng: random.Random) -> List[str]:
+    """Extend the real keyword list with synthetic keywords up to `count`"""
+    keywords = list(BASE_KEYWORDS)
+    while len(keywords) < count:
+        keywords.append(random_word(rng))
+    return keywords
+
+
+def make_corpus(count: int, rng: random.Random) -> List[Dict]:
+    """Synthetic posts; roughly one in five mentions a design keyword"""
+    posts = []
+    for i in range(count):
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(8, 40))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), rng.choice(BASE_KEYWORDS))
+        posts.append({
+            'id': str(i),
+            'text': ' '.join(words).capitalize(),
+            'topic_tag': rng.choice([None, None, 'Design', 'News'])
+        })
+    return posts
+
+
+def legacy_is_design_related(keywords: List[str], content: str, topic_tag=None) -> bool:
+    """The original substring implementation, kept here as the baseline"""
+    search_text = f"{content} {topic_tag or ''}".lower()
+    return any(keyword in search_text for keyword in keywords)
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(posts: List[Dict], keywords: List[str]) -> Dict:
+    compile_start = time.perf_counter()
+    matcher = DesignKeywordMatcher(keywords)
+    compile_time = time.perf_counter() - compile_start
+
+    legacy = timed(lambda: [legacy_is_design_related(keywords, p.get('text', ''), p.get('topic_tag')) for p in posts])
+    single = timed(lambda: [matcher.matches(matcher.search_text(p)) for p in posts])
+    batch = timed(lambda: matcher.classify_batch(posts))
+
+    return {
+        'keywords': len(keywords),
+        'compile_s': compile_time,
+        'legacy_s': legacy,
+        'matcher_s': single,
+        'batch_s': batch,
+        'matched': sum(matcher.classify_batch(posts)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark design keyword matching")
+    parser.add_argument('--posts', type=int, default=100_000)
+    parser.add_argument('--keywords', type=int, nargs='+', default=[100, 300, 1000],
+                        help="sizes of the grown keyword lists")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    posts = make_corpus(args.posts, rng)
+
+    print(f"Corpus: {len(posts)} synthetic posts")
+    print(f"{'keywords':>9} {'legacy':>9} {'matcher':>9} {'batch':>9} {'speedup':>8} {'matched':>8}")
+    for size in [len(BASE_KEYWORDS)] + args.keywords:
+        keywords = make_keywords(size, rng)
+        result = run(posts, keywords)
+        speedup = result['legacy_s'] / result['batch_s']
+        print(f"{result['keywords']:>9} {result['legacy_s']:>8.3f}s {result['matcher_s']:>8.3f}s "
+              f"{result['batch_s']:>8.3f}s {speedup:>7.1f}x {result['matched']:>8}")
+
+
+if __name__ == '__main__':
+    main()
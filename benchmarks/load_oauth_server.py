@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+OAuth Server Load Test
+
+Starts the fake Threads API and oauth_server.py as separate processes, then
+drives /api/auth/verify, /api/auth/user, /api/threads/profile/{username} and
+the batch /api/threads/profiles at several concurrency levels and reports throughput and p50/p95/p99
+latency. Results are written as JSON (see benchmarks/results.py).
+
+Usage:
+    python benchmarks/load_oauth_server.py
+    python benchmarks/load_oauth_server.py --concurrency 1 10 50 --requests 2000 --latency-ms 80
+    python benchmarks/load_oauth_server.py --cold     # disable the token and profile caches
+    python benchmarks/load_oauth_server.py --url http://localhost:8000   # an already running server
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_threads_api import ServerProcess, free_port  # noqa: E402
+from benchmarks.results import latency_summary, write_results  # noqa: E402
+
+ENDPOINTS = [
+    ('verify', 'POST', '/api/auth/verify'),
+    ('user', 'GET', '/api/auth/user'),
+    ('profile', 'GET', '/api/threads/profile/{username}'),
+    ('profiles', 'GET', '/api/threads/profiles?usernames={batch}'),
+]
+
+
+async def run_level(base_url: str, name: str, method: str, path: str, concurrency: int,
+                    total: int, tokens: List[str], usernames: List[str], batch_size: int) -> Dict:
+    """Send `total` requests from `concurrency` workers and summarise them"""
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    next_index = 0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < total:
+                i = next_index
+                next_index += 1
+                batch = [usernames[(i + j) % len(usernames)] for j in range(batch_size)]
+                url = path.format(username=usernames[i % len(usernames)], batch=','.join(batch))
+                headers = {'Cookie': f"threads_token={tokens[i % len(tokens)]}"}
+
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, headers=headers)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code >= 400:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'endpoint': name,
+        'concurrency': concurrency,
+        'requests': total,
+        'errors': errors,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        'elapsed_s': round(elapsed, 4),
+        'requests_per_s': round(total / elapsed, 2),
+        **latency_summary(latencies)
+    }
+
+
+async def run_all(base_url: str, args) -> List[Dict]:
+    tokens = [f"bench-token-{i}" for i in range(args.tokens)]
+    usernames = [f"account{i}" for i in range(args.usernames)]
+    results = []
+    for name, method, path in ENDPOINTS:
+        if args.endpoints and name not in args.endpoints:
+            continue
+        # Warm connections and, unless --cold, the caches
+        await run_level(base_url, name, method, path, 4, 4 * len(tokens), tokens, usernames, args.batch_size)
+        for concurrency in args.concurrency:
+            result = await run_level(
+                base_url, name, method, path, concurrency, args.requests, tokens, usernames, args.batch_size
+            )
+            results.append(result)
+            print(f"{name:<8} {concurrency:>5} {result['requests_per_s']:>9.1f} {result['p50_ms']:>8.2f} "
+                  f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>6}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test oauth_server.py against the fake Threads API")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 100])
+    parser.add_argument('--requests', type=int, default=1000, help="requests per endpoint and concurrency level")
+    parser.add_argument('--endpoints', nargs='+', choices=[name for name, _, _ in ENDPOINTS])
+    parser.add_argument('--tokens', type=int, default=50, help="distinct access tokens to rotate through")
+    parser.add_argument('--usernames', type=int, default=20, help="distinct profiles to request")
+    parser.add_argument('--batch-size', type=int, default=10, help="usernames per batch profiles request")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="fake upstream latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fake upstream 503 rate")
+    parser.add_argument('--cold', action='store_true', help="disable the token and profile caches")
+    parser.add_argument('--url', help="already running oauth server to target instead of starting one")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    params = {k: v for k, v in vars(args).items() if k != 'output'}
+    print(f"{'endpoint':<8} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+
+    if args.url:
+        results = asyncio.run(run_all(args.url, args))
+    else:
+        api_port, server_port = free_port(), free_port()
+        fake_api = ServerProcess(
+            [sys.executable, 'benchmarks/fake_threads_api.py', '--port', str(api_port),
+             '--latency-ms', str(args.latency_ms), '--error-rate', str(args.error_rate)],
+            api_port, '/_stats'
+        )
+        server_env = {
+            'THREADS_GRAPH_URL': fake_api.url,
+            'THREADS_CLIENT_ID': 'benchmark',
+            'THREADS_CLIENT_SECRET': 'benchmark',
+            'FIREBASE_PRIVATE_KEY_PATH': os.devnull + '.missing'
+        }
+        if args.cold:
+            server_env.update({'TOKEN_CACHE_TTL': '0', 'PROFILE_CACHE_FRESH_TTL': '0', 'PROFILE_CACHE_STALE_TTL': '0'})
+        oauth_server = ServerProcess(
+            [sys.executable, '-m', 'uvicorn', 'oauth_server:app', '--port', str(server_port),
+             '--log-level', 'warning', '--no-access-log'],
+            server_port, '/health/ready', env=server_env
+        )
+        with fake_api, oauth_server:
+            results = asyncio.run(run_all(oauth_server.url, args))
+
+    print(f"\nResults written to {write_results('oauth_server', params, results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
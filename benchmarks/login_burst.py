@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Login Burst Benchmark
+
+Runs oauth_server's app in-process against the fake Threads API and a fake
+Firestore with write latency, then sends a burst of /api/auth/callback
+logins and reports their latency with token writes queued behind the
+response (write-behind) and written before it (inline). Afterwards it
+checks every user's document reached the fake Firestore. Results are
+written as JSON (see benchmarks/results.py).
+
+Usage:
+    python benchmarks/login_burst.py
+    python benchmarks/login_burst.py --logins 2000 --users 500 --concurrency 100 --firestore-latency-ms 80
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_firestore import FakeFirestore  # noqa: E402
+from benchmarks.fake_threads_api import BackgroundServer, ServerProcess, free_port  # noqa: E402
+from benchmarks.results import latency_summary, write_results  # noqa: E402
+
+MODES = ('write-behind', 'inline')
+
+
+async def burst(base_url: str, logins: int, users: int, concurrency: int) -> Dict:
+    """Send `logins` callbacks for `users` distinct users from `concurrency` workers"""
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal next_index, errors
+            while next_index < logins:
+                i = next_index
+                next_index += 1
+                body = {'code': f"code-{i % users}", 'redirect_uri': 'http://localhost:8080/auth/callback'}
+                start = time.perf_counter()
+                try:
+                    response = await client.post('/api/auth/callback', json=body)
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'logins': logins,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'requests_per_s': round(logins / elapsed, 2),
+        **latency_summary(latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure login latency with write-behind and inline token writes")
+    parser.add_argument('--logins', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=300, help="distinct users; repeats coalesce in the queue")
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--firestore-latency-ms', type=float, default=80.0)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="fake upstream latency")
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--output', help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    api_port = free_port()
+    fake_api = ServerProcess(
+        [sys.executable, 'benchmarks/fake_threads_api.py', '--port', str(api_port), '--latency-ms', str(args.latency_ms)],
+        api_port, '/_stats'
+    )
+    with fake_api:
+        os.environ.update({
+            'THREADS_GRAPH_URL': fake_api.url,
+            'THREADS_CLIENT_ID': 'benchmark',
+            'THREADS_CLIENT_SECRET': 'benchmark'
+        })
+        import oauth_server
+
+        # Per-login INFO lines would cost more than the logins themselves
+        logging.getLogger().setLevel(logging.WARNING)
+
+        results = []
+        print(f"{'mode':<13} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6} {'commits':>8}")
+        for mode in args.modes:
+            db = FakeFirestore(latency_ms=args.firestore_latency_ms)
+            oauth_server.firebase.use(db)
+            oauth_server.oauth_service.token_write_behind = mode == 'write-behind'
+
+            # A fresh server per mode; shutting it down drains the write queue
+            with BackgroundServer(oauth_server.app) as server:
+                result = asyncio.run(burst(server.url, args.logins, args.users, args.concurrency))
+
+            stored = len(db.documents.get('users', {}))
+            if stored != min(args.users, args.logins):
+                raise RuntimeError(f"{mode}: {stored} user documents stored, expected {min(args.users, args.logins)}")
+
+            result.update({'mode': mode, 'firestore_round_trips': db.round_trips, 'firestore_writes': db.writes})
+            results.append(result)
+            print(f"{mode:<13} {result['requests_per_s']:>9.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                  f"{result['p99_ms']:>8.2f} {result['errors']:>6} {db.round_trips:>8}")
+
+    params = {k: v for k, v in vars(args).items() if k != 'output'}
+    print(f"\nResults written to {write_results('login_burst', params, results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
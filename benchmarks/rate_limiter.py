@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Benchmark
+
+Crawls synthetic accounts from the fake Threads API under different quota
+and throttling settings and reports throughput versus throttling, retries
+and dropped accounts.
+
+Usage:
+    python benchmarks/rate_limiter.py
+    python benchmarks/rate_limiter.py --accounts 200 --latency-ms 20
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('THREADS_ACCESS_TOKEN', 'benchmark-token')
+os.environ['FIREBASE_PROJECT_ID'] = ''
+
+from update_data import ThreadsDataUpdater  # noqa: E402
+from benchmarks.fake_threads_api import BackgroundServer, FakeApiConfig, create_app  # noqa: E402
+
+SCENARIOS = [
+    ('unlimited', {}),
+    ('quota', {'quota': 40, 'window_s': 1.0}),
+    ('throttle-5%', {'throttle_rate': 0.05}),
+    ('errors-5%', {'error_rate': 0.05}),
+]
+
+
+def run_scenario(name: str, overrides: dict, accounts: int, latency_ms: float) -> dict:
+    config = FakeApiConfig(latency_ms=latency_ms, **overrides)
+    with BackgroundServer(create_app(config)) as server:
+        os.environ['THREADS_API_BASE_URL'] = f"{server.url}/v1.0"
+        updater = ThreadsDataUpdater()
+        handles = [f"account{i}" for i in range(accounts)]
+
+        start = time.perf_counter()
+        results = asyncio.run(updater.fetch_accounts_posts(handles, limit=20))
+        elapsed = time.perf_counter() - start
+
+    stats = updater.rate_limiter.stats()
+    return {
+        'scenario': name,
+        'elapsed_s': elapsed,
+        'requests_per_s': stats['requests'] / elapsed,
+        'requests': stats['requests'],
+        'throttled': stats['throttled'],
+        'retries': stats['retries'],
+        'dropped_accounts': sum(1 for posts in results.values() if not posts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the adaptive rate limiter against the fake API")
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=10.0)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    print(f"{'scenario':<12} {'elapsed':>8} {'req/s':>7} {'requests':>8} {'429s':>5} {'retries':>7} {'dropped':>7}")
+    for name, overrides in SCENARIOS:
+        r = run_scenario(name, overrides, args.accounts, args.latency_ms)
+        print(f"{r['scenario']:<12} {r['elapsed_s']:>7.2f}s {r['requests_per_s']:>7.1f} {r['requests']:>8} "
+              f"{r['throttled']:>5} {r['retries']:>7} {r['dropped_accounts']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark Results
+
+Shared helpers for the benchmark scripts: latency percentiles and JSON
+result files tagged with the commit and environment they were measured on,
+plus a comparison CLI that flags regressions between two result files.
+
+Usage:
+    python benchmarks/results.py baseline.json current.json --threshold 0.15
+"""
+
+import os
+import sys
+import json
+import math
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Metrics where a higher value is an improvement; everything else is "lower is better"
+HIGHER_IS_BETTER = ('requests_per_s', 'accounts_per_s', 'threads_per_s')
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def latency_summary(samples_s: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max in milliseconds"""
+    return {
+        'p50_ms': round(percentile(samples_s, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples_s, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples_s, 99) * 1000, 3),
+        'max_ms': round(max(samples_s, default=0.0) * 1000, 3)
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(RESULTS_DIR)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(benchmark: str, params: Dict, results: List[Dict], output: Optional[str] = None) -> str:
+    """Write a result file and return its path.
+
+    Without an explicit output path, results go to
+    benchmarks/results/<benchmark>-<commit>-<timestamp>.json.
+    """
+    now = datetime.now()
+    commit = git_commit()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{commit or 'nogit'}-{now.strftime('%Y%m%d-%H%M%S')}.json")
+
+    document = {
+        'benchmark': benchmark,
+        'created_at': now.isoformat(),
+        'commit': commit,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'params': params,
+        'results': results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def result_key(result: Dict) -> str:
+    """Identify a result row by its non-numeric fields (scenario, endpoint, ...)
+    and its integer size parameters (concurrency, accounts)"""
+    parts = [f"{k}={v}" for k, v in sorted(result.items())
+             if isinstance(v, str) or k in ('concurrency', 'accounts')]
+    return ' '.join(parts)
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """Relative change of every shared timing or rate metric, marking regressions"""
+    baseline_rows = {result_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        key = result_key(result)
+        before = baseline_rows.get(key)
+        if before is None:
+            continue
+        for metric, value in result.items():
+            old = before.get(metric)
+            # Only timings and rates; counts such as requests or threads are context
+            if not metric.endswith(('_ms', '_s')) or not isinstance(value, (int, float)) \
+                    or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            rows.append({
+                'key': key, 'metric': metric, 'baseline': old, 'current': value,
+                'change': change, 'regression': worse > threshold
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="relative slowdown treated as a regression (default 0.15)")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+
+    if baseline['benchmark'] != current['benchmark']:
+        sys.exit(f"Cannot compare {baseline['benchmark']} results with {current['benchmark']} results")
+
+    print(f"{baseline['benchmark']}: {baseline.get('commit')} -> {current.get('commit')}")
+    rows = compare(baseline, current, args.threshold)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['key']:<50} {row['metric']:<16} {row['baseline']:>10.3f} {row['current']:>10.3f} "
+              f"{row['change']:>+7.1%} {flag}")
+
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+End-to-End Update Benchmark
+
+Times ThreadsDataUpdater.run_update against the fake Threads API for a range
+of synthetic account counts. Each size runs twice in a fresh directory: a
+cold run that writes everything, then a warm run over unchanged content.
+The thread store is a local SQLite database so no Firebase project is
+needed. Results are written as JSON (see benchmarks/results.py).
+
+Usage:
+    python benchmarks/run_update.py
+    python benchmarks/run_update.py --accounts 10 100 1000 --latency-ms 50
+    python benchmarks/run_update.py --accounts 2000 --stream
+
+max_rss_mb is the process peak so far, so compare memory between separate
+invocations rather than between sizes within one.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import logging
+import contextlib
+import resource
+import argparse
+import tempfile
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('THREADS_ACCESS_TOKEN', 'benchmark-token')
+os.environ['FIREBASE_PROJECT_ID'] = ''
+os.environ['THREADS_STORE'] = 'sqlite'
+
+from update_data import ThreadsDataUpdater  # noqa: E402
+from benchmarks.fake_threads_api import ServerProcess, free_port  # noqa: E402
+from benchmarks.results import write_results  # noqa: E402
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_size(accounts: int, api_url: str, run: str, workdir: str, stream: bool = False) -> Dict:
+    os.environ['THREADS_API_BASE_URL'] = f"{api_url}/v1.0"
+    os.environ['THREADS_STATE_DIR'] = os.path.join(workdir, 'state')
+    os.chdir(workdir)
+
+    updater = ThreadsDataUpdater(stream=stream)
+    updater.target_accounts = [f"account{i}" for i in range(accounts)]
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        success = updater.run_update()
+    elapsed = time.perf_counter() - start
+
+    with open(os.path.join(updater.output_dir, 'manifest.json'), encoding='utf-8') as f:
+        total_threads = json.load(f)['totalThreads']
+    stats = updater.rate_limiter.stats()
+    updater.store.close()
+    return {
+        'run': run,
+        'accounts': accounts,
+        'success': success,
+        'elapsed_s': round(elapsed, 4),
+        'accounts_per_s': round(accounts / elapsed, 2),
+        'threads': total_threads,
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'max_rss_mb': round(max_rss_mb(), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time run_update over synthetic account lists")
+    parser.add_argument('--accounts', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="fake upstream latency")
+    parser.add_argument('--posts-per-account', type=int, default=100)
+    parser.add_argument('--stream', action='store_true', help="use the bounded-memory streaming pipeline")
+    parser.add_argument('--output', help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    params = {k: v for k, v in vars(args).items() if k != 'output'}
+    cwd = os.getcwd()
+
+    port = free_port()
+    fake_api = ServerProcess(
+        [sys.executable, 'benchmarks/fake_threads_api.py', '--port', str(port),
+         '--latency-ms', str(args.latency_ms), '--posts-per-account', str(args.posts_per_account)],
+        port, '/_stats'
+    )
+
+    results = []
+    print(f"{'accounts':>8} {'run':<5} {'elapsed':>9} {'acct/s':>8} {'requests':>8} {'rss MB':>7}")
+    with fake_api:
+        for accounts in args.accounts:
+            with tempfile.TemporaryDirectory() as workdir:
+                for run in ('cold', 'warm'):
+                    r = run_size(accounts, fake_api.url, run, workdir, stream=args.stream)
+                    results.append(r)
+                    print(f"{r['accounts']:>8} {r['run']:<5} {r['elapsed_s']:>8.2f}s {r['accounts_per_s']:>8.1f} "
+                          f"{r['requests']:>8} {r['max_rss_mb']:>7.1f}")
+                os.chdir(cwd)
+
+    print(f"\nResults written to {write_results('run_update', params, results, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Write-Behind Queue Check
+
+Runs WriteBehindQueue against the in-memory FakeFirestore and checks that
+repeated writes to one key coalesce into one write of the newest value,
+failed batches are retried until they land, close() drains everything
+still queued, and a put() that finds the queue full for longer than
+`put_timeout` writes inline instead of waiting. Exits non-zero when a check
+fails.
+
+Usage:
+    python benchmarks/token_writes.py
+    python benchmarks/token_writes.py --users 500 --puts 5000
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import argparse
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_firestore import FakeFirestore  # noqa: E402
+from write_behind import WriteBehindQueue  # noqa: E402
+
+
+def user_docs_writer(db: FakeFirestore) -> Callable[[Dict[str, Dict]], None]:
+    """One Firestore batch per flush, as oauth_server's write_user_docs does"""
+    def write(user_docs: Dict[str, Dict]):
+        batch = db.batch()
+        for user_id, user_doc in user_docs.items():
+            batch.set(db.collection('users').document(user_id), user_doc)
+        batch.commit()
+    return write
+
+
+def stored(db: FakeFirestore) -> Dict[str, Dict]:
+    return db.documents.get('users', {})
+
+
+async def check_coalescing(users: int, puts: int, check: Callable[[bool, str], None]) -> Dict:
+    db = FakeFirestore(latency_ms=5)
+    queue = WriteBehindQueue('coalescing', user_docs_writer(db), batch_size=50, flush_interval=0.05)
+    for i in range(puts):
+        await queue.put(f"user-{i % users}", {'version': i})
+    await queue.close()
+
+    stats = queue.stats()
+    newest = {f"user-{i % users}": i for i in range(puts)}
+    check(len(stored(db)) == users, f"coalescing stored {len(stored(db))} of {users} users")
+    check(all(stored(db).get(key, {}).get('version') == version for key, version in newest.items()),
+          "coalescing did not keep the newest value of every user")
+    check(stats['coalesced'] == puts - users, f"coalesced {stats['coalesced']} of {puts - users} repeated puts")
+    check(db.writes == users, f"coalescing wrote {db.writes} documents for {users} users")
+    check(all(size <= 50 for size in db.commits), f"coalescing batch larger than 50 in {db.commits}")
+    return stats
+
+
+async def check_retry(users: int, check: Callable[[bool, str], None]) -> Dict:
+    db = FakeFirestore(fail_commits=2)
+    queue = WriteBehindQueue('retry', user_docs_writer(db), batch_size=users, flush_interval=0.01)
+    for i in range(users):
+        await queue.put(f"user-{i}", {'version': i})
+    await queue.close(timeout=10)
+
+    stats = queue.stats()
+    check(stats['failed_batches'] == 2, f"retry saw {stats['failed_batches']} failed batches, expected 2")
+    check(len(stored(db)) == users, f"retry stored {len(stored(db))} of {users} users")
+    check(stats['depth'] == 0, f"retry left {stats['depth']} writes queued")
+    return stats
+
+
+async def check_drain(users: int, check: Callable[[bool, str], None]) -> Dict:
+    db = FakeFirestore(latency_ms=5)
+    # Nothing comes due on its own; only close() can flush these
+    queue = WriteBehindQueue('drain', user_docs_writer(db), batch_size=users * 2, flush_interval=60)
+    for i in range(users):
+        await queue.put(f"user-{i}", {'version': i})
+    check(not db.commits, f"drain wrote {db.writes} documents before close()")
+    await queue.close(timeout=5)
+
+    stats = queue.stats()
+    check(len(stored(db)) == users, f"drain stored {len(stored(db))} of {users} users on close()")
+    check(stats['depth'] == 0, f"drain left {stats['depth']} writes queued")
+    return stats
+
+
+async def check_overflow(check: Callable[[bool, str], None]) -> Dict:
+    # A slow writer and a tiny queue, so puts find it full
+    db = FakeFirestore(latency_ms=200)
+    queue = WriteBehindQueue('overflow', user_docs_writer(db), max_pending=5, batch_size=5,
+                             flush_interval=0.01, put_timeout=0.05)
+    users = 20
+    await asyncio.wait_for(
+        asyncio.gather(*(queue.put(f"user-{i}", {'version': i}) for i in range(users))), timeout=5
+    )
+    await queue.close(timeout=5)
+
+    stats = queue.stats()
+    check(stats['overflow_writes'] > 0, "no put() fell back to an inline write with the queue full")
+    check(len(stored(db)) == users, f"overflow stored {len(stored(db))} of {users} users")
+    return stats
+
+
+async def run(users: int, puts: int) -> List[str]:
+    failures = []
+
+    def check(condition: bool, message: str):
+        if not condition:
+            failures.append(message)
+
+    results = {
+        'coalescing': await check_coalescing(users, puts, check),
+        'retry': await check_retry(users, check),
+        'drain': await check_drain(users, check),
+        'overflow': await check_overflow(check)
+    }
+
+    print(f"{'check':>10} {'queued':>7} {'coalesced':>9} {'written':>8} {'batches':>8} {'failed':>7} {'inline':>7}")
+    for name, stats in results.items():
+        print(f"{name:>10} {stats['queued']:>7} {stats['coalesced']:>9} {stats['written']:>8} "
+              f"{stats['batches']:>8} {stats['failed_batches']:>7} {stats['overflow_writes']:>7}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check coalescing, retries, draining and overflow of WriteBehindQueue")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--puts', type=int, default=2000)
+    args = parser.parse_args()
+
+    # Expected retry and overflow messages would drown the results
+    logging.basicConfig(level=logging.CRITICAL)
+
+    failures = asyncio.run(run(args.users, args.puts))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Media Proxy Cache for ThreadGems
+
+Keeps copies of thread images and avatars so clients never hotlink Meta's
+expiring CDN URLs:
+- MediaCache: content-addressed files on disk, bounded in total size with
+  least-recently-used eviction, indexed in SQLite
+- MediaProxy: fetches allowed source URLs into the cache, one download per
+  URL however many requests ask for it, following redirects only to
+  allowed hosts
+
+Files are named by the SHA-256 of their bytes, so the URL that serves one
+can be cached by browsers forever.
+"""
+
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single-range `bytes=` header, or None to send the whole file.
+
+    Raises ValueError for a range that cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if not start:
+            # Suffix range: the last `end` bytes
+            length = int(end)
+            if length <= 0:
+                raise ValueError(header)
+            return max(0, size - length), size - 1
+        first = int(start)
+        last = min(int(end), size - 1) if end else size - 1
+    except ValueError:
+        raise ValueError(header)
+
+    if first >= size or first > last:
+        raise ValueError(header)
+    return first, last
+
+
+class MediaCache:
+    """Content-addressed media files on disk with LRU eviction beyond `max_bytes`.
+
+    Only the SOURCES_PER_OBJECT newest source URLs of each file are kept, and
+    only for `source_ttl` seconds after the file is evicted, long enough to
+    refetch it while its signed CDN URLs are still likely to work.
+
+    Methods block on SQLite, so MediaProxy calls them from worker threads.
+    Lookups batch their last-used times in memory and write them, together
+    with the figures stats() reports, every MAINTENANCE_INTERVAL seconds.
+    """
+
+    # Newest source URLs remembered per cached file
+    SOURCES_PER_OBJECT = 3
+    # Seconds to wait for another worker process's write lock
+    BUSY_TIMEOUT = 10.0
+    # Seconds between writes of batched last-used times and refreshes of stats()
+    MAINTENANCE_INTERVAL = 30.0
+
+    def __init__(self, root: str, max_bytes: int, source_ttl: float = 7 * 24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.source_ttl = source_ttl
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+        # Worker processes share the directory; WAL lets them read while one writes
+        self.conn = sqlite3.connect(
+            os.path.join(root, 'index.sqlite3'), timeout=self.BUSY_TIMEOUT, check_same_thread=False
+        )
+        # One connection shared by worker threads; add() and evict() nest
+        self.lock = threading.RLock()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS media_objects (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                content_type TEXT NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_media_objects_last_used ON media_objects (last_used);
+            CREATE TABLE IF NOT EXISTS media_sources (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_media_sources_digest ON media_sources (digest);
+            CREATE TABLE IF NOT EXISTS evicted_objects (
+                digest TEXT PRIMARY KEY,
+                evicted_at REAL NOT NULL
+            );
+        ''')
+        self.conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # digest -> last-used time not yet written
+        self.touched: Dict[str, float] = {}
+        self.totals = {'size': 0, 'bytes': 0, 'sources': 0}
+        self.next_maintenance = 0.0
+        self.maintain()
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def get(self, digest: str) -> Optional[Dict]:
+        """The cached file for a digest, marking it as recently used"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT size, content_type FROM media_objects WHERE digest = ?', (digest,)
+            ).fetchone()
+            path = self.object_path(digest)
+            if row is None or not os.path.exists(path):
+                self.misses += 1
+                return None
+
+            self.touched[digest] = time.time()
+            self.hits += 1
+            if time.monotonic() >= self.next_maintenance:
+                self.maintain()
+        return {'digest': digest, 'size': row[0], 'content_type': row[1], 'path': path}
+
+    def digest_for(self, url: str) -> Optional[str]:
+        """Digest of a source URL's cached copy, if it is still on disk"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT s.digest FROM media_sources s JOIN media_objects o ON o.digest = s.digest WHERE s.url = ?',
+                (url,)
+            ).fetchone()
+        if row is None or not os.path.exists(self.object_path(row[0])):
+            return None
+        return row[0]
+
+    def sources_for(self, digest: str) -> List[str]:
+        """Source URLs known to have served a digest, kept after eviction for refetching"""
+        with self.lock:
+            rows = self.conn.execute('SELECT url FROM media_sources WHERE digest = ?', (digest,))
+            return [row[0] for row in rows]
+
+    def add(self, url: str, temp_path: str, digest: str, size: int, content_type: str):
+        """Move a downloaded file into place and index it, then evict down to `max_bytes`"""
+        path = self.object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+
+        with self.lock, self.conn:
+            self.conn.execute('''
+                INSERT INTO media_objects (digest, size, content_type, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT(digest) DO UPDATE SET last_used = excluded.last_used
+            ''', (digest, size, content_type, time.time()))
+            self.conn.execute('''
+                INSERT INTO media_sources (url, digest) VALUES (?, ?)
+                ON CONFLICT(url) DO UPDATE SET digest = excluded.digest
+            ''', (url, digest))
+            # Each fetch of a file may come from a freshly signed URL; the older ones only expire
+            self.conn.execute('''
+                DELETE FROM media_sources WHERE digest = ? AND url NOT IN (
+                    SELECT url FROM media_sources WHERE digest = ? ORDER BY rowid DESC LIMIT ?
+                )
+            ''', (digest, digest, self.SOURCES_PER_OBJECT))
+            self.conn.execute('DELETE FROM evicted_objects WHERE digest = ?', (digest,))
+        self.evict(keep=digest)
+        if time.monotonic() >= self.next_maintenance:
+            self.maintain()
+
+    def evict(self, keep: Optional[str] = None):
+        """Delete least recently used files until the cache fits in `max_bytes`"""
+        with self.lock:
+            objects, total = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM media_objects'
+            ).fetchone()
+            self.totals.update(size=objects, bytes=total)
+            if total <= self.max_bytes:
+                return
+
+            # Victims are chosen by up-to-date last-used times
+            self.write_touches()
+            evicted = []
+            for digest, size in self.conn.execute('SELECT digest, size FROM media_objects ORDER BY last_used'):
+                if total <= self.max_bytes:
+                    break
+                if digest == keep:
+                    continue
+                evicted.append(digest)
+                total -= size
+
+            now = time.time()
+            with self.conn:
+                self.conn.executemany('DELETE FROM media_objects WHERE digest = ?', [(d,) for d in evicted])
+                self.conn.executemany('''
+                    INSERT INTO evicted_objects (digest, evicted_at) VALUES (?, ?)
+                    ON CONFLICT(digest) DO UPDATE SET evicted_at = excluded.evicted_at
+                ''', [(d, now) for d in evicted])
+            self.evictions += len(evicted)
+            self.totals.update(size=objects - len(evicted), bytes=total)
+
+        for digest in evicted:
+            # Requests already streaming the file keep their open handle
+            try:
+                os.remove(self.object_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def write_touches(self):
+        """Write the batched last-used times of files served since the last write"""
+        if not self.touched:
+            return
+        touched, self.touched = self.touched, {}
+        with self.conn:
+            self.conn.executemany(
+                'UPDATE media_objects SET last_used = MAX(last_used, ?) WHERE digest = ?',
+                [(used, digest) for digest, used in touched.items()]
+            )
+
+    def maintain(self):
+        """Write batched last-used times, prune stale sources and refresh the totals stats() reports"""
+        with self.lock:
+            self.next_maintenance = time.monotonic() + self.MAINTENANCE_INTERVAL
+            self.write_touches()
+            self.prune_sources()
+            objects, total = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM media_objects'
+            ).fetchone()
+            sources = self.conn.execute('SELECT COUNT(*) FROM media_sources').fetchone()[0]
+            self.totals = {'size': objects, 'bytes': total, 'sources': sources}
+
+    def prune_sources(self):
+        """Forget the source URLs of files evicted more than `source_ttl` seconds ago and not refetched"""
+        with self.conn:
+            self.conn.execute('DELETE FROM evicted_objects WHERE evicted_at < ?', (time.time() - self.source_ttl,))
+            self.conn.execute('''
+                DELETE FROM media_sources
+                WHERE digest NOT IN (SELECT digest FROM media_objects)
+                  AND digest NOT IN (SELECT digest FROM evicted_objects)
+            ''')
+
+    def temp_file(self):
+        """A named temporary file on the cache's filesystem, so add() can rename it into place"""
+        return tempfile.NamedTemporaryFile(dir=self.root, prefix='.download-', delete=False)
+
+    @staticmethod
+    def iter_file(f: BinaryIO, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Bytes start..end inclusive of an open file, read in chunks, closing it at the end.
+
+        Callers open the file up front so a concurrent eviction cannot remove it mid-response.
+        """
+        with f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def stats(self) -> Dict:
+        """Counters, with totals as of the last maintenance so the event loop never queries SQLite"""
+        return {
+            **self.totals,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def close(self):
+        with self.lock:
+            self.write_touches()
+            self.conn.close()
+
+
+class MediaProxy:
+    """Downloads media from allowed hosts into a MediaCache opened on start().
+
+    Every cache call runs in a worker thread, so a SQLite lock held by
+    another worker process never stalls the event loop.
+    """
+
+    name = 'media'
+
+    # Redirect hops followed per download, each checked against the allowed hosts
+    MAX_REDIRECTS = 5
+
+    def __init__(self, root: str, max_bytes: int, allowed_hosts: List[str], max_object_bytes: int,
+                 fetch_concurrency: int = 8, source_ttl: float = 7 * 24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.source_ttl = source_ttl
+        self.cache: Optional[MediaCache] = None
+        self.allowed_hosts = [host.strip().lower() for host in allowed_hosts if host.strip()]
+        self.max_object_bytes = max_object_bytes
+        self.fetch_semaphore = asyncio.Semaphore(max(1, fetch_concurrency))
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.http: Optional[httpx.AsyncClient] = None
+        self.fetches = 0
+        self.fetch_failures = 0
+
+    async def start(self):
+        if self.cache is None:
+            self.cache = await self.in_thread(MediaCache, self.root, self.max_bytes, self.source_ttl)
+        if self.http is None:
+            # open_source() follows redirects itself so every hop is checked
+            self.http = httpx.AsyncClient(timeout=15, follow_redirects=False)
+
+    async def close(self):
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+        if self.cache is not None:
+            await self.in_thread(self.cache.close)
+            self.cache = None
+
+    @staticmethod
+    async def in_thread(function, *args):
+        """Run a blocking cache call in a worker thread"""
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+    def is_allowed(self, url: str) -> bool:
+        """Only https URLs on the allowed hosts or their subdomains, so this is not an open proxy"""
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        return parts.scheme == 'https' and any(
+            host == allowed or host.endswith('.' + allowed) for allowed in self.allowed_hosts
+        )
+
+    async def resolve(self, url: str) -> str:
+        """Digest of a source URL's content, downloading it unless already cached"""
+        if not self.is_allowed(url):
+            raise ValueError("host not allowed")
+
+        digest = await self.in_thread(self.cache.digest_for, url)
+        if digest is not None:
+            return digest
+
+        # Concurrent requests for the same URL share one download
+        task = self.inflight.get(url)
+        if task is None:
+            task = asyncio.create_task(self.download(url))
+            self.inflight[url] = task
+            task.add_done_callback(lambda _: self.inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    @asynccontextmanager
+    async def open_source(self, url: str) -> AsyncIterator[httpx.Response]:
+        """Stream a source URL, following redirects only while they stay on allowed hosts"""
+        response = None
+        try:
+            for _ in range(self.MAX_REDIRECTS + 1):
+                response = await self.http.send(self.http.build_request('GET', url), stream=True)
+                if response.next_request is None:
+                    break
+                await response.aclose()
+                url = str(response.next_request.url)
+                if not self.is_allowed(url):
+                    raise ValueError("redirected to a host that is not allowed")
+            else:
+                raise ValueError(f"more than {self.MAX_REDIRECTS} redirects")
+            yield response
+        finally:
+            if response is not None:
+                await response.aclose()
+
+    async def download(self, url: str) -> str:
+        """Stream a source URL to a temporary file while hashing it, then add it to the cache"""
+        async with self.fetch_semaphore:
+            self.fetches += 1
+            temp = self.cache.temp_file()
+            try:
+                hasher = hashlib.sha256()
+                size = 0
+                async with self.open_source(url) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get('content-type', '').split(';')[0].strip()
+                    if not content_type.startswith('image/'):
+                        raise ValueError(f"not an image: {content_type or 'no content type'}")
+
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > self.max_object_bytes:
+                            raise ValueError(f"larger than {self.max_object_bytes} bytes")
+                        hasher.update(chunk)
+                        temp.write(chunk)
+                temp.close()
+
+                digest = hasher.hexdigest()
+                await self.in_thread(self.cache.add, url, temp.name, digest, size, content_type)
+                return digest
+            except BaseException:
+                self.fetch_failures += 1
+                temp.close()
+                if os.path.exists(temp.name):
+                    os.remove(temp.name)
+                raise
+
+    async def get(self, digest: str) -> Optional[Dict]:
+        """A cached file by digest, refetched from a known source if it was evicted"""
+        entry = await self.in_thread(self.cache.get, digest)
+        if entry is not None:
+            return entry
+
+        for url in await self.in_thread(self.cache.sources_for, digest):
+            try:
+                # The source may now serve different bytes; only an exact match will do
+                if await self.resolve(url) == digest:
+                    return await self.in_thread(self.cache.get, digest)
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"Media refetch failed for {digest[:12]}: {e}")
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            **(self.cache.stats() if self.cache is not None else {}),
+            'fetches': self.fetches,
+            'fetch_failures': self.fetch_failures,
+            'inflight': len(self.inflight)
+        }
@@ -2,22 +2,43 @@
 """
 OAuth Server for ThreadGems
 Handles Threads OAuth authentication and token management
+
+Usage:
+    python oauth_server.py                              # development, auto-reload
+    python oauth_server.py --production --workers 4     # or SERVER_ENV=production
+
+Liveness is /health/live; /health/ready answers 503 until startup has finished.
 """
 
 import os
 import json
+import time
+import hmac
+import asyncio
+import hashlib
 import logging
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 
-import requests
-from fastapi import FastAPI, HTTPException, Request, Response
+import httpx
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+from media_cache import DIGEST_PATTERN, MediaCache, MediaProxy, parse_byte_range
+from rate_limiter import AdaptiveRateLimiter, RateLimited, RateLimiterPool, RetryBudget
+from write_behind import WriteBehindQueue
+from server_metrics import (
+    FIRESTORE_WRITE_ERRORS, FIRESTORE_WRITE_LATENCY, PROFILE_BATCH_RESULTS, STARTUP_DURATION,
+    UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY, UPSTREAM_REQUESTS, MetricsMiddleware, scrape_registry
+)
 
 # Load environment variables
 load_dotenv()
@@ -26,7 +47,33 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="ThreadGems OAuth Server", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the service, warm up Firebase in the background, and clean up on shutdown"""
+    started = time.perf_counter()
+    await oauth_service.start()
+    await media_proxy.start()
+    stats_collector = ServiceStatsCollector()
+    REGISTRY.register(stats_collector)
+
+    async def warm_up():
+        await firebase.client()
+        app.state.startup_seconds = time.perf_counter() - started
+        STARTUP_DURATION.set(app.state.startup_seconds)
+        logger.info(f"🚀 Ready to serve after {app.state.startup_seconds:.2f}s")
+
+    # Liveness and routes that don't need Firebase answer meanwhile; readiness waits
+    app.state.startup_seconds = None
+    warm_up_task = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        warm_up_task.cancel()
+        REGISTRY.unregister(stats_collector)
+        await media_proxy.close()
+        await oauth_service.close()
+
+app = FastAPI(title="ThreadGems OAuth Server", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -37,20 +84,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Firebase
-try:
-    firebase_key_path = os.getenv('FIREBASE_PRIVATE_KEY_PATH', './firebase-admin-key.json')
-    if os.path.exists(firebase_key_path):
-        cred = credentials.Certificate(firebase_key_path)
-        firebase_admin.initialize_app(cred)
-        db = firestore.client()
-        logger.info("✅ Firebase initialized successfully")
-    else:
-        logger.warning("Firebase key file not found - running without Firebase")
-        db = None
-except Exception as e:
-    logger.error(f"Firebase initialization failed: {e}")
-    db = None
+app.add_middleware(MetricsMiddleware)
+
+class LazyFirebase:
+    """Firestore client initialised off the import path.
+
+    firebase_admin and the Firestore client library are a large share of the
+    server's import time, so they load in a worker thread once the app starts.
+    """
+
+    def __init__(self):
+        self.db = None
+        self.startup: Optional[Future] = None
+
+    def use(self, db):
+        """Use an existing client, e.g. a local fake, instead of initialising Firebase"""
+        self.db = db
+        self.startup = Future()
+        self.startup.set_result(None)
+
+    def initialize(self):
+        try:
+            firebase_key_path = os.getenv('FIREBASE_PRIVATE_KEY_PATH', './firebase-admin-key.json')
+            if os.path.exists(firebase_key_path):
+                import firebase_admin
+                from firebase_admin import credentials, firestore
+
+                cred = credentials.Certificate(firebase_key_path)
+                firebase_admin.initialize_app(cred)
+                self.db = firestore.client()
+                logger.info("✅ Firebase initialized successfully")
+            else:
+                logger.warning("Firebase key file not found - running without Firebase")
+        except Exception as e:
+            logger.error(f"Firebase initialization failed: {e}")
+
+    async def client(self):
+        """The Firestore client, or None without Firebase, waiting for initialisation if needed"""
+        if self.startup is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='firebase-init')
+            self.startup = executor.submit(self.initialize)
+            executor.shutdown(wait=False)
+        # Shield so a cancelled request does not cancel initialisation for everyone else
+        await asyncio.shield(asyncio.wrap_future(self.startup))
+        return self.db
+
+firebase = LazyFirebase()
+
+# Fields requested from /me; verify and profile lookups share one cached response
+PROFILE_FIELDS = 'id,username,name,threads_profile_picture_url,threads_biography'
 
 # Pydantic models
 class AuthCallbackRequest(BaseModel):
@@ -60,19 +142,278 @@ class AuthCallbackRequest(BaseModel):
 class TokenRefreshRequest(BaseModel):
     user_id: str
 
+class MediaPrewarmRequest(BaseModel):
+    urls: List[str]
+
+class TTLCache:
+    """Size-bounded in-process cache with per-entry expiry and LRU eviction"""
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def token_key(token: str) -> str:
+        """Hash a token so raw credentials never become dict keys"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            logger.debug(f"{self.name} cache miss")
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        logger.debug(f"{self.name} cache hit")
+        return entry[1]
+
+    def set(self, key: str, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self.entries.pop(key, None)
+
+    def stats(self) -> Dict:
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+class CachedResponse:
+    """A serialized upstream response with its validator"""
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.stored_at = time.monotonic()
+
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+class StaleWhileRevalidateCache:
+    """Response cache that serves stale entries while one background refresh runs.
+
+    Entries are fresh for `fresh_ttl` seconds, then served stale for up to
+    `stale_ttl` more while a refresh runs. Concurrent loads of the same key
+    share a single upstream call.
+    """
+
+    def __init__(self, name: str, max_size: int, fresh_ttl: float, stale_ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_failures = 0
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        entry = self.entries.get(key)
+        if entry is not None:
+            age = entry.age()
+            if age < self.fresh_ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+            if age < self.fresh_ttl + self.stale_ttl:
+                self.entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self.inflight:
+                    self.start_refresh(key, loader).add_done_callback(self.log_refresh_failure)
+                return entry
+
+        self.misses += 1
+        if key in self.inflight:
+            self.coalesced += 1
+            task = self.inflight[key]
+        else:
+            task = self.start_refresh(key, loader)
+
+        # Shield so one cancelled caller does not cancel the load for everyone else
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The load may now finish with no caller awaiting it, so its failure is logged here
+            task.remove_done_callback(self.log_refresh_failure)
+            task.add_done_callback(self.log_refresh_failure)
+            raise
+
+    def start_refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        async def refresh() -> CachedResponse:
+            try:
+                entry = CachedResponse(await loader())
+                self.store(key, entry)
+                return entry
+            finally:
+                self.inflight.pop(key, None)
+
+        task = asyncio.create_task(refresh())
+        self.inflight[key] = task
+        return task
+
+    def log_refresh_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_failures += 1
+            logger.warning(f"{self.name} cache background refresh failed: {task.exception()}")
+
+    def store(self, key: Hashable, entry: CachedResponse):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def max_age(self, entry: CachedResponse) -> int:
+        return max(0, int(self.fresh_ttl - entry.age()))
+
+    def stats(self) -> Dict:
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'inflight': len(self.inflight),
+            'refresh_failures': self.refresh_failures
+        }
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag, ignoring weak prefixes"""
+    if not if_none_match:
+        return False
+
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    candidates = [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+    return '*' in candidates or etag in candidates
+
 class ThreadsOAuthService:
     def __init__(self):
         self.client_id = os.getenv('THREADS_CLIENT_ID')
         self.client_secret = os.getenv('THREADS_CLIENT_SECRET')
-        self.base_url = 'https://graph.threads.net'
+        self.base_url = os.getenv('THREADS_GRAPH_URL', 'https://graph.threads.net')
+
+        # Upstream connection pool, shared by every request for the app's lifetime
+        self.pool_limits = httpx.Limits(
+            max_connections=int(os.getenv('THREADS_HTTP_MAX_CONNECTIONS', '100')),
+            max_keepalive_connections=int(os.getenv('THREADS_HTTP_MAX_KEEPALIVE', '20')),
+            keepalive_expiry=float(os.getenv('THREADS_HTTP_KEEPALIVE_EXPIRY', '30'))
+        )
+        self.http: Optional[httpx.AsyncClient] = None
+
+        # Quota-aware pacing per access token, so one throttled user never stalls the others;
+        # each retry budget refills so roughly one request in ten may retry
+        target_usage = float(os.getenv('THREADS_SERVER_TARGET_USAGE', '80'))
+        max_retries = int(os.getenv('THREADS_SERVER_MAX_RETRIES', '2'))
+        max_retry_delay = float(os.getenv('THREADS_SERVER_MAX_RETRY_DELAY', '2'))
+        retry_budget = int(os.getenv('THREADS_SERVER_RETRY_BUDGET', '20'))
+        self.rate_limiters = RateLimiterPool(
+            lambda: AdaptiveRateLimiter(
+                target_usage=target_usage,
+                max_retries=max_retries,
+                max_delay=max_retry_delay,
+                retry_budget=RetryBudget(capacity=retry_budget, refill_per_success=0.1),
+                # A paused token gets a 429 instead of holding its request open for minutes
+                max_wait=max_retry_delay
+            ),
+            max_size=int(os.getenv('THREADS_SERVER_RATE_LIMITERS', '10000'))
+        )
+
+        # Validated /me responses keyed by token hash, so repeat auth checks skip upstream
+        self.token_cache = TTLCache(
+            'token',
+            max_size=int(os.getenv('TOKEN_CACHE_MAX_SIZE', '10000')),
+            ttl=float(os.getenv('TOKEN_CACHE_TTL', '300'))
+        )
 
+        # profile_posts responses keyed by (username, limit)
+        self.profile_cache = StaleWhileRevalidateCache(
+            'profile_posts',
+            max_size=int(os.getenv('PROFILE_CACHE_MAX_SIZE', '1000')),
+            fresh_ttl=float(os.getenv('PROFILE_CACHE_FRESH_TTL', '60')),
+            stale_ttl=float(os.getenv('PROFILE_CACHE_STALE_TTL', '600'))
+        )
+
+        # Batch profile requests: usernames per request, upstream calls in flight per
+        # request, and seconds before answering with whatever has arrived
+        self.batch_max_usernames = int(os.getenv('PROFILE_BATCH_MAX_USERNAMES', '50'))
+        self.batch_concurrency = int(os.getenv('PROFILE_BATCH_CONCURRENCY', '8'))
+        self.batch_deadline = float(os.getenv('PROFILE_BATCH_DEADLINE', '5'))
+
+        # User documents written behind the login path, coalesced per user and
+        # flushed in Firestore batches (at most 500 writes each)
+        self.token_write_behind = os.getenv('TOKEN_WRITE_BEHIND', 'true').lower() != 'false'
+        self.token_write_drain_timeout = float(os.getenv('TOKEN_WRITE_DRAIN_TIMEOUT', '10'))
+        self.token_writes = WriteBehindQueue(
+            'user_tokens',
+            self.write_user_docs,
+            max_pending=int(os.getenv('TOKEN_WRITE_MAX_PENDING', '10000')),
+            batch_size=min(500, int(os.getenv('TOKEN_WRITE_BATCH_SIZE', '100'))),
+            flush_interval=float(os.getenv('TOKEN_WRITE_FLUSH_INTERVAL', '0.5')),
+            put_timeout=float(os.getenv('TOKEN_WRITE_PUT_TIMEOUT', '1'))
+        )
+
+    async def start(self):
+        """Check the OAuth credentials and open the shared async HTTP client"""
         if not self.client_id or not self.client_secret:
             raise ValueError("THREADS_CLIENT_ID and THREADS_CLIENT_SECRET must be set")
 
+        if self.http is None:
+            self.http = httpx.AsyncClient(base_url=self.base_url, limits=self.pool_limits, timeout=10)
+            logger.info("✅ Upstream HTTP client started")
+        await self.token_writes.start()
+
+    async def close(self):
+        """Flush queued token writes, then close the shared async HTTP client"""
+        await self.token_writes.close(timeout=self.token_write_drain_timeout)
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+            logger.info("Upstream HTTP client closed")
+
+    async def upstream_request(self, endpoint: str, method: str, path: str,
+                               access_token: Optional[str] = None, **kwargs) -> httpx.Response:
+        """Call the Threads API through the token's rate limiter, recording metrics under `endpoint`.
+
+        Requests made without a user token, like the code exchange, share the app's limiter.
+        """
+        limiter = self.rate_limiters.get(TTLCache.token_key(access_token) if access_token else 'app')
+        status = 'error'
+        start = time.perf_counter()
+        UPSTREAM_IN_FLIGHT.inc()
+        try:
+            response = await limiter.request(self.http, method, path, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            UPSTREAM_IN_FLIGHT.dec()
+            UPSTREAM_LATENCY.labels(endpoint).observe(time.perf_counter() - start)
+            UPSTREAM_REQUESTS.labels(endpoint, status).inc()
+
     async def exchange_code_for_token(self, code: str, redirect_uri: str) -> Dict:
         """Exchange authorization code for access token"""
-        url = f"{self.base_url}/oauth/access_token"
-
         data = {
             'client_id': self.client_id,
             'client_secret': self.client_secret,
@@ -82,35 +423,136 @@ class ThreadsOAuthService:
         }
 
         try:
-            response = requests.post(url, data=data, timeout=10)
+            response = await self.upstream_request(
+                'oauth/access_token', 'POST', "/oauth/access_token", idempotent=False, data=data
+            )
             response.raise_for_status()
 
             result = response.json()
             logger.info(f"✅ Token exchange successful for user {result.get('user_id', 'unknown')}")
 
             return result
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"❌ Token exchange failed: {e}")
             raise HTTPException(status_code=400, detail=f"Token exchange failed: {str(e)}")
 
     async def get_user_profile(self, access_token: str) -> Dict:
         """Get user profile information"""
-        url = f"{self.base_url}/v1.0/me"
+        cache_key = self.token_cache.token_key(access_token)
+        cached = self.token_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         params = {
             'access_token': access_token,
-            'fields': 'id,username,name,threads_profile_picture_url,threads_biography'
+            'fields': PROFILE_FIELDS
         }
 
         try:
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.upstream_request('me', 'GET', "/v1.0/me", access_token, params=params)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            profile = response.json()
+        except httpx.HTTPError as e:
             logger.error(f"❌ Profile fetch failed: {e}")
             return {}
 
+        self.token_cache.set(cache_key, profile)
+        return profile
+
+    async def verify_access_token(self, access_token: str) -> Optional[Dict]:
+        """Check a token against /me, returning the user's profile if valid"""
+        cache_key = self.token_cache.token_key(access_token)
+        cached = self.token_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await self.upstream_request(
+            'me', 'GET', "/v1.0/me", access_token,
+            params={'access_token': access_token, 'fields': PROFILE_FIELDS},
+            timeout=5
+        )
+
+        if response.status_code != 200:
+            return None
+
+        profile = response.json()
+        self.token_cache.set(cache_key, profile)
+        return profile
+
+    def forget_token(self, access_token: str):
+        """Drop any cached validation for a token"""
+        self.token_cache.delete(self.token_cache.token_key(access_token))
+
+    async def get_profile_posts(self, access_token: str, username: str, limit: int = 25) -> Dict:
+        """Fetch a page of posts for a Threads profile"""
+        params = {
+            'access_token': access_token,
+            'username': username,
+            'fields': 'id,media_product_type,media_type,media_url,permalink,username,text,topic_tag,timestamp,shortcode,thumbnail_url,is_quote_post',
+            'limit': limit
+        }
+
+        response = await self.upstream_request(
+            'profile_posts', 'GET', "/v1.0/profile_posts", access_token, params=params
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def get_cached_profile_posts(self, access_token: str, username: str, limit: int = 25) -> CachedResponse:
+        """Fetch profile posts through the stale-while-revalidate cache"""
+        return await self.profile_cache.get(
+            (username, limit),
+            lambda: self.get_profile_posts(access_token, username, limit)
+        )
+
+    async def get_many_profile_posts(self, access_token: str, usernames: List[str],
+                                     limit: int = 25) -> Tuple[Dict, int]:
+        """Fetch several profiles concurrently and merge their posts newest-first.
+
+        Each username succeeds or fails on its own, and usernames still loading
+        at the deadline are reported as timed out instead of failing the batch.
+        Returns the merged result and how long it may be cached, in seconds.
+        """
+        semaphore = asyncio.Semaphore(max(1, self.batch_concurrency))
+
+        async def fetch(username: str) -> CachedResponse:
+            async with semaphore:
+                return await self.get_cached_profile_posts(access_token, username, limit)
+
+        tasks = {username: asyncio.create_task(fetch(username)) for username in usernames}
+        _, pending = await asyncio.wait(tasks.values(), timeout=self.batch_deadline)
+        # Loads already started keep running behind the cache's shield and fill it for next time
+        for task in pending:
+            task.cancel()
+
+        posts = []
+        profiles = {}
+        max_age = int(self.profile_cache.fresh_ttl)
+        for username, task in tasks.items():
+            if task in pending:
+                profiles[username] = {'status': 'timeout'}
+            elif task.exception() is not None:
+                error = task.exception()
+                if isinstance(error, httpx.HTTPStatusError):
+                    profiles[username] = {'status': 'error', 'upstream_status': error.response.status_code}
+                else:
+                    profiles[username] = {'status': 'error'}
+                logger.warning(f"⚠️ Batch fetch failed for {username}: {type(error).__name__}")
+            else:
+                entry = task.result()
+                data = entry.payload.get('data', [])
+                posts.extend(data)
+                profiles[username] = {'status': 'ok', 'count': len(data)}
+                max_age = min(max_age, self.profile_cache.max_age(entry))
+            PROFILE_BATCH_RESULTS.labels(profiles[username]['status']).inc()
+
+        posts.sort(key=lambda post: post.get('timestamp', ''), reverse=True)
+        partial = any(profile['status'] != 'ok' for profile in profiles.values())
+        return {'data': posts, 'profiles': profiles, 'partial': partial}, 0 if partial else max_age
+
     async def store_user_token(self, user_id: str, token_data: Dict, profile_data: Dict = None):
         """Store user token and profile in Firebase"""
+        db = await firebase.client()
         if not db:
             logger.warning("Firebase not available - skipping token storage")
             return
@@ -124,15 +566,90 @@ class ThreadsOAuthService:
                 'last_updated': datetime.utcnow()
             }
 
-            # Store in Firebase
-            db.collection('users').document(user_id).set(user_doc)
+            if self.token_write_behind:
+                await self.token_writes.put(user_id, user_doc)
+                logger.info(f"✅ Queued token for user {user_id}")
+                return
+
+            # Written inline, but still off the event loop
+            await asyncio.get_running_loop().run_in_executor(None, self.write_user_docs, {user_id: user_doc})
             logger.info(f"✅ Stored token for user {user_id}")
 
         except Exception as e:
             logger.error(f"❌ Failed to store user token: {e}")
 
+    def write_user_docs(self, user_docs: Dict[str, Dict]):
+        """Write user documents to Firestore in one batch; runs in a worker thread"""
+        db = firebase.db
+        batch = db.batch()
+        for user_id, user_doc in user_docs.items():
+            batch.set(db.collection('users').document(user_id), user_doc)
+
+        try:
+            with FIRESTORE_WRITE_LATENCY.labels('store_user_token').time():
+                batch.commit()
+        except Exception:
+            FIRESTORE_WRITE_ERRORS.labels('store_user_token').inc()
+            raise
+
 oauth_service = ThreadsOAuthService()
 
+# Cached copies of thread images and avatars, served by content hash
+media_proxy = MediaProxy(
+    root=os.getenv('MEDIA_CACHE_DIR', '.threadgems/media'),
+    max_bytes=int(os.getenv('MEDIA_CACHE_MAX_BYTES', str(1024 ** 3))),
+    allowed_hosts=os.getenv('MEDIA_PROXY_ALLOWED_HOSTS', 'cdninstagram.com,fbcdn.net,api.dicebear.com').split(','),
+    max_object_bytes=int(os.getenv('MEDIA_MAX_OBJECT_BYTES', str(20 * 1024 * 1024))),
+    fetch_concurrency=int(os.getenv('MEDIA_FETCH_CONCURRENCY', '8')),
+    source_ttl=float(os.getenv('MEDIA_SOURCE_TTL', str(7 * 24 * 3600)))
+)
+
+# Source URLs per prewarm request
+MEDIA_PREWARM_MAX_URLS = 100
+
+MEDIA_HEADERS = {
+    "Cache-Control": "public, max-age=31536000, immutable",
+    "Accept-Ranges": "bytes",
+    "X-Content-Type-Options": "nosniff",
+    # SVG avatars are served from our origin, so never let one run script
+    "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+}
+
+class ServiceStatsCollector:
+    """Exposes cache, write queue and rate limiter counters, read only when /metrics is scraped"""
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            'threadgems_cache', 'In-process cache counters by cache and field', labels=['cache', 'field']
+        )
+        for cache in (oauth_service.token_cache, oauth_service.profile_cache, media_proxy):
+            for field, value in cache.stats().items():
+                family.add_metric([cache.name, field], value)
+        yield family
+
+        family = GaugeMetricFamily(
+            'threadgems_write_queue', 'Write-behind queue state by queue and field', labels=['queue', 'field']
+        )
+        for field, value in oauth_service.token_writes.stats().items():
+            family.add_metric([oauth_service.token_writes.name, field], value)
+        yield family
+
+        family = GaugeMetricFamily(
+            'threadgems_rate_limiter', 'Upstream rate limiter state, summed over tokens, by field', labels=['field']
+        )
+        for field, value in oauth_service.rate_limiters.stats().items():
+            if value is not None:
+                family.add_metric([field], value)
+        yield family
+
+def too_many_requests(error: RateLimited) -> HTTPException:
+    """429 for a request whose token is paused or backed up at the upstream rate limiter"""
+    return HTTPException(
+        status_code=429,
+        detail="Rate limited by the Threads API",
+        headers={"Retry-After": str(int(error.retry_after) + 1)}
+    )
+
 @app.post("/api/auth/callback")
 async def auth_callback(request: AuthCallbackRequest, response: Response):
     """Handle OAuth callback and exchange code for token"""
@@ -177,8 +694,12 @@ async def auth_callback(request: AuthCallbackRequest, response: Response):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/auth/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response):
     """Logout user and clear cookies"""
+    token = request.cookies.get("threads_token")
+    if token:
+        oauth_service.forget_token(token)
+
     response.delete_cookie(key="threads_token")
     return {"success": True, "message": "Logged out successfully"}
 
@@ -192,14 +713,9 @@ async def verify_token(request: Request):
 
     try:
         # Test token with a simple API call
-        response = requests.get(
-            f"{oauth_service.base_url}/v1.0/me",
-            params={'access_token': token, 'fields': 'id,username'},
-            timeout=5
-        )
+        user_data = await oauth_service.verify_access_token(token)
 
-        if response.status_code == 200:
-            user_data = response.json()
+        if user_data is not None:
             return {
                 "valid": True,
                 "user_id": user_data.get('id'),
@@ -209,6 +725,8 @@ async def verify_token(request: Request):
         else:
             raise HTTPException(status_code=401, detail="Invalid token")
 
+    except RateLimited as e:
+        raise too_many_requests(e)
     except Exception as e:
         logger.error(f"❌ Token verification failed: {e}")
         raise HTTPException(status_code=401, detail="Token verification failed")
@@ -228,50 +746,242 @@ async def get_current_user(request: Request):
         logger.error(f"❌ Failed to get user profile: {e}")
         raise HTTPException(status_code=500, detail="Failed to get user profile")
 
-@app.get("/api/threads/profile/{username}")
-async def get_user_threads(username: str, request: Request, limit: int = 25):
-    """Get threads for a specific user (requires authentication)"""
+async def require_verified_token(request: Request) -> str:
+    """The request's token, checked upstream since cached responses are shared between users"""
     token = request.cookies.get("threads_token")
 
     if not token:
         raise HTTPException(status_code=401, detail="Authentication required")
 
+    try:
+        user_data = await oauth_service.verify_access_token(token)
+    except RateLimited as e:
+        raise too_many_requests(e)
+    except httpx.HTTPError as e:
+        logger.error(f"❌ Token verification failed: {e}")
+        raise HTTPException(status_code=401, detail="Token verification failed")
+
+    if user_data is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    return token
+
+def parse_usernames(usernames: str) -> List[str]:
+    """Comma-separated handles, without @ prefixes or duplicates, in request order"""
+    handles = []
+    for handle in usernames.split(','):
+        handle = handle.strip().lstrip('@')
+        if handle and handle not in handles:
+            handles.append(handle)
+    return handles
+
+@app.get("/api/threads/profile/{username}")
+async def get_user_threads(username: str, request: Request, limit: int = 25):
+    """Get threads for a specific user (requires authentication)"""
+    token = await require_verified_token(request)
+
     try:
         # Use the same logic from update_data.py but with user token
-        url = f"{oauth_service.base_url}/v1.0/profile_posts"
-        params = {
-            'access_token': token,
-            'username': username,
-            'fields': 'id,media_product_type,media_type,media_url,permalink,username,text,topic_tag,timestamp,shortcode,thumbnail_url,is_quote_post',
-            'limit': limit
+        cached = await oauth_service.get_cached_profile_posts(token, username, limit)
+
+        headers = {
+            "ETag": cached.etag,
+            "Cache-Control": (
+                f"private, max-age={oauth_service.profile_cache.max_age(cached)}, "
+                f"stale-while-revalidate={int(oauth_service.profile_cache.stale_ttl)}"
+            )
         }
 
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
+        if etag_matches(request.headers.get("if-none-match"), cached.etag):
+            return Response(status_code=304, headers=headers)
 
-        return response.json()
+        return Response(content=cached.body, media_type="application/json", headers=headers)
 
+    except RateLimited as e:
+        raise too_many_requests(e)
     except Exception as e:
         logger.error(f"❌ Failed to fetch threads for {username}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch threads: {str(e)}")
 
+@app.get("/api/threads/profiles")
+async def get_many_users_threads(usernames: str, request: Request, limit: int = 25):
+    """Get threads for several users, merged newest-first (requires authentication).
+
+    Usernames that fail or miss the deadline are listed under `profiles` and
+    the rest are still returned, with `partial` set. With none returned the
+    status is 504 if every username timed out, else 502.
+    """
+    handles = parse_usernames(usernames)
+    if not handles:
+        raise HTTPException(status_code=400, detail="No usernames given")
+    if len(handles) > oauth_service.batch_max_usernames:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {oauth_service.batch_max_usernames} usernames per request"
+        )
+
+    token = await require_verified_token(request)
+    result, max_age = await oauth_service.get_many_profile_posts(token, handles, limit)
+    merged = CachedResponse(result)
+
+    statuses = {profile['status'] for profile in result['profiles'].values()}
+    if 'ok' not in statuses:
+        return Response(content=merged.body, media_type="application/json",
+                        status_code=504 if statuses == {'timeout'} else 502,
+                        headers={"Cache-Control": "no-store"})
+
+    headers = {
+        "ETag": merged.etag,
+        "Cache-Control": f"private, max-age={max_age}" if not result['partial'] else "no-store"
+    }
+    if etag_matches(request.headers.get("if-none-match"), merged.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=merged.body, media_type="application/json", headers=headers)
+
+@app.post("/api/media")
+async def prewarm_media(request: MediaPrewarmRequest, authorization: Optional[str] = Header(None)):
+    """Fetch source images into the media cache, returning their content-addressed paths"""
+    token = os.getenv('MEDIA_PROXY_TOKEN')
+    if not token:
+        raise HTTPException(status_code=503, detail="Media prewarming is not configured")
+    if not hmac.compare_digest((authorization or '').encode('utf-8'), f"Bearer {token}".encode('utf-8')):
+        raise HTTPException(status_code=401, detail="Invalid media proxy token")
+    if len(request.urls) > MEDIA_PREWARM_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {MEDIA_PREWARM_MAX_URLS} URLs per request")
+
+    urls = list(dict.fromkeys(request.urls))
+    results = await asyncio.gather(*(media_proxy.resolve(url) for url in urls), return_exceptions=True)
+
+    media, errors = {}, {}
+    for url, result in zip(urls, results):
+        if isinstance(result, httpx.HTTPStatusError):
+            errors[url] = f"upstream returned {result.response.status_code}"
+        elif isinstance(result, ValueError):
+            errors[url] = str(result)
+        elif isinstance(result, BaseException):
+            errors[url] = type(result).__name__
+        else:
+            media[url] = f"/api/media/{result}"
+    return {"media": media, "errors": errors}
+
+@app.get("/api/media/{digest}")
+async def get_media(digest: str, request: Request):
+    """Serve a cached image by content hash, with Range and conditional request support"""
+    entry = await media_proxy.get(digest) if DIGEST_PATTERN.fullmatch(digest) else None
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    etag = f'"{digest}"'
+    headers = {**MEDIA_HEADERS, "ETag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # Honour a Range only while the client's partial copy is this same content
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    size = entry['size']
+    try:
+        byte_range = parse_byte_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    try:
+        media_file = open(entry['path'], 'rb')
+    except FileNotFoundError:
+        # Evicted by another worker since the lookup
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return StreamingResponse(
+        MediaCache.iter_file(media_file, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=entry['content_type'],
+        headers=headers
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics, summed across workers in multi-process mode"""
+    registry = scrape_registry()
+    if registry is not REGISTRY:
+        # Cache, queue and rate limiter state is per worker; this is the worker answering the scrape
+        registry.register(ServiceStatsCollector())
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "firebase_connected": db is not None
+        "firebase_connected": firebase.db is not None,
+        "token_cache": oauth_service.token_cache.stats(),
+        "profile_cache": oauth_service.profile_cache.stats(),
+        "media_cache": media_proxy.stats(),
+        "token_writes": oauth_service.token_writes.stats(),
+        "upstream": oauth_service.rate_limiters.stats()
     }
 
-if __name__ == "__main__":
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness(request: Request):
+    """Readiness probe: 503 until startup, including Firebase, has finished"""
+    startup_seconds = getattr(request.app.state, 'startup_seconds', None)
+    if startup_seconds is None:
+        return JSONResponse({"ready": False}, status_code=503)
+
+    return {
+        "ready": True,
+        "startup_seconds": round(startup_seconds, 3),
+        "firebase_connected": firebase.db is not None
+    }
+
+def serve():
+    """Run the app under uvicorn: auto-reload in development, worker processes in production"""
+    import argparse
+    import tempfile
     import uvicorn
 
-    port = int(os.getenv("PORT", 8000))
+    parser = argparse.ArgumentParser(description="ThreadGems OAuth server")
+    parser.add_argument('--production', action='store_true',
+                        default=os.getenv('SERVER_ENV', 'development') == 'production',
+                        help="run worker processes without auto-reload (default with SERVER_ENV=production)")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '0')),
+                        help="worker processes in production (default: WEB_CONCURRENCY, else one per CPU)")
+    parser.add_argument('--port', type=int, default=int(os.getenv("PORT", 8000)))
+    args = parser.parse_args()
+
+    if not args.production:
+        uvicorn.run("oauth_server:app", host="0.0.0.0", port=args.port, reload=True, log_level="info")
+        return
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1:
+        # Workers inherit this and write their metrics there, so /metrics can sum them
+        os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='threadgems-metrics-'))
+
+    # 'auto' picks uvloop and httptools when installed (uvicorn[standard]), else asyncio and h11
     uvicorn.run(
         "oauth_server:app",
         host="0.0.0.0",
-        port=port,
-        reload=True,
+        port=args.port,
+        workers=workers,
+        loop="auto",
+        http="auto",
         log_level="info"
-    )
\ No newline at end of file
+    )
+
+if __name__ == "__main__":
+    serve()
\ No newline at end of file
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Adaptive Rate Limiting for Threads Graph API Calls
+
+Shared by update_data.py and oauth_server.py:
+- Paces requests using the usage percentages Meta reports in the
+  X-App-Usage / X-Business-Use-Case-Usage headers
+- Retries throttled and transient failures with jittered exponential
+  backoff, bounded by a retry budget
+- RateLimiterPool keeps one limiter per key, so the OAuth server can pace
+  each user's token on its own
+"""
+
+import json
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Hashable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Graph API error codes that mean "throttled", returned with a 4xx status
+THROTTLE_ERROR_CODES = {4, 17, 32, 613}
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+USAGE_HEADERS = ('x-app-usage', 'x-business-use-case-usage')
+
+
+class RetryBudget:
+    """Caps retries: `capacity` tokens, optionally refilled by successful requests.
+
+    With refill_per_success=0 this is a fixed per-run budget; with e.g. 0.1 a
+    long-running server can retry about one request in ten.
+    """
+
+    def __init__(self, capacity: float, refill_per_success: float = 0.0):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.refill_per_success = refill_per_success
+        self.spent = 0
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.spent += 1
+        return True
+
+    def record_success(self):
+        self.tokens = min(self.capacity, self.tokens + self.refill_per_success)
+
+    def reset(self):
+        self.tokens = self.capacity
+        self.spent = 0
+
+
+class RateLimited(httpx.HTTPError):
+    """The next request slot is further away than the limiter's `max_wait`"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class AdaptiveRateLimiter:
+    """Spaces out requests to keep reported API usage under a target percentage.
+
+    With `max_wait` set, a request that would wait longer than that for its
+    slot raises RateLimited instead of sleeping, e.g. while the API has asked
+    for a pause of several minutes.
+    """
+
+    def __init__(self, target_usage: float = 80.0, min_interval: float = 0.0, max_interval: float = 10.0,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0,
+                 retry_budget: Optional[RetryBudget] = None, adjust_period: float = 0.5,
+                 max_wait: Optional[float] = None):
+        self.target_usage = target_usage
+        self.max_wait = max_wait
+        self.adjust_period = adjust_period
+        self.last_adjusted = 0.0
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget or RetryBudget(capacity=50)
+
+        self.next_slot = 0.0
+        self.paused_until = 0.0
+        self.sent = deque()
+        self.last_usage: Optional[float] = None
+
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+
+    async def acquire(self):
+        """Wait for the next request slot"""
+        # No await between reading and claiming the slot, so no lock is needed
+        now = time.monotonic()
+        start = max(now, self.next_slot, self.paused_until)
+        if self.max_wait is not None and start - now > self.max_wait:
+            raise RateLimited(start - now)
+        self.next_slot = start + self.interval
+
+        self.sent.append(start)
+        self.prune_sent(now)
+
+        delay = start - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def prune_sent(self, now: float):
+        """Forget send times older than the one-second window"""
+        while self.sent and self.sent[0] < now - 1.0:
+            self.sent.popleft()
+
+    def observed_interval(self) -> float:
+        """Average gap between requests sent over the last second"""
+        self.prune_sent(time.monotonic())
+        return 1.0 / len(self.sent) if self.sent else self.max_interval
+
+    @staticmethod
+    def parse_usage(headers: httpx.Headers) -> Optional[Dict]:
+        """Highest usage percentage and any regain-access time from the usage headers"""
+        highest = None
+        regain_minutes = 0.0
+
+        for header in USAGE_HEADERS:
+            raw = headers.get(header)
+            if not raw:
+                continue
+            try:
+                usage = json.loads(raw)
+            except ValueError:
+                continue
+
+            # X-Business-Use-Case-Usage nests a list of entries per business ID
+            entries = [usage] if header == 'x-app-usage' else [
+                entry for values in usage.values() for entry in values
+            ]
+            for entry in entries:
+                for key in ('call_count', 'total_cputime', 'total_time'):
+                    if key in entry:
+                        highest = max(highest or 0.0, float(entry[key]))
+                regain_minutes = max(regain_minutes, float(entry.get('estimated_time_to_regain_access', 0)))
+
+        if highest is None:
+            return None
+        return {'usage': highest, 'regain_seconds': regain_minutes * 60}
+
+    def observe(self, response: httpx.Response):
+        """Adapt pacing to the usage the API reports"""
+        usage = self.parse_usage(response.headers)
+        if usage is None:
+            return
+
+        self.last_usage = usage['usage']
+        if usage['regain_seconds']:
+            self.paused_until = max(self.paused_until, time.monotonic() + usage['regain_seconds'])
+
+        if usage['usage'] >= self.target_usage:
+            # Scale the current rate down in proportion to the overshoot
+            self.slow_down(usage['usage'] / self.target_usage)
+        elif usage['usage'] < self.target_usage / 2:
+            self.speed_up()
+
+    def slow_down(self, factor: float = 2.0):
+        """Stretch the request interval by `factor`, at most once per adjust period"""
+        now = time.monotonic()
+        if now - self.last_adjusted < self.adjust_period:
+            return
+        self.last_adjusted = now
+
+        # Start from the pace actually achieved, which may be slower than the interval
+        current = max(self.interval, self.observed_interval())
+        self.interval = min(self.max_interval, max(current * max(factor, 1.25), 0.01))
+
+    def speed_up(self):
+        """Gradual decrease of the request interval when there is plenty of headroom"""
+        now = time.monotonic()
+        if now - self.last_adjusted < self.adjust_period:
+            return
+        self.last_adjusted = now
+        self.interval = max(self.min_interval, self.interval * 0.75 if self.interval > 0.01 else 0.0)
+
+    @staticmethod
+    def is_throttled(response: httpx.Response) -> bool:
+        if response.status_code == 429:
+            return True
+        if response.status_code in (400, 403):
+            try:
+                return response.json().get('error', {}).get('code') in THROTTLE_ERROR_CODES
+            except ValueError:
+                return False
+        return False
+
+    def backoff_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present"""
+        if response is not None and response.headers.get('retry-after', '').isdigit():
+            return min(self.max_delay, float(response.headers['retry-after']))
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def request(self, client: httpx.AsyncClient, method: str, url: str,
+                      idempotent: bool = True, **kwargs) -> httpx.Response:
+        """Send a request through the limiter, retrying throttled and transient failures.
+
+        Non-idempotent requests are only retried when throttled, since the API
+        rejected them before doing any work.
+        """
+        attempt = 0
+        while True:
+            await self.acquire()
+            self.requests += 1
+
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if not idempotent or not self.should_retry(attempt):
+                    raise
+                await asyncio.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self.observe(response)
+            throttled = self.is_throttled(response)
+            if throttled:
+                self.throttled += 1
+                # Slow everyone down, not just this request
+                self.slow_down()
+
+            retryable = throttled or (idempotent and response.status_code in RETRYABLE_STATUS_CODES)
+            if not retryable:
+                self.retry_budget.record_success()
+                return response
+
+            if not self.should_retry(attempt):
+                return response
+
+            delay = self.backoff_delay(attempt, response)
+            logger.warning(f"⏳ {method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def should_retry(self, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if not self.retry_budget.try_spend():
+            logger.warning("Retry budget exhausted, not retrying")
+            return False
+        self.retries += 1
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'retries': self.retries,
+            'retry_budget_remaining': self.retry_budget.tokens,
+            'interval_s': round(self.interval, 3),
+            'last_usage_pct': self.last_usage
+        }
+
+
+class RateLimiterPool:
+    """One AdaptiveRateLimiter (and retry budget) per key, kept for the most recently used keys.
+
+    Keyed by access token, a token that is throttled or told to wait for
+    regained access only slows down and pauses its own requests.
+    """
+
+    COUNTERS = ('requests', 'throttled', 'retries')
+
+    def __init__(self, factory: Callable[[], AdaptiveRateLimiter], max_size: int = 10000):
+        self.factory = factory
+        self.max_size = max_size
+        self.limiters: OrderedDict = OrderedDict()
+        # Counters of evicted limiters, so totals never go backwards
+        self.retired = dict.fromkeys(self.COUNTERS, 0)
+
+    def get(self, key: Hashable) -> AdaptiveRateLimiter:
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            limiter = self.limiters[key] = self.factory()
+        self.limiters.move_to_end(key)
+
+        while len(self.limiters) > self.max_size:
+            _, evicted = self.limiters.popitem(last=False)
+            for counter in self.COUNTERS:
+                self.retired[counter] += getattr(evicted, counter)
+        return limiter
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        limiters = list(self.limiters.values())
+        usages = [limiter.last_usage for limiter in limiters if limiter.last_usage is not None]
+        return {
+            **{counter: self.retired[counter] + sum(getattr(limiter, counter) for limiter in limiters)
+               for counter in self.COUNTERS},
+            'limiters': len(limiters),
+            'paused': sum(limiter.paused_until > now for limiter in limiters),
+            'retry_budget_exhausted': sum(limiter.retry_budget.tokens < 1 for limiter in limiters),
+            'max_interval_s': round(max((limiter.interval for limiter in limiters), default=0.0), 3),
+            'last_usage_pct': max(usages, default=None)
+        }
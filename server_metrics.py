@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics for the ThreadGems OAuth Server
+
+Metric objects and the ASGI middleware that records them. They live in their
+own module so they are registered once per process, even when uvicorn's
+reloader or worker processes import oauth_server.py a second time as the
+`__mp_main__` module.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR (oauth_server.py
+--production does) and /metrics sums the workers' values.
+"""
+
+import os
+import time
+from typing import Dict
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, multiprocess
+from starlette.routing import Match
+
+# Route labels use path templates so usernames never become labels
+REQUEST_LATENCY = Histogram(
+    'threadgems_http_request_duration_seconds', 'Request latency by route',
+    ['method', 'route']
+)
+REQUESTS = Counter(
+    'threadgems_http_requests_total', 'Responses by route and status code',
+    ['method', 'route', 'status']
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'threadgems_http_requests_in_flight', 'Requests currently being handled',
+    multiprocess_mode='livesum'
+)
+UPSTREAM_LATENCY = Histogram(
+    'threadgems_upstream_request_duration_seconds',
+    'Threads API call latency by endpoint, including rate limiter waits and retries',
+    ['endpoint']
+)
+UPSTREAM_REQUESTS = Counter(
+    'threadgems_upstream_requests_total', 'Threads API responses by endpoint and status code',
+    ['endpoint', 'status']
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    'threadgems_upstream_requests_in_flight', 'Threads API calls currently in progress',
+    multiprocess_mode='livesum'
+)
+FIRESTORE_WRITE_LATENCY = Histogram(
+    'threadgems_firestore_write_duration_seconds', 'Firestore write latency by operation',
+    ['operation']
+)
+FIRESTORE_WRITE_ERRORS = Counter(
+    'threadgems_firestore_write_errors_total', 'Failed Firestore writes by operation',
+    ['operation']
+)
+PROFILE_BATCH_RESULTS = Counter(
+    'threadgems_profile_batch_results_total', 'Per-username outcomes of batch profile requests',
+    ['outcome']
+)
+STARTUP_DURATION = Gauge(
+    'threadgems_startup_duration_seconds', 'Seconds from app startup until the readiness check passed',
+    multiprocess_mode='max'
+)
+
+
+def scrape_registry() -> CollectorRegistry:
+    """The registry to expose: the process's own, or every worker's in multi-process mode"""
+    if not os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def route_template(scope: Dict) -> str:
+    """The matched route's path template, e.g. /api/threads/profile/{username}"""
+    route = scope.get('route')
+    if route is None:
+        # Older Starlette versions do not record the matched route in the scope
+        for candidate in scope['app'].router.routes:
+            if candidate.matches(scope)[0] == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, 'path', '<unmatched>')
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight counts per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = route_template(scope)
+            REQUEST_LATENCY.labels(scope['method'], route).observe(time.perf_counter() - start)
+            REQUESTS.labels(scope['method'], route, str(status)).inc()
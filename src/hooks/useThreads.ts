@@ -1,4 +1,4 @@
-import { useQuery } from '@tanstack/react-query';
+import { useInfiniteQuery, useQuery } from '@tanstack/react-query';
 import { StaticThreadsService } from '@/services/staticThreads';
 import { Thread } from '@/types/threads';
 
@@ -21,6 +21,17 @@ export const useThreadsByType = (type: 'all' | 'text' | 'images') => {
   });
 };
 
+export const useThreadsPages = (type: 'all' | 'text' | 'images') => {
+  return useInfiniteQuery({
+    queryKey: ['threads', 'pages', type],
+    queryFn: ({ pageParam }) => StaticThreadsService.getThreadsPage(type, pageParam),
+    initialPageParam: 0,
+    getNextPageParam: (lastPage) => (lastPage.page + 1 < lastPage.totalPages ? lastPage.page + 1 : undefined),
+    staleTime: 60 * 60 * 1000, // 1 hour
+    retry: 2,
+  });
+};
+
 export const useRecentThreads = () => {
   return useQuery<Thread[], Error>({
     queryKey: ['threads', 'recent'],
@@ -3,20 +3,18 @@ import Header from "@/components/Header";
 import Footer from "@/components/Footer";
 import FilterButtons from "@/components/FilterButtons";
 import ThreadCard from "@/components/ThreadCard";
-import { useDesignThreads } from "@/hooks/useThreads";
+import { useThreadsPages } from "@/hooks/useThreads";
 import { Alert, AlertDescription } from "@/components/ui/alert";
+import { Button } from "@/components/ui/button";
 import { Loader2 } from "lucide-react";
 
 const Index = () => {
   const [activeFilter, setActiveFilter] = useState<"all" | "text" | "images">("all");
-  const { data: threads, isLoading, error, refetch } = useDesignThreads();
+  // One page of the selected view at a time, so first paint never waits for the whole dataset
+  const { data, isLoading, error, refetch, fetchNextPage, hasNextPage, isFetchingNextPage } =
+    useThreadsPages(activeFilter);
 
-  const filteredThreads = threads?.filter((thread) => {
-    if (activeFilter === "all") return true;
-    if (activeFilter === "text") return thread.type === "text";
-    if (activeFilter === "images") return thread.type === "image";
-    return true;
-  }) || [];
+  const threads = data?.pages.flatMap((page) => page.threads) || [];
 
   if (error) {
     return (
@@ -60,17 +58,26 @@ const Index = () => {
             <Loader2 className="h-8 w-8 animate-spin" />
             <span className="ml-2 text-muted-foreground">Loading design threads...</span>
           </div>
-        ) : filteredThreads.length === 0 ? (
+        ) : threads.length === 0 ? (
           <div className="text-center py-12">
             <p className="text-muted-foreground">No threads found for the selected filter.</p>
           </div>
         ) : (
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 max-w-7xl mx-auto">
-            {filteredThreads.map((thread) => (
+            {threads.map((thread) => (
               <ThreadCard key={thread.id} thread={thread} />
             ))}
           </div>
         )}
+
+        {hasNextPage && (
+          <div className="flex justify-center mt-12">
+            <Button variant="outline" onClick={() => fetchNextPage()} disabled={isFetchingNextPage}>
+              {isFetchingNextPage && <Loader2 className="h-4 w-4 animate-spin" />}
+              Load more
+            </Button>
+          </div>
+        )}
       </main>
       <Footer />
     </div>
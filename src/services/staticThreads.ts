@@ -5,6 +5,13 @@
 
 import { Thread } from '@/types/threads';
 
+interface DataPage {
+  file: string;
+  count: number;
+  bytes: number;
+  sha256: string;
+}
+
 interface DataManifest {
   generatedAt: string;
   totalThreads: number;
@@ -14,6 +21,14 @@ interface DataManifest {
   };
   sources: string[];
   nextUpdate: string;
+  pageSize?: number;
+  pages?: Record<'all' | 'text' | 'images', DataPage[]>;
+}
+
+export interface ThreadsPage {
+  threads: Thread[];
+  page: number;
+  totalPages: number;
 }
 
 export class StaticThreadsService {
@@ -114,6 +129,37 @@ export class StaticThreadsService {
     }
   }
 
+  /**
+   * Get one page of threads for a view; page files are content-addressed and
+   * cacheable forever. Falls back to the full file for older manifests.
+   */
+  static async getThreadsPage(type: 'all' | 'text' | 'images', page: number = 0): Promise<ThreadsPage> {
+    const manifest = await this.getManifest();
+    const pages = manifest?.pages?.[type];
+
+    if (!pages) {
+      const threads = page === 0 ? await this.getThreadsByType(type) : [];
+      return { threads, page, totalPages: 1 };
+    }
+
+    if (page >= pages.length) {
+      return { threads: [], page, totalPages: pages.length };
+    }
+
+    try {
+      const response = await fetch(`${this.BASE_URL}/${pages[page].file}`);
+      if (!response.ok) {
+        throw new Error(`Failed to fetch page: ${response.status}`);
+      }
+
+      const threads = await response.json();
+      return { threads: threads || [], page, totalPages: pages.length };
+    } catch (error) {
+      console.error(`Error fetching ${type} page ${page}:`, error);
+      return { threads: [], page, totalPages: pages.length };
+    }
+  }
+
   /**
    * Check if static data is fresh
    */
@@ -45,6 +45,8 @@ export interface Thread {
   timestamp: string;
   permalink: string;
   topic_tag?: string;
+  // Cross-posted copies of this thread on other accounts, published only here
+  duplicates?: { id: string; handle: string; permalink: string }[];
 }
 
 export interface ThreadsApiError {
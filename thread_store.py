@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Thread Storage Backends for ThreadGems
+
+Pluggable durable storage for curated threads:
+- FirestoreThreadStore: the `curated_threads` Firestore collection
+- SQLiteThreadStore: a local embedded database (WAL mode), queryable by
+  handle, type, topic tag and time range
+
+Both backends hash each thread's content and only write new or changed
+threads, and can hold the registry of accounts to crawl.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from firebase_admin import firestore
+
+logger = logging.getLogger(__name__)
+
+# Fields that change between runs without the thread itself changing
+VOLATILE_THREAD_FIELDS = ('likes', 'replies', 'fetched_at')
+
+
+def content_hash(thread: Dict) -> str:
+    """Hash the fields of a thread that represent its actual content"""
+    content = {k: v for k, v in thread.items() if k not in VOLATILE_THREAD_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ThreadStore(ABC):
+    """Interface for durable thread storage"""
+
+    name = 'store'
+
+    @abstractmethod
+    def upsert_threads(self, threads: List[Dict]) -> Dict[str, int]:
+        """Write new or changed threads, returning written and skipped counts"""
+
+    @abstractmethod
+    def query_threads(self, thread_type: Optional[str] = None, handle: Optional[str] = None,
+                      topic_tag: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Newest-first threads matching the filters; since/until bound the timestamp"""
+
+    @abstractmethod
+    def list_accounts(self) -> List[str]:
+        """Handles in the account registry that are still active"""
+
+    @abstractmethod
+    def register_accounts(self, handles: List[str]) -> int:
+        """Add or reactivate handles in the account registry, returning how many were written"""
+
+    def close(self):
+        pass
+
+
+class FirestoreThreadStore(ThreadStore):
+    """Threads in the `curated_threads` Firestore collection"""
+
+    name = 'firestore'
+
+    # Firestore rejects batches with more than 500 writes
+    BATCH_LIMIT = 500
+
+    def __init__(self, db, write_concurrency: int = 4):
+        self.db = db
+        self.write_concurrency = write_concurrency
+        self.collection_ref = db.collection('curated_threads')
+        self.accounts_ref = db.collection('tracked_accounts')
+
+    def fetch_stored_hashes(self, thread_ids: List[str]) -> Dict[str, str]:
+        """Read the content_hash of existing curated_threads documents"""
+        stored = {}
+        for start in range(0, len(thread_ids), self.BATCH_LIMIT):
+            refs = [self.collection_ref.document(thread_id) for thread_id in thread_ids[start:start + self.BATCH_LIMIT]]
+            for snapshot in self.db.get_all(refs, field_paths=['content_hash']):
+                if snapshot.exists:
+                    stored[snapshot.id] = (snapshot.to_dict() or {}).get('content_hash')
+        return stored
+
+    def upsert_threads(self, threads: List[Dict]) -> Dict[str, int]:
+        stored_hashes = self.fetch_stored_hashes([t['id'] for t in threads])
+
+        changed = []
+        for thread in threads:
+            thread_hash = content_hash(thread)
+            if stored_hashes.get(thread['id']) != thread_hash:
+                changed.append((thread, thread_hash))
+
+        def commit_chunk(chunk):
+            batch = self.db.batch()
+            for thread, thread_hash in chunk:
+                doc_ref = self.collection_ref.document(thread['id'])
+                thread_data = {
+                    **thread,
+                    'content_hash': thread_hash,
+                    'cached_at': firestore.SERVER_TIMESTAMP,
+                    'expires_at': datetime.now() + timedelta(hours=6)
+                }
+                batch.set(doc_ref, thread_data, merge=True)
+            batch.commit()
+
+        chunks = [
+            changed[start:start + self.BATCH_LIMIT]
+            for start in range(0, len(changed), self.BATCH_LIMIT)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, self.write_concurrency)) as executor:
+            list(executor.map(commit_chunk, chunks))
+
+        return {'written': len(changed), 'skipped': len(threads) - len(changed), 'batches': len(chunks)}
+
+    def query_threads(self, thread_type: Optional[str] = None, handle: Optional[str] = None,
+                      topic_tag: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        # Combined filters need matching composite indexes in Firestore
+        query = self.collection_ref
+        for field, value in (('type', thread_type), ('handle', handle), ('topic_tag', topic_tag)):
+            if value is not None:
+                query = query.where(field, '==', value)
+        if since is not None:
+            query = query.where('timestamp', '>=', since)
+        if until is not None:
+            query = query.where('timestamp', '<', until)
+
+        query = query.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit)
+        threads = []
+        for snapshot in query.stream():
+            thread = snapshot.to_dict()
+            for field in ('content_hash', 'cached_at', 'expires_at'):
+                thread.pop(field, None)
+            threads.append(thread)
+        return threads
+
+    def list_accounts(self) -> List[str]:
+        return sorted(
+            snapshot.id for snapshot in self.accounts_ref.stream()
+            if (snapshot.to_dict() or {}).get('active', True)
+        )
+
+    def register_accounts(self, handles: List[str]) -> int:
+        for start in range(0, len(handles), self.BATCH_LIMIT):
+            batch = self.db.batch()
+            for handle in handles[start:start + self.BATCH_LIMIT]:
+                batch.set(self.accounts_ref.document(handle), {
+                    'handle': handle,
+                    'active': True,
+                    'registered_at': firestore.SERVER_TIMESTAMP
+                }, merge=True)
+            batch.commit()
+        return len(handles)
+
+
+class SQLiteThreadStore(ThreadStore):
+    """Threads in a local SQLite database in WAL mode"""
+
+    name = 'sqlite'
+
+    # Stay well under SQLite's bound-parameter limit
+    CHUNK_SIZE = 500
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        # The daemon publishes from a worker thread; calls are never concurrent
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS threads (
+                id TEXT PRIMARY KEY,
+                handle TEXT NOT NULL,
+                type TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                topic_tag TEXT,
+                content_hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_threads_timestamp ON threads (timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_threads_handle ON threads (handle, timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_threads_type ON threads (type, timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_threads_topic_tag ON threads (topic_tag, timestamp DESC);
+            CREATE TABLE IF NOT EXISTS tracked_accounts (
+                handle TEXT PRIMARY KEY,
+                active INTEGER NOT NULL DEFAULT 1,
+                registered_at TEXT NOT NULL
+            );
+        ''')
+        self.conn.commit()
+
+    def fetch_stored_hashes(self, thread_ids: List[str]) -> Dict[str, str]:
+        stored = {}
+        for start in range(0, len(thread_ids), self.CHUNK_SIZE):
+            chunk = thread_ids[start:start + self.CHUNK_SIZE]
+            rows = self.conn.execute(
+                f"SELECT id, content_hash FROM threads WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            stored.update(rows)
+        return stored
+
+    def upsert_threads(self, threads: List[Dict]) -> Dict[str, int]:
+        stored_hashes = self.fetch_stored_hashes([t['id'] for t in threads])
+        now = datetime.now().isoformat()
+
+        rows = []
+        for thread in threads:
+            thread_hash = content_hash(thread)
+            if stored_hashes.get(thread['id']) != thread_hash:
+                rows.append((
+                    thread['id'], thread['handle'], thread['type'], thread['timestamp'],
+                    thread.get('topic_tag'), thread_hash, json.dumps(thread), now
+                ))
+
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO threads (id, handle, type, timestamp, topic_tag, content_hash, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    handle = excluded.handle,
+                    type = excluded.type,
+                    timestamp = excluded.timestamp,
+                    topic_tag = excluded.topic_tag,
+                    content_hash = excluded.content_hash,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+            ''', rows)
+
+        return {'written': len(rows), 'skipped': len(threads) - len(rows), 'batches': 1 if rows else 0}
+
+    def query_threads(self, thread_type: Optional[str] = None, handle: Optional[str] = None,
+                      topic_tag: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        clauses, params = [], []
+        for column, value in (('type', thread_type), ('handle', handle), ('topic_tag', topic_tag)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('timestamp < ?')
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self.conn.execute(
+            f"SELECT data FROM threads {where} ORDER BY timestamp DESC LIMIT ?",
+            params + [limit]
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def list_accounts(self) -> List[str]:
+        rows = self.conn.execute('SELECT handle FROM tracked_accounts WHERE active = 1 ORDER BY handle')
+        return [row[0] for row in rows]
+
+    def register_accounts(self, handles: List[str]) -> int:
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO tracked_accounts (handle, active, registered_at) VALUES (?, 1, ?)
+                ON CONFLICT(handle) DO UPDATE SET active = 1
+            ''', [(handle, now) for handle in handles])
+        return len(handles)
+
+    def close(self):
+        self.conn.close()
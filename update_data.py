@@ -10,20 +10,56 @@ A simple Python script to:
 
 Usage:
     python update_data.py
+    python update_data.py --incremental
+    python update_data.py --incremental --backfill-pages 10
+    python update_data.py --daemon
+    python update_data.py --profile
+    python update_data.py --stream
+    python update_data.py --accounts-file accounts.txt --workers 4
+    python update_data.py --accounts-file accounts.txt --shard 0/4    # on each machine, then:
+    python update_data.py --accounts-file accounts.txt --merge-shards
 """
 
 import os
+import re
+import sys
+import shutil
+import time
+import signal
+import statistics
+import gzip
 import json
+import string
+import sqlite3
+import tempfile
+import heapq
+import random
+import itertools
+import hashlib
 import logging
+import argparse
+import cProfile
+import subprocess
+import pstats
+from array import array
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 import asyncio
 
-import requests
+import httpx
 from dotenv import load_dotenv
 import firebase_admin
 from firebase_admin import credentials, firestore
 
+from rate_limiter import AdaptiveRateLimiter, RetryBudget
+from thread_store import ThreadStore, FirestoreThreadStore, SQLiteThreadStore, content_hash
+
+try:
+    import brotli
+except ImportError:  # Optional: .br siblings are skipped without it
+    brotli = None
+
 # Load environment variables
 load_dotenv()
 
@@ -34,16 +70,693 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class ThreadsDataUpdater:
+class DesignKeywordMatcher:
+    """Whole-word keyword matcher built once from the keyword list.
+
+    Single-word keywords (plus common inflections) go into one set, so each
+    post costs a tokenize and a set intersection no matter how many keywords
+    there are. Multi-word phrases are compiled into one prefix-sharing regex
+    that only runs when a post contains a phrase's first word.
+    """
+
+    SUFFIXES = ('', 's', 'es', 'ed', 'er', 'ers', 'ing')
+
+    # Punctuation becomes whitespace so 'ui/ux' and 'design,' tokenize cleanly
+    SEPARATORS = str.maketrans({char: ' ' for char in string.punctuation + '‘’“”—–…'})
+
+    # Joins posts in a batch; not whitespace, and removed from post text by search_text
+    POST_SEPARATOR = '\x00'
+
+    def __init__(self, keywords: List[str]):
+        keywords = {' '.join(keyword.lower().split()) for keyword in keywords}
+
+        self.terms = frozenset(
+            form
+            for keyword in keywords if ' ' not in keyword
+            for form in self.inflections(keyword)
+        )
+
+        # Phrases containing a single-word keyword already match through it
+        phrases = sorted(
+            keyword for keyword in keywords
+            if ' ' in keyword and self.terms.isdisjoint(keyword.split())
+        )
+        self.phrase_heads = frozenset(phrase.split()[0] for phrase in phrases)
+        self.phrase_pattern = re.compile(
+            rf"\b{self.build_trie_pattern(phrases)}(?:{'|'.join(self.SUFFIXES)})\b"
+        ) if phrases else None
+
+    @classmethod
+    def inflections(cls, word: str) -> List[str]:
+        """Word plus suffixed forms, dropping a trailing 'e' ('prototyping')"""
+        forms = [word + suffix for suffix in cls.SUFFIXES]
+        if word.endswith('e'):
+            forms.extend(word[:-1] + suffix for suffix in ('ed', 'er', 'ers', 'ing'))
+        return forms
+
+    @staticmethod
+    def build_trie_pattern(words: List[str]) -> str:
+        """Build a regex alternation that shares common prefixes between keywords"""
+        trie = {}
+        for word in words:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node: Dict) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+
+            pattern = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+            if '' in node:
+                pattern = f"(?:{pattern})?"
+            return pattern
+
+        return f"(?:{build(trie)})"
+
+    @classmethod
+    def search_text(cls, post: Dict) -> str:
+        """Text of a post that is searched for keywords, without batch separators"""
+        text = f"{post.get('text') or ''} {post.get('topic_tag') or ''}"
+        return text.replace(cls.POST_SEPARATOR, ' ')
+
+    def matches_tokens(self, tokens: List[str]) -> bool:
+        """Check already lowercased, punctuation-free tokens for a keyword"""
+        if not self.terms.isdisjoint(tokens):
+            return True
+
+        if self.phrase_pattern and not self.phrase_heads.isdisjoint(tokens):
+            return self.phrase_pattern.search(' '.join(tokens)) is not None
+
+        return False
+
+    def matches(self, text: str) -> bool:
+        """Check whether text contains any keyword"""
+        return self.matches_tokens(text.lower().translate(self.SEPARATORS).split())
+
+    def classify_batch(self, posts: List[Dict]) -> List[bool]:
+        """Classify a page of posts, lowercasing and tokenizing the page in one pass"""
+        corpus = self.POST_SEPARATOR.join(self.search_text(post) for post in posts)
+        corpus = corpus.lower().translate(self.SEPARATORS)
+
+        return [self.matches_tokens(text.split()) for text in corpus.split(self.POST_SEPARATOR)] if posts else []
+
+class ThreadIndex:
+    """Persistent index of every thread ID the updater has published.
+
+    Records first-seen and last-seen times plus a tombstone for threads that
+    disappeared, so deletion detection is a set difference against the index
+    instead of a reload of the last dataset.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS thread_index (
+                id TEXT PRIMARY KEY,
+                handle TEXT,
+                permalink TEXT,
+                timestamp TEXT,
+                first_seen TEXT NOT NULL,
+                last_seen TEXT NOT NULL,
+                deleted_at TEXT
+            )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_thread_index_live ON thread_index (deleted_at)'
+        )
+        self.conn.commit()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute('SELECT 1 FROM thread_index LIMIT 1').fetchone() is None
+
+    def live_ids(self) -> set:
+        rows = self.conn.execute('SELECT id FROM thread_index WHERE deleted_at IS NULL')
+        return {row[0] for row in rows}
+
+    def record_seen(self, threads: List[Dict], seen_at: str):
+        """Upsert threads as seen now, clearing any tombstone"""
+        self.conn.executemany('''
+            INSERT INTO thread_index (id, handle, permalink, timestamp, first_seen, last_seen, deleted_at)
+            VALUES (?, ?, ?, ?, ?, ?, NULL)
+            ON CONFLICT(id) DO UPDATE SET
+                handle = excluded.handle,
+                permalink = excluded.permalink,
+                timestamp = excluded.timestamp,
+                last_seen = excluded.last_seen,
+                deleted_at = NULL
+        ''', [
+            (t['id'], t.get('handle'), t.get('permalink'), t.get('timestamp'), seen_at, seen_at)
+            for t in threads
+        ])
+
+    def unseen_since(self, seen_at: str) -> List[str]:
+        """Live thread IDs not recorded as seen at or after `seen_at`"""
+        rows = self.conn.execute(
+            'SELECT id FROM thread_index WHERE deleted_at IS NULL AND last_seen < ? ORDER BY id', (seen_at,)
+        )
+        return [row[0] for row in rows]
+
+    def mark_deleted(self, thread_ids: List[str], deleted_at: str) -> List[Dict]:
+        """Tombstone threads and return their index records"""
+        self.conn.executemany(
+            'UPDATE thread_index SET deleted_at = ? WHERE id = ?',
+            [(deleted_at, thread_id) for thread_id in thread_ids]
+        )
+
+        records = []
+        for start in range(0, len(thread_ids), 500):
+            chunk = thread_ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT id, handle, permalink, timestamp, first_seen, last_seen "
+                f"FROM thread_index WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            records.extend(
+                dict(zip(('id', 'handle', 'permalink', 'timestamp', 'first_seen', 'last_seen'), row))
+                for row in rows
+            )
+        return records
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+class NearDuplicateIndex:
+    """MinHash signatures of thread text with a banded LSH index, persisted in SQLite.
+
+    Each text is reduced to word 3-gram shingles and a MinHash signature of
+    NUM_PERM values, cut into BANDS bands. Threads sharing every value of a
+    band land in the same bucket and become candidates; a candidate is a
+    near-duplicate when the signatures agree on at least `threshold` of their
+    values, an estimate of the shingles' Jaccard similarity. Only threads that
+    share a bucket are ever compared, and signatures are reused until a
+    thread's text changes.
+    """
+
+    NUM_PERM = 64
+    BANDS = 16
+    MASK = (1 << 64) - 1
+
+    def __init__(self, path: str, threshold: float = 0.8, min_words: int = 5):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.threshold = threshold
+        self.min_words = min_words
+        self.rows = self.NUM_PERM // self.BANDS
+
+        # Multiply-shift hash functions with odd multipliers, from a fixed seed: stored
+        # signatures are only comparable under the same functions
+        rng = random.Random(self.NUM_PERM)
+        self.permutations = [(rng.getrandbits(64) | 1, rng.getrandbits(64)) for _ in range(self.NUM_PERM)]
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS signatures (
+                id TEXT PRIMARY KEY,
+                handle TEXT,
+                permalink TEXT,
+                timestamp TEXT,
+                type TEXT,
+                text_hash TEXT NOT NULL,
+                signature BLOB
+            );
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_lsh_buckets_bucket ON lsh_buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS idx_lsh_buckets_id ON lsh_buckets (id);
+            CREATE TEMP TABLE current_ids (id TEXT PRIMARY KEY);
+        ''')
+        self.hashed = 0
+        self.reused = 0
+
+    def shingles(self, text: str) -> set:
+        words = re.findall(r'\w+', text.lower())
+        if len(words) < self.min_words:
+            return set()
+        return {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+    def signature(self, text: str) -> Optional[array]:
+        """MinHash signature of a text, or None when it is too short to compare"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = [
+            int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest(), 'big')
+            for s in shingles
+        ]
+        # The top 32 bits of each 64-bit hash are the well-mixed ones
+        return array('I', (min([(a * h + b) & self.MASK for h in hashes]) >> 32 for a, b in self.permutations))
+
+    def buckets(self, signature: array) -> List[Tuple[int, int]]:
+        """(band, bucket) pairs, the bucket being a signed 64-bit hash of the band's values"""
+        buckets = []
+        for band in range(self.BANDS):
+            values = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(values, digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+        return buckets
+
+    def add(self, threads: List[Dict]):
+        """Include threads in this run's grouping, hashing only new or edited text"""
+        stored = {}
+        ids = [t['id'] for t in threads]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            stored.update(self.conn.execute(
+                f"SELECT id, text_hash FROM signatures WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+
+        changed, bucket_rows = [], []
+        for thread in threads:
+            text = thread.get('content') or ''
+            text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+            if stored.get(thread['id']) == text_hash:
+                self.reused += 1
+                continue
+
+            self.hashed += 1
+            signature = self.signature(text)
+            changed.append((
+                thread['id'], thread.get('handle'), thread.get('permalink'), thread.get('timestamp'),
+                thread.get('type'), text_hash, signature.tobytes() if signature is not None else None
+            ))
+            if signature is not None:
+                bucket_rows.extend((band, bucket, thread['id']) for band, bucket in self.buckets(signature))
+
+        self.conn.executemany('DELETE FROM lsh_buckets WHERE id = ?', [(row[0],) for row in changed])
+        self.conn.executemany('''
+            INSERT INTO signatures (id, handle, permalink, timestamp, type, text_hash, signature)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                handle = excluded.handle,
+                permalink = excluded.permalink,
+                timestamp = excluded.timestamp,
+                type = excluded.type,
+                text_hash = excluded.text_hash,
+                signature = excluded.signature
+        ''', changed)
+        self.conn.executemany('INSERT INTO lsh_buckets (band, bucket, id) VALUES (?, ?, ?)', bucket_rows)
+        self.conn.executemany('INSERT OR IGNORE INTO current_ids (id) VALUES (?)', [(i,) for i in ids])
+
+    def groups(self) -> List[List[Dict]]:
+        """Groups of two or more near-duplicate threads among those added this run"""
+        buckets = self.conn.execute('''
+            SELECT group_concat(b.id, char(31)) FROM lsh_buckets b JOIN current_ids c ON c.id = b.id
+            GROUP BY b.band, b.bucket HAVING COUNT(*) > 1
+        ''')
+
+        signatures: Dict[str, Tuple[str, array]] = {}
+        parent: Dict[str, str] = {}
+
+        def load(ids: List[str]):
+            missing = [i for i in ids if i not in signatures]
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                for thread_id, thread_type, blob in self.conn.execute(
+                    f"SELECT id, type, signature FROM signatures WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ):
+                    signatures[thread_id] = (thread_type, array('I', blob))
+
+        def find(thread_id: str) -> str:
+            while parent.get(thread_id, thread_id) != thread_id:
+                thread_id = parent[thread_id]
+            return thread_id
+
+        def similar(a: str, b: str) -> bool:
+            (type_a, sig_a), (type_b, sig_b) = signatures[a], signatures[b]
+            agree = sum(1 for x, y in zip(sig_a, sig_b) if x == y)
+            return type_a == type_b and agree >= self.threshold * self.NUM_PERM
+
+        for (members,) in buckets.fetchall():
+            members = sorted(members.split('\x1f'))
+            load(members)
+            # Compare against one representative per group found in this bucket, so a
+            # bucket of copies of one post costs a linear number of comparisons
+            representatives: List[str] = []
+            for thread_id in members:
+                for representative in representatives:
+                    if similar(thread_id, representative):
+                        root_a, root_b = find(thread_id), find(representative)
+                        if root_a != root_b:
+                            parent[max(root_a, root_b)] = min(root_a, root_b)
+                        break
+                else:
+                    representatives.append(thread_id)
+
+        clusters: Dict[str, List[str]] = {}
+        for thread_id in parent:
+            clusters.setdefault(find(thread_id), []).append(thread_id)
+        for root, members in clusters.items():
+            if root not in members:
+                members.append(root)
+
+        groups = []
+        for members in clusters.values():
+            rows = self.conn.execute(
+                f"SELECT id, handle, permalink, timestamp, type FROM signatures "
+                f"WHERE id IN ({','.join('?' * len(members))})", members
+            )
+            groups.append([dict(zip(('id', 'handle', 'permalink', 'timestamp', 'type'), row)) for row in rows])
+        return groups
+
+    def prune(self):
+        """Forget threads not added this run, i.e. no longer in the dataset"""
+        self.conn.execute('DELETE FROM lsh_buckets WHERE id NOT IN (SELECT id FROM current_ids)')
+        self.conn.execute('DELETE FROM signatures WHERE id NOT IN (SELECT id FROM current_ids)')
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+class DatasetDiff:
+    """Added, updated and removed threads between the previous dataset and the threads
+    streamed past add(), kept in a temporary SQLite file so neither is held in memory.
+
+    Threads compare as whole records, as in diff_threads(), and each list
+    keeps the order a batch run's diff would have.
+    """
+
+    KINDS = ('added', 'updated', 'removed')
+
+    def __init__(self, path: str, previous: Iterable[Dict]):
+        self.path = path
+        if os.path.exists(path):
+            os.remove(path)
+        self.conn = sqlite3.connect(path)
+        # Scratch data for one run: durability would only cost time
+        self.conn.execute('PRAGMA journal_mode=OFF')
+        self.conn.execute('PRAGMA synchronous=OFF')
+        self.conn.executescript('''
+            CREATE TABLE previous (
+                id TEXT PRIMARY KEY,
+                record_hash TEXT NOT NULL,
+                seen INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                record TEXT NOT NULL
+            );
+        ''')
+
+        batch = []
+        for thread in previous:
+            batch.append((thread['id'], self.record_hash(thread)))
+            if len(batch) >= 1000:
+                self.conn.executemany('INSERT OR REPLACE INTO previous (id, record_hash) VALUES (?, ?)', batch)
+                batch = []
+        self.conn.executemany('INSERT OR REPLACE INTO previous (id, record_hash) VALUES (?, ?)', batch)
+        self.pending: List[Dict] = []
+
+    @staticmethod
+    def record_hash(thread: Dict) -> str:
+        return hashlib.sha256(json.dumps(thread, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def add(self, thread: Dict):
+        self.pending.append(thread)
+        if len(self.pending) >= 1000:
+            self.flush()
+
+    def flush(self):
+        """Classify the buffered threads against the previous dataset"""
+        threads, self.pending = self.pending, []
+        if not threads:
+            return
+        ids = [t['id'] for t in threads]
+        previous = dict(self.conn.execute(
+            f"SELECT id, record_hash FROM previous WHERE id IN ({','.join('?' * len(ids))})", ids
+        ))
+
+        changes = []
+        for thread in threads:
+            previous_hash = previous.get(thread['id'])
+            if previous_hash is None:
+                changes.append(('added', json.dumps(thread)))
+            elif previous_hash != self.record_hash(thread):
+                changes.append(('updated', json.dumps(thread)))
+        self.conn.executemany('INSERT INTO changes (kind, record) VALUES (?, ?)', changes)
+        self.conn.executemany('UPDATE previous SET seen = 1 WHERE id = ?', [(i,) for i in previous])
+
+    def counts(self) -> Dict[str, int]:
+        self.flush()
+        counts = dict.fromkeys(self.KINDS, 0)
+        counts.update(self.conn.execute('SELECT kind, COUNT(*) FROM changes GROUP BY kind'))
+        counts['removed'] = self.conn.execute('SELECT COUNT(*) FROM previous WHERE seen = 0').fetchone()[0]
+        return counts
+
+    def iter_kind(self, kind: str) -> Iterator:
+        """Thread records for 'added' and 'updated', thread IDs for 'removed'"""
+        self.flush()
+        if kind == 'removed':
+            return (row[0] for row in self.conn.execute('SELECT id FROM previous WHERE seen = 0 ORDER BY rowid'))
+        rows = self.conn.execute('SELECT record FROM changes WHERE kind = ? ORDER BY seq', (kind,))
+        return (json.loads(row[0]) for row in rows)
+
+    def close(self):
+        self.conn.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class DeletionLog:
+    """Append-only NDJSON deletion log that rotates once it reaches a size limit"""
+
+    def __init__(self, path: str, max_bytes: int, backups: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    def rotate(self):
+        for n in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{n}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{n + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def append(self, entries: List[Dict]):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self.rotate()
+
+        with open(self.path, 'a') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+class StreamingArtifact:
+    """Writes an artifact incrementally along with its .gz/.br siblings.
+
+    Content goes to temp files that are renamed into place on close, so
+    readers never see a partial file and nothing is buffered whole.
+    """
+
+    def __init__(self, path: str, brotli_quality: int):
+        self.path = path
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+        self.temp_paths = {}
+        self.files = {}
+        for suffix in ('', '.gz') + (('.br',) if brotli is not None else ()):
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.', suffix='.tmp')
+            self.temp_paths[suffix] = temp_path
+            self.files[suffix] = os.fdopen(fd, 'wb')
+
+        # Empty filename and mtime=0 keep the gzip output identical for identical content
+        self.gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self.files['.gz'], compresslevel=9, mtime=0)
+        self.brotli = (
+            brotli.Compressor(mode=brotli.MODE_TEXT, quality=brotli_quality) if brotli is not None else None
+        )
+
+    def write(self, content: bytes):
+        self.sha256.update(content)
+        self.bytes += len(content)
+        self.files[''].write(content)
+        self.gzip.write(content)
+        if self.brotli is not None:
+            self.files['.br'].write(self.brotli.process(content))
+
+    def close(self) -> Dict:
+        """Finish compression and move the files into place, returning size and hash"""
+        self.gzip.close()
+        if self.brotli is not None:
+            self.files['.br'].write(self.brotli.finish())
+        for f in self.files.values():
+            f.close()
+
+        info = {'bytes': self.bytes, 'sha256': self.sha256.hexdigest()}
+        sizes = {'.gz': 'gzipBytes', '.br': 'brotliBytes'}
+        for suffix, temp_path in self.temp_paths.items():
+            if suffix:
+                info[sizes[suffix]] = os.path.getsize(temp_path)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path + suffix)
+        return info
+
+    def abort(self):
+        for f in self.files.values():
+            f.close()
+        for temp_path in self.temp_paths.values():
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+class JSONArrayWriter:
+    """Streams records as a JSON array, byte-identical to serializing the whole list"""
+
+    def __init__(self, artifact: StreamingArtifact, compact: bool):
+        self.artifact = artifact
+        self.compact = compact
+        self.count = 0
+
+    def write(self, record: Dict):
+        if self.compact:
+            encoded = json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+            prefix = ',' if self.count else '['
+        else:
+            encoded = '\n'.join('  ' + line for line in json.dumps(record, indent=2).split('\n'))
+            prefix = ',\n' if self.count else '[\n'
+        self.artifact.write((prefix + encoded).encode('utf-8'))
+        self.count += 1
+
+    def close(self) -> Dict:
+        if not self.count:
+            self.artifact.write(b'[]')
+        else:
+            self.artifact.write(b']' if self.compact else b'\n]')
+        return self.artifact.close()
+
+class NDJSONWriter:
+    """Streams records as newline-delimited JSON, one compact record per line"""
+
+    def __init__(self, artifact: StreamingArtifact):
+        self.artifact = artifact
+        self.count = 0
+
+    def write(self, record: Dict):
+        self.artifact.write((json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n').encode('utf-8'))
+        self.count += 1
+
+    def close(self) -> Dict:
+        return self.artifact.close()
+
+class RunTimer:
+    """Wall-clock time per pipeline stage and per account for one run.
+
+    Stage time accumulates across calls, e.g. 'filter' is summed over every
+    account's posts. A stage that encloses other timed stages lists them in
+    `exclude`, so their time is not counted twice and the shares add up.
+    """
+
     def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.accounts: Dict[str, Dict] = {}
+
+    @contextmanager
+    def stage(self, name: str, exclude: Tuple[str, ...] = ()):
+        start = time.perf_counter()
+        nested_before = sum(self.stages.get(nested, 0.0) for nested in exclude)
+        try:
+            yield
+        finally:
+            nested = sum(self.stages.get(nested, 0.0) for nested in exclude) - nested_before
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start - nested
+
+    def record_account(self, account: str, **fields):
+        self.accounts.setdefault(account, {}).update(fields)
+
+    def report(self) -> Dict:
+        total = time.perf_counter() - self.started
+        slowest = sorted(self.accounts.items(), key=lambda item: item[1].get('fetch_s', 0.0), reverse=True)
+        return {
+            'total_s': round(total, 4),
+            'stages': {
+                name: {'seconds': round(seconds, 4), 'share': round(seconds / total, 4) if total else 0.0}
+                for name, seconds in self.stages.items()
+            },
+            'accounts': {account: fields for account, fields in slowest}
+        }
+
+class ThreadsDataUpdater:
+    # Stages timed inside spool_accounts(), which the enclosing 'fetch' stage must not count again
+    SPOOL_STAGES = ('spool', 'media', 'filter', 'transform')
+
+    def __init__(self, incremental: bool = False, backfill_pages: int = 0, db=None, compact_json: bool = False,
+                 store: Optional[ThreadStore] = None, profile: bool = False, stream: bool = False,
+                 accounts_file: Optional[str] = None, shard: Optional[Tuple[int, int]] = None,
+                 merge_shards: bool = False):
         self.threads_token = os.getenv('THREADS_ACCESS_TOKEN')
         self.threads_base_url = os.getenv('THREADS_API_BASE_URL', 'https://graph.threads.net/v1.0')
 
+        # Fetch engine settings: max in-flight requests and per-request timeout (seconds)
+        self.fetch_concurrency = int(os.getenv('THREADS_FETCH_CONCURRENCY', '8'))
+        self.request_timeout = float(os.getenv('THREADS_REQUEST_TIMEOUT', '10'))
+
+        # Quota-aware pacing and retries, with a fixed retry budget per run
+        self.rate_limiter = AdaptiveRateLimiter(
+            target_usage=float(os.getenv('THREADS_UPDATER_TARGET_USAGE', '80')),
+            max_retries=int(os.getenv('THREADS_UPDATER_MAX_RETRIES', '4')),
+            max_delay=float(os.getenv('THREADS_UPDATER_MAX_RETRY_DELAY', '30')),
+            retry_budget=RetryBudget(capacity=int(os.getenv('THREADS_UPDATER_RETRY_BUDGET', '50')))
+        )
+
+        # Incremental crawling: only fetch posts newer than each account's watermark,
+        # optionally following `after` cursors deeper into history for backfills
+        self.incremental = incremental
+        self.backfill_pages = backfill_pages
+        self.max_pages = int(os.getenv('THREADS_MAX_PAGES', '5'))
+        self.state_dir = os.getenv('THREADS_STATE_DIR', '.threadgems')
+        self.watermarks_path = os.path.join(self.state_dir, 'watermarks.json')
+        self.thread_index_path = os.path.join(self.state_dir, 'thread_index.sqlite3')
+        self.deletion_log = DeletionLog(
+            os.path.join(self.state_dir, 'deletions.log'),
+            max_bytes=int(os.getenv('THREADS_DELETION_LOG_MAX_BYTES', str(5 * 1024 * 1024))),
+            backups=int(os.getenv('THREADS_DELETION_LOG_BACKUPS', '3'))
+        )
+        self.watermarks = self.load_watermarks() if incremental else {}
+        self.pending_watermarks = {}
+
         if not self.threads_token:
             raise ValueError("THREADS_ACCESS_TOKEN not found in environment")
 
-        # Initialize Firebase
-        self.init_firebase()
+        # Initialize Firebase, unless a client (e.g. a local fake) was passed in
+        if db is not None:
+            self.db = db
+        else:
+            self.init_firebase()
+        self.firestore_write_concurrency = int(os.getenv('FIRESTORE_WRITE_CONCURRENCY', '4'))
+        self.store = store if store is not None else self.init_store()
+
+        # Static output: compact JSON drops pretty-printing whitespace
+        self.output_dir = 'public/data'
+        self.compact_json = compact_json
+        self.page_size = int(os.getenv('THREADS_PAGE_SIZE', '50'))
+        self.delta_depth = int(os.getenv('THREADS_DELTA_DEPTH', '20'))
+        # Streaming mode: per-account spool files merged newest-first, so memory
+        # stays bounded by the largest account rather than the whole dataset
+        self.stream = stream
+        self.spool_dir = os.path.join(self.state_dir, 'spool')
+        self.merge_fan_in = int(os.getenv('THREADS_MERGE_FAN_IN', '128'))
+
+        # Brotli's top qualities (10-11) are 20-70x slower for ~15% smaller files
+        self.brotli_quality = int(os.getenv('THREADS_BROTLI_QUALITY', '9'))
+
+        # Media proxy (oauth_server.py /api/media): image and avatar URLs are rewritten
+        # to its content-addressed copies, pre-warming its cache with new media
+        self.media_proxy_url = os.getenv('THREADS_MEDIA_PROXY_URL', '').rstrip('/')
+        self.media_proxy_token = os.getenv('MEDIA_PROXY_TOKEN', '')
+        self.proxied_media_prefix = f"{self.media_proxy_url}/api/media/"
 
         # Design-related keywords for filtering
         self.design_keywords = [
@@ -52,9 +765,78 @@ class ThreadsDataUpdater:
             'mockup', 'prototype', 'figma', 'sketch', 'adobe', 'illustration',
             'graphic', 'web design', 'app design', 'mobile design'
         ]
+        self.keyword_matcher = DesignKeywordMatcher(self.design_keywords)
+
+        # Near-duplicate grouping: cross-posted copies of a thread are published once,
+        # as the earliest copy listing the others under `duplicates`
+        self.dedupe = os.getenv('THREADS_DEDUPE', 'true').lower() != 'false'
+        self.dedupe_threshold = float(os.getenv('THREADS_DEDUPE_THRESHOLD', '0.8'))
+        self.dedupe_min_words = int(os.getenv('THREADS_DEDUPE_MIN_WORDS', '5'))
+        self.near_duplicates_path = os.path.join(self.state_dir, 'near_duplicates.sqlite3')
+        # The copies left out of the last dataset, so incremental and daemon runs that
+        # start from it can group them with their canonical thread again
+        self.near_duplicate_copies_path = os.path.join(self.state_dir, 'near_duplicate_copies.ndjson')
+
+        # Accounts to crawl: a registry file, the store's registry, or the official Meta accounts
+        self.accounts_file = accounts_file or os.getenv('THREADS_ACCOUNTS_FILE')
+        self.target_accounts = self.load_target_accounts()
+
+        # Sharded crawling: each shard spools the accounts that hash to it, and a
+        # merge step publishes the combined output
+        self.shard = shard
+        self.merge_shards_mode = merge_shards
+        self.shards_dir = os.path.join(self.state_dir, 'shards')
+        if shard is not None:
+            index, count = shard
+            self.target_accounts = [a for a in self.target_accounts if self.shard_of(a, count) == index]
+            self.shard_dir = os.path.join(self.shards_dir, f"{index}-of-{count}")
+            self.spool_dir = os.path.join(self.shard_dir, 'spool')
+
+        # Run instrumentation: stage timings always, a CPU profile with --profile
+        self.timer = RunTimer()
+        self.profile = profile
+        self.profile_hotspots = int(os.getenv('THREADS_PROFILE_HOTSPOTS', '25'))
+
+    @staticmethod
+    def read_accounts_file(path: str) -> List[str]:
+        """Handles from a text file (one per line, # comments) or a JSON list"""
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                raw = [entry['handle'] if isinstance(entry, dict) else entry for entry in json.load(f)]
+            else:
+                raw = [line.split('#', 1)[0] for line in f]
+
+        handles = []
+        seen = set()
+        for handle in raw:
+            handle = handle.strip().lstrip('@')
+            if handle and handle.lower() not in seen:
+                seen.add(handle.lower())
+                handles.append(handle)
+        return handles
+
+    def load_target_accounts(self) -> List[str]:
+        """Accounts from the registry file, the store's registry, or the official Meta accounts"""
+        if self.accounts_file:
+            handles = self.read_accounts_file(self.accounts_file)
+            logger.info(f"📒 Loaded {len(handles)} accounts from {self.accounts_file}")
+            return handles
+
+        if os.getenv('THREADS_ACCOUNTS_SOURCE', 'default').lower() == 'store':
+            if not self.store:
+                raise ValueError("THREADS_ACCOUNTS_SOURCE=store needs a thread store")
+            handles = self.store.list_accounts()
+            logger.info(f"📒 Loaded {len(handles)} accounts from the {self.store.name} registry")
+            return handles
 
         # Official Meta accounts to pull from
-        self.target_accounts = ['meta', 'threads', 'instagram', 'facebook']
+        return ['meta', 'threads', 'instagram', 'facebook']
+
+    @staticmethod
+    def shard_of(account: str, count: int) -> int:
+        """Stable shard for an account, the same in every process, machine and run"""
+        digest = hashlib.sha256(account.lower().encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') % count
 
     def init_firebase(self):
         """Initialize Firebase Admin SDK"""
@@ -84,34 +866,176 @@ class ThreadsDataUpdater:
             logger.warning(f"Firebase initialization failed: {e}")
             self.db = None
 
-    def fetch_profile_posts(self, username: str, limit: int = 25) -> List[Dict]:
-        """Fetch posts from a specific Threads profile"""
+    async def fetch_profile_page(self, client: httpx.AsyncClient, username: str, limit: int = 25,
+                                 after: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch one page of profile posts, returning the posts and the `after` cursor"""
         params = {
             'access_token': self.threads_token,
             'username': username,
             'fields': 'id,media_product_type,media_type,media_url,permalink,username,text,topic_tag,timestamp,shortcode,thumbnail_url,is_quote_post',
             'limit': limit
         }
+        if after:
+            params['after'] = after
 
+        response = await self.rate_limiter.request(client, 'GET', f"{self.threads_base_url}/profile_posts", params=params)
+        response.raise_for_status()
+
+        data = response.json()
+        next_after = data.get('paging', {}).get('cursors', {}).get('after')
+        return data.get('data', []), next_after
+
+    async def fetch_profile_posts(self, client: httpx.AsyncClient, username: str, limit: int = 25) -> List[Dict]:
+        """Fetch posts from a specific Threads profile"""
         try:
             logger.info(f"📥 Fetching posts from @{username}")
-            response = requests.get(f"{self.threads_base_url}/profile_posts", params=params)
-            response.raise_for_status()
-
-            data = response.json()
-            posts = data.get('data', [])
+            posts, _ = await self.fetch_profile_page(client, username, limit=limit)
 
             logger.info(f"✅ Retrieved {len(posts)} posts from @{username}")
             return posts
 
-        except requests.exceptions.RequestException as e:
+        # ValueError: a response body that is not JSON
+        except (httpx.HTTPError, ValueError) as e:
             logger.error(f"❌ Failed to fetch posts from @{username}: {e}")
             return []
 
+    async def fetch_profile_incremental(self, client: httpx.AsyncClient, username: str, limit: int = 25) -> List[Dict]:
+        """Fetch only posts newer than the account's watermark, plus any backfill pages"""
+        watermark = self.watermarks.get(username, {})
+        latest_timestamp = watermark.get('latest_timestamp')
+        seen_ids = set(watermark.get('seen_ids', []))
+
+        try:
+            logger.info(f"📥 Fetching new posts from @{username} (since {latest_timestamp or 'beginning'})")
+
+            # Catch up from the newest post until we reach content we already have
+            new_posts = []
+            after = None
+            for _ in range(self.max_pages):
+                posts, after = await self.fetch_profile_page(client, username, limit=limit, after=after)
+                fresh = [
+                    post for post in posts
+                    if post['id'] not in seen_ids
+                    and (latest_timestamp is None or post['timestamp'] >= latest_timestamp)
+                ]
+                new_posts.extend(fresh)
+
+                if latest_timestamp is None or len(fresh) < len(posts) or not after:
+                    break
+
+            # Walk older history from where the last backfill stopped
+            backfill_posts = []
+            backfill_after = watermark.get('backfill_after')
+            backfill_complete = watermark.get('backfill_complete', False)
+            if self.backfill_pages and not backfill_complete:
+                # The first backfill starts after the newest page we just read
+                cursor = backfill_after or after
+                for _ in range(self.backfill_pages):
+                    if not cursor:
+                        backfill_complete = True
+                        break
+                    posts, cursor = await self.fetch_profile_page(client, username, limit=limit, after=cursor)
+                    backfill_posts.extend(posts)
+                backfill_after = cursor
+                logger.info(f"⏪ Backfilled {len(backfill_posts)} older posts from @{username}")
+
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error(f"❌ Failed to fetch posts from @{username}: {e}")
+            return []
+
+        if new_posts:
+            newest = max(new_posts, key=lambda post: post['timestamp'])
+            latest_timestamp = newest['timestamp']
+            seen_ids = {post['id'] for post in new_posts if post['timestamp'] == latest_timestamp}
+
+        self.pending_watermarks[username] = {
+            'latest_timestamp': latest_timestamp,
+            'seen_ids': sorted(seen_ids),
+            'backfill_after': backfill_after,
+            'backfill_complete': backfill_complete,
+            'updated_at': datetime.now().isoformat()
+        }
+
+        logger.info(f"✅ Retrieved {len(new_posts)} new posts from @{username}")
+        return new_posts + backfill_posts
+
+    def load_watermarks(self) -> Dict[str, Dict]:
+        """Load per-account crawl watermarks from the state directory"""
+        if not os.path.exists(self.watermarks_path):
+            return {}
+
+        try:
+            with open(self.watermarks_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read watermarks, starting a full crawl: {e}")
+            return {}
+
+    def save_watermarks(self):
+        """Persist watermarks advanced during this run"""
+        if self.shard is not None:
+            # Shards never write the shared file; the merge step folds these in
+            os.makedirs(self.shard_dir, exist_ok=True)
+            self.write_atomic(
+                os.path.join(self.shard_dir, 'watermarks.json'),
+                json.dumps(self.pending_watermarks, indent=2).encode('utf-8')
+            )
+            self.pending_watermarks = {}
+            return
+
+        if not self.pending_watermarks:
+            return
+
+        self.watermarks.update(self.pending_watermarks)
+        self.pending_watermarks = {}
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self.watermarks_path, 'w') as f:
+            json.dump(self.watermarks, f, indent=2)
+
+        logger.info(f"🔖 Saved watermarks for {len(self.watermarks)} accounts")
+
+    def create_http_client(self) -> httpx.AsyncClient:
+        """Create the shared keep-alive connection pool used for a fetch run"""
+        limits = httpx.Limits(
+            max_connections=self.fetch_concurrency,
+            max_keepalive_connections=self.fetch_concurrency
+        )
+        return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(self.request_timeout))
+
+    async def fetch_account(self, client: httpx.AsyncClient, account: str, limit: int = 20) -> List[Dict]:
+        """Fetch one account's posts, full or incremental, recording its fetch time"""
+        start = time.perf_counter()
+        if self.incremental:
+            posts = await self.fetch_profile_incremental(client, account, limit=limit)
+        else:
+            posts = await self.fetch_profile_posts(client, account, limit=limit)
+        self.timer.record_account(account, fetch_s=round(time.perf_counter() - start, 4), posts=len(posts))
+        return posts
+
+    async def fetch_accounts_posts(self, accounts: List[str], limit: int = 20,
+                                   client: Optional[httpx.AsyncClient] = None) -> Dict[str, List[Dict]]:
+        """Fetch posts for many accounts concurrently over one connection pool.
+
+        Pass a long-lived client to reuse its pooled connections across runs;
+        otherwise a client is opened for this call only.
+        """
+        if client is None:
+            async with self.create_http_client() as client:
+                return await self.fetch_accounts_posts(accounts, limit=limit, client=client)
+
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+
+        async def fetch_bounded(account: str) -> List[Dict]:
+            async with semaphore:
+                return await self.fetch_account(client, account, limit=limit)
+
+        results = await asyncio.gather(*(fetch_bounded(account) for account in accounts))
+        return dict(zip(accounts, results))
+
     def is_design_related(self, content: str, topic_tag: Optional[str] = None) -> bool:
         """Check if content is related to design/UI"""
-        search_text = f"{content} {topic_tag or ''}".lower()
-        return any(keyword in search_text for keyword in self.design_keywords)
+        return self.keyword_matcher.matches(f"{content} {topic_tag or ''}")
 
     def transform_post_to_thread(self, post: Dict) -> Dict:
         """Transform Threads API post to our thread format"""
@@ -142,60 +1066,472 @@ class ThreadsDataUpdater:
         import random
         return random.randint(100, 5000)
 
+    def posts_to_design_threads(self, posts: List[Dict]) -> List[Dict]:
+        """Filter a page of posts for design content and transform them to threads"""
+        with self.timer.stage('filter'):
+            design_posts = [
+                post for post, is_design in zip(posts, self.keyword_matcher.classify_batch(posts))
+                if is_design
+            ]
+        with self.timer.stage('transform'):
+            return [self.transform_post_to_thread(post) for post in design_posts]
+
     def fetch_all_design_threads(self) -> List[Dict]:
         """Fetch design-related threads from all target accounts"""
         all_threads = []
+        self.rate_limiter.retry_budget.reset()
+        with self.timer.stage('fetch'):
+            posts_by_account = asyncio.run(self.fetch_accounts_posts(self.target_accounts, limit=20))
 
-        for account in self.target_accounts:
-            posts = self.fetch_profile_posts(account, limit=20)
-
-            # Filter for design content
-            design_posts = [
-                post for post in posts
-                if self.is_design_related(post.get('text', ''), post.get('topic_tag'))
-            ]
-
-            # Transform to our thread format
-            threads = [self.transform_post_to_thread(post) for post in design_posts]
+        for account, posts in posts_by_account.items():
+            start = time.perf_counter()
+            threads = self.posts_to_design_threads(posts)
             all_threads.extend(threads)
+            self.timer.record_account(
+                account, design_threads=len(threads), process_s=round(time.perf_counter() - start, 4)
+            )
 
             logger.info(f"🎨 Found {len(threads)} design threads from @{account}")
 
+        if self.incremental:
+            with self.timer.stage('merge'):
+                all_threads = self.merge_with_previous(all_threads)
+
         # Sort by timestamp (newest first)
-        all_threads.sort(key=lambda x: x['timestamp'], reverse=True)
+        with self.timer.stage('sort'):
+            all_threads.sort(key=lambda x: x['timestamp'], reverse=True)
 
         logger.info(f"🎉 Total design threads collected: {len(all_threads)}")
+        logger.info(f"🚦 API usage: {self.rate_limiter.stats()}")
         return all_threads
 
-    def save_to_firebase(self, threads: List[Dict]):
-        """Save threads to Firebase for tracking"""
-        if not self.db:
-            logger.info("⏭️  Skipping Firebase save (not initialized)")
-            return
+    def load_previous_threads(self) -> List[Dict]:
+        """Load the threads from the last generated dataset"""
+        previous_data_path = os.path.join(self.output_dir, 'threads-all.json')
+        if not os.path.exists(previous_data_path):
+            return []
 
-        try:
-            collection_ref = self.db.collection('curated_threads')
-            batch = self.db.batch()
+        with open(previous_data_path, 'r') as f:
+            return json.load(f)
 
+    def load_previous_copies(self) -> List[Dict]:
+        """Load the near-duplicate copies left out of the last generated dataset"""
+        if not os.path.exists(self.near_duplicate_copies_path):
+            return []
+        return list(self.read_ndjson(self.near_duplicate_copies_path))
+
+    def save_near_duplicate_copies(self, copies: List[Dict]):
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.write_ndjson(self.near_duplicate_copies_path, copies)
+
+    def merge_with_previous(self, new_threads: List[Dict]) -> List[Dict]:
+        """Merge newly fetched threads into the previous dataset and its dropped copies, newest copy wins"""
+        merged = {t['id']: t for t in itertools.chain(self.load_previous_threads(), self.load_previous_copies())}
+        added = sum(1 for t in new_threads if t['id'] not in merged)
+        merged.update((t['id'], t) for t in new_threads)
+
+        logger.info(f"🧩 Merged {added} new threads into {len(merged) - added} existing threads")
+        return list(merged.values())
+
+    def content_hash(self, thread: Dict) -> str:
+        """Hash the fields of a thread that represent its actual content"""
+        return content_hash(thread)
+
+    def carry_forward_unchanged(self, threads: List[Dict], previous: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """Reuse previously published records for threads whose content is unchanged.
+
+        Keeps likes, replies and fetched_at stable between runs, so unchanged
+        threads produce byte-identical pages and Firestore documents. Compares
+        against the last dataset unless `previous` records are passed in.
+        """
+        if previous is None:
+            previous = {t['id']: t for t in self.load_previous_threads()}
+        if not previous:
+            return threads
+
+        carried = []
+        for thread in threads:
+            previous_thread = previous.get(thread['id'])
+            if previous_thread is not None and self.content_hash(previous_thread) == self.content_hash(thread):
+                carried.append(previous_thread)
+            else:
+                carried.append(thread)
+        return carried
+
+    def find_near_duplicates(self, threads: Iterable[Dict]) -> Dict[str, List[Dict]]:
+        """Canonical thread ID -> the near-duplicate copies it stands for, per group found.
+
+        The canonical copy is the earliest post, ties going to the account
+        listed first in the registry.
+        """
+        registry_order = {account: i for i, account in enumerate(self.target_accounts)}
+        index = NearDuplicateIndex(self.near_duplicates_path, self.dedupe_threshold, self.dedupe_min_words)
+        try:
+            batch = []
             for thread in threads:
-                doc_ref = collection_ref.document(thread['id'])
-                thread_data = {
-                    **thread,
-                    'cached_at': firestore.SERVER_TIMESTAMP,
-                    'expires_at': datetime.now() + timedelta(hours=6)
-                }
-                batch.set(doc_ref, thread_data, merge=True)
+                batch.append(thread)
+                if len(batch) >= 1000:
+                    index.add(batch)
+                    batch = []
+            index.add(batch)
+            groups = index.groups()
+            index.prune()
+            index.commit()
+            logger.info(f"🔏 Near-duplicate signatures: {index.hashed} hashed, {index.reused} reused")
+        finally:
+            index.close()
+
+        duplicates = {}
+        for members in groups:
+            members.sort(key=lambda m: (
+                m['timestamp'] or '', registry_order.get(m['handle'], len(registry_order)), m['id']
+            ))
+            duplicates[members[0]['id']] = members[1:]
+        return duplicates
+
+    @staticmethod
+    def with_duplicates(thread: Dict, copies: Optional[List[Dict]]) -> Dict:
+        """A thread listing the copies it stands for, dropping any stale list"""
+        if not copies and 'duplicates' not in thread:
+            return thread
+        thread = {k: v for k, v in thread.items() if k != 'duplicates'}
+        if copies:
+            thread['duplicates'] = [
+                {'id': c['id'], 'handle': c['handle'], 'permalink': c['permalink']} for c in copies
+            ]
+        return thread
+
+    def drop_near_duplicates(self, threads: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Keep one canonical thread per near-duplicate group, returning (kept, dropped copies)"""
+        duplicates = self.find_near_duplicates(threads) if self.dedupe else {}
+        dropped_ids = {c['id'] for copies in duplicates.values() for c in copies}
+        kept, dropped = [], []
+        for thread in threads:
+            if thread['id'] in dropped_ids:
+                dropped.append(thread)
+            else:
+                kept.append(self.with_duplicates(thread, duplicates.get(thread['id'])))
+        if dropped:
+            logger.info(f"🪞 Dropped {len(dropped)} near-duplicate threads in {len(duplicates)} groups")
+        return kept, dropped
+
+    def dedupe_spools(self, counts: Dict[str, int],
+                      spools: List[str]) -> Tuple[Dict[str, int], Dict[str, List[Dict]]]:
+        """Near-duplicate groups across spool files, and the counts once their copies are dropped"""
+        if not self.dedupe:
+            return counts, {}
+        duplicates = self.find_near_duplicates(
+            itertools.chain.from_iterable(self.read_ndjson(path) for path in spools)
+        )
+
+        counts = dict(counts)
+        dropped = 0
+        for copies in duplicates.values():
+            for copy in copies:
+                counts['total'] -= 1
+                counts[copy['type']] -= 1
+                dropped += 1
+        if dropped:
+            logger.info(f"🪞 Dropping {dropped} near-duplicate threads in {len(duplicates)} groups")
+        return counts, duplicates
+
+    def init_store(self) -> Optional[ThreadStore]:
+        """Pick the durable thread store: Firestore (default) or local SQLite"""
+        backend = os.getenv('THREADS_STORE', 'firestore').lower()
+
+        if backend == 'sqlite':
+            path = os.getenv('THREADS_STORE_PATH', os.path.join(self.state_dir, 'threads.sqlite3'))
+            logger.info(f"🗄️  Using local SQLite thread store at {path}")
+            return SQLiteThreadStore(path)
+
+        if backend != 'firestore':
+            logger.warning(f"Unknown THREADS_STORE '{backend}', falling back to Firestore")
 
-            batch.commit()
-            logger.info(f"💾 Saved {len(threads)} threads to Firebase")
+        if not self.db:
+            return None
+        return FirestoreThreadStore(self.db, write_concurrency=self.firestore_write_concurrency)
+
+    def save_threads(self, threads: List[Dict]) -> Dict[str, int]:
+        """Bulk upsert new or changed threads into the thread store"""
+        if not self.store:
+            logger.info("⏭️  Skipping thread store save (not initialized)")
+            return {'written': 0, 'skipped': 0}
+
+        try:
+            result = self.store.upsert_threads(threads)
+            logger.info(
+                f"💾 Saved {result['written']} new or changed threads to {self.store.name} "
+                f"in {result['batches']} batches ({result['skipped']} unchanged skipped)"
+            )
+            return result
 
         except Exception as e:
-            logger.error(f"❌ Failed to save to Firebase: {e}")
+            logger.error(f"❌ Failed to save to {self.store.name}: {e}")
+            return {'written': 0, 'skipped': 0}
+
+    def serialize_json(self, data) -> bytes:
+        """Serialize data for a static artifact, compact or pretty-printed"""
+        if self.compact_json:
+            return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        return json.dumps(data, indent=2).encode('utf-8')
+
+    @staticmethod
+    def write_atomic(path: str, content: bytes):
+        """Write to a temp file in the same directory, then rename over the target"""
+        directory = os.path.dirname(path) or '.'
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def write_artifact(self, filename: str, content: bytes) -> Dict:
+        """Atomically write an artifact with .gz/.br siblings, returning its size and hash"""
+        path = os.path.join(self.output_dir, filename)
+
+        self.write_atomic(path, content)
+        info = {
+            'bytes': len(content),
+            'sha256': hashlib.sha256(content).hexdigest()
+        }
+
+        # mtime=0 keeps the gzip output identical for identical content
+        gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+        self.write_atomic(f"{path}.gz", gzipped)
+        info['gzipBytes'] = len(gzipped)
+
+        if brotli is not None:
+            compressed = brotli.compress(content, mode=brotli.MODE_TEXT, quality=self.brotli_quality)
+            self.write_atomic(f"{path}.br", compressed)
+            info['brotliBytes'] = len(compressed)
+
+        return info
+
+    def write_json_artifact(self, filename: str, data) -> Dict:
+        """Serialize and write a JSON artifact"""
+        return self.write_artifact(filename, self.serialize_json(data))
+
+    def write_pages(self, view: str, threads: List[Dict]) -> List[Dict]:
+        """Split a newest-first view into fixed-size pages named by content hash.
+
+        Page boundaries are counted from the oldest thread, so new threads only
+        change the first page and older pages keep their names between runs.
+        The first page absorbs the remainder and holds between half and one and
+        a half pages of threads.
+        """
+        os.makedirs(os.path.join(self.output_dir, 'pages'), exist_ok=True)
+
+        pages = []
+        start = 0
+        for size in self.page_sizes(len(threads)):
+            pages.append(self.write_page(view, threads[start:start + size]))
+            start += size
+        return pages
+
+    def page_sizes(self, total: int) -> List[int]:
+        """Newest-first page sizes for a view of `total` threads"""
+        if not total:
+            return []
+        head = total % self.page_size or self.page_size
+        if head < self.page_size // 2 and total > self.page_size:
+            head += self.page_size
+        return [head] + [self.page_size] * ((total - head) // self.page_size)
+
+    def write_page(self, view: str, page: List[Dict]) -> Dict:
+        """Write one page named by its content hash"""
+        content = self.serialize_json(page)
+        digest = hashlib.sha256(content).hexdigest()
+        filename = f"pages/threads-{view}-{digest[:16]}.json"
+
+        # Same name means same bytes, so an existing page never needs rewriting
+        if not os.path.exists(os.path.join(self.output_dir, filename)):
+            self.write_artifact(filename, content)
+
+        return {
+            'file': filename,
+            'count': len(page),
+            'bytes': len(content),
+            'sha256': digest
+        }
+
+    def load_previous_manifest(self) -> Dict:
+        """Load the manifest from the last generated dataset"""
+        manifest_path = os.path.join(self.output_dir, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return {}
+
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+
+    def prune_pages(self, pages: Dict[str, List[Dict]], previous_manifest: Dict):
+        """Delete page files referenced by neither this manifest nor the previous one"""
+        keep = {page['file'] for view_pages in pages.values() for page in view_pages}
+
+        # Clients holding the previous manifest may still be paging through it
+        previous_pages = previous_manifest.get('pages', {})
+        keep.update(page['file'] for view_pages in previous_pages.values() for page in view_pages)
+
+        pages_dir = os.path.join(self.output_dir, 'pages')
+        removed = 0
+        for name in os.listdir(pages_dir):
+            base = name
+            for suffix in ('.gz', '.br'):
+                if base.endswith(suffix):
+                    base = base[:-len(suffix)]
+            if f"pages/{base}" not in keep:
+                os.remove(os.path.join(pages_dir, name))
+                removed += 1
+
+        if removed:
+            logger.info(f"🧹 Removed {removed} stale page files")
+
+    @staticmethod
+    def diff_threads(previous_threads: List[Dict], threads: List[Dict]) -> Dict[str, List]:
+        """Compute added, updated and removed threads between two datasets"""
+        previous = {t['id']: t for t in previous_threads}
+        current_ids = set()
+        added, updated = [], []
+
+        for thread in threads:
+            current_ids.add(thread['id'])
+            previous_thread = previous.get(thread['id'])
+            if previous_thread is None:
+                added.append(thread)
+            elif previous_thread != thread:
+                updated.append(thread)
+
+        removed = [thread_id for thread_id in previous if thread_id not in current_ids]
+        return {'added': added, 'updated': updated, 'removed': removed}
+
+    def write_delta(self, threads: List[Dict], previous_manifest: Dict) -> Dict:
+        """Diff threads against the last dataset and extend the delta chain with the result"""
+        diff = self.diff_threads(self.load_previous_threads(), threads)
+        return self.extend_delta_chain(
+            previous_manifest,
+            {kind: len(items) for kind, items in diff.items()},
+            lambda filename, header: self.write_json_artifact(filename, {**header, **diff})
+        )
+
+    def extend_delta_chain(self, previous_manifest: Dict, counts: Dict[str, int],
+                           write_delta_file: Callable[[str, Dict], Dict]) -> Dict:
+        """Bump the data version when content changed and extend the delta chain.
+
+        `counts` are the numbers of added, updated and removed threads, and
+        `write_delta_file(filename, header)` writes the delta after the header
+        fields, returning its artifact info. Only the newest `delta_depth`
+        deltas are kept. Older ones are compacted away into the current
+        snapshot (threads-all.json): clients older than the start of the chain
+        refetch the snapshot instead.
+        """
+        previous_version = previous_manifest.get('dataVersion', 0)
+        chain = previous_manifest.get('deltas', [])
+
+        if not any(counts.values()):
+            version = previous_version
+        elif not previous_manifest:
+            # First dataset: nothing for a client to catch up from
+            version = previous_version + 1
+        else:
+            version = previous_version + 1
+            os.makedirs(os.path.join(self.output_dir, 'deltas'), exist_ok=True)
+            filename = f"deltas/delta-{previous_version}-{version}.json"
+            info = write_delta_file(filename, {
+                'fromVersion': previous_version,
+                'toVersion': version,
+                'generatedAt': datetime.now().isoformat()
+            })
+            chain = chain + [{
+                'fromVersion': previous_version,
+                'toVersion': version,
+                'file': filename,
+                'added': counts['added'],
+                'updated': counts['updated'],
+                'removed': counts['removed'],
+                'bytes': info['bytes'],
+                'sha256': info['sha256']
+            }]
+            logger.info(f"🔀 Generated {filename} (+{counts['added']} ~{counts['updated']} -{counts['removed']})")
+
+        # Compact: deltas beyond the configured depth are covered by the snapshot
+        keep_from = max(0, len(chain) - self.delta_depth)
+        expired, chain = chain[:keep_from], chain[keep_from:]
+        self.remove_delta_files(expired)
+
+        return {
+            'dataVersion': version,
+            'snapshot': {'version': version, 'file': 'threads-all.json'},
+            'deltas': chain
+        }
+
+    def write_streamed_delta(self, filename: str, header: Dict, diff: DatasetDiff) -> Dict:
+        """Write a delta from a DatasetDiff, byte-identical to serializing it whole"""
+        artifact = self.open_artifact(filename)
+        try:
+            if self.compact_json:
+                encode = lambda value: json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+                artifact.write(encode(header)[:-1].encode('utf-8'))
+                for kind in DatasetDiff.KINDS:
+                    artifact.write(f",{encode(kind)}:[".encode('utf-8'))
+                    for i, item in enumerate(diff.iter_kind(kind)):
+                        artifact.write(((',' if i else '') + encode(item)).encode('utf-8'))
+                    artifact.write(b']')
+                artifact.write(b'}')
+            else:
+                artifact.write(json.dumps(header, indent=2)[:-2].encode('utf-8'))
+                for kind in DatasetDiff.KINDS:
+                    artifact.write(f",\n  {json.dumps(kind)}: [".encode('utf-8'))
+                    count = 0
+                    for item in diff.iter_kind(kind):
+                        encoded = '\n'.join('    ' + line for line in json.dumps(item, indent=2).split('\n'))
+                        artifact.write(((',\n' if count else '\n') + encoded).encode('utf-8'))
+                        count += 1
+                    artifact.write(b'\n  ]' if count else b']')
+                artifact.write(b'\n}')
+        except BaseException:
+            artifact.abort()
+            raise
+        return artifact.close()
+
+    def remove_delta_files(self, entries: List[Dict]):
+        """Delete expired deltas; the snapshot already covers them"""
+        for entry in entries:
+            for suffix in ('', '.gz', '.br'):
+                path = os.path.join(self.output_dir, entry['file'] + suffix)
+                if os.path.exists(path):
+                    os.remove(path)
+        if entries:
+            logger.info(f"🧹 Compacted {len(entries)} old deltas into the snapshot")
+
+    def build_manifest(self, total: int, text_count: int, image_count: int, files: Dict,
+                       pages: Dict[str, List[Dict]], versioning: Dict) -> Dict:
+        return {
+            'generatedAt': datetime.now().isoformat(),
+            'totalThreads': total,
+            'byType': {
+                'text': text_count,
+                'image': image_count
+            },
+            'sources': self.target_accounts,
+            'nextUpdateRecommended': (datetime.now() + timedelta(hours=6)).isoformat(),
+            'version': '1.0.0',
+            'files': files,
+            'pageSize': self.page_size,
+            'pages': pages,
+            **versioning
+        }
 
     def generate_static_json_files(self, threads: List[Dict]):
         """Generate static JSON files for the React app"""
         # Ensure data directory exists
-        os.makedirs('public/data', exist_ok=True)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Read the previous dataset before it is overwritten, to diff against it
+        previous_manifest = self.load_previous_manifest()
+        versioning = self.write_delta(threads, previous_manifest)
 
         # Generate filtered datasets
         text_threads = [t for t in threads if t['type'] == 'text']
@@ -210,88 +1546,689 @@ class ThreadsDataUpdater:
             'threads-recent.json': recent_threads
         }
 
+        files = {}
         for filename, data in files_to_generate.items():
-            filepath = os.path.join('public/data', filename)
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"📄 Generated {filepath} ({len(data)} threads)")
+            files[filename] = self.write_json_artifact(filename, data)
+            logger.info(f"📄 Generated {os.path.join(self.output_dir, filename)} ({len(data)} threads, {files[filename]['bytes']} bytes)")
+
+        # Paged views, so the app can render the first page without the whole dataset
+        pages = {
+            'all': self.write_pages('all', threads),
+            'text': self.write_pages('text', text_threads),
+            'images': self.write_pages('images', image_threads)
+        }
+        self.prune_pages(pages, previous_manifest)
+        logger.info(f"📚 Generated {sum(len(p) for p in pages.values())} pages of up to {self.page_size} threads")
 
         # Generate manifest
-        manifest = {
-            'generatedAt': datetime.now().isoformat(),
-            'totalThreads': len(threads),
-            'byType': {
-                'text': len(text_threads),
-                'image': len(image_threads)
-            },
-            'sources': self.target_accounts,
-            'nextUpdateRecommended': (datetime.now() + timedelta(hours=6)).isoformat(),
-            'version': '1.0.0'
-        }
+        manifest = self.build_manifest(len(threads), len(text_threads), len(image_threads), files, pages, versioning)
 
-        manifest_path = os.path.join('public/data', 'manifest.json')
-        with open(manifest_path, 'w') as f:
-            json.dump(manifest, f, indent=2)
+        # Written last, so it never points at files that are not in place yet
+        self.write_json_artifact('manifest.json', manifest)
 
         logger.info(f"📋 Generated manifest.json")
 
         return manifest
 
-    def track_deletions(self, current_threads: List[Dict]):
-        """Track deleted threads by comparing with previous data"""
-        try:
-            previous_data_path = 'public/data/threads-all.json'
-            if not os.path.exists(previous_data_path):
-                logger.info("📝 No previous data found, skipping deletion tracking")
-                return
+    def track_deletions(self, current_threads: List[Dict], also_seen: Optional[List[Dict]] = None):
+        """Track deleted threads as the set difference against the thread index.
 
-            with open(previous_data_path, 'r') as f:
-                previous_threads = json.load(f)
+        `also_seen` are threads still upstream but left out of the dataset,
+        such as near-duplicate copies, which must not count as deletions.
+        """
+        try:
+            index = ThreadIndex(self.thread_index_path)
+            try:
+                now = datetime.now().isoformat()
+
+                # Seed a new index from the last published dataset so this run can diff against it
+                if index.is_empty():
+                    previous_threads = self.load_previous_threads()
+                    if not previous_threads:
+                        logger.info("📝 No previous data found, starting thread index")
+                    index.record_seen(previous_threads, now)
+
+                seen = current_threads + (also_seen or [])
+                current_ids = {t['id'] for t in seen}
+                deleted_ids = sorted(index.live_ids() - current_ids)
+                deleted = index.mark_deleted(deleted_ids, now) if deleted_ids else []
+                index.record_seen(seen, now)
+                index.commit()
+            finally:
+                index.close()
+
+            if deleted:
+                logger.info(f"🗑️  Detected {len(deleted)} deleted threads")
+                self.deletion_log.append([
+                    {**record, 'deleted_at': now, 'reason': 'not_found_in_api'}
+                    for record in deleted
+                ])
+                logger.info(f"📝 Appended to deletion log: {self.deletion_log.path}")
+            else:
+                logger.info("✅ No deletions detected")
 
-            current_ids = {t['id'] for t in current_threads}
-            deleted_threads = [t for t in previous_threads if t['id'] not in current_ids]
+        except Exception as e:
+            logger.error(f"❌ Failed to track deletions: {e}")
 
-            if deleted_threads:
-                logger.info(f"🗑️  Detected {len(deleted_threads)} deleted threads")
+    async def prewarm_media(self, urls: List[str]) -> Dict[str, str]:
+        """Have the media proxy cache source URLs, returning the proxied URL of each one it fetched"""
+        resolved = {}
+        semaphore = asyncio.Semaphore(4)
+        headers = {'Authorization': f"Bearer {self.media_proxy_token}"}
+
+        async with httpx.AsyncClient(base_url=self.media_proxy_url, headers=headers, timeout=60) as client:
+            async def prewarm(batch: List[str]):
+                async with semaphore:
+                    try:
+                        response = await client.post('/api/media', json={'urls': batch})
+                        response.raise_for_status()
+                    except httpx.HTTPError as e:
+                        logger.warning(f"⚠️  Media prewarm failed for {len(batch)} URLs: {e}")
+                        return
+                result = response.json()
+                for url, path in result['media'].items():
+                    resolved[url] = self.media_proxy_url + path
+                if result['errors']:
+                    logger.warning(f"⚠️  Media proxy could not fetch {len(result['errors'])} URLs")
+
+            # The proxy accepts at most 100 URLs per request
+            await asyncio.gather(*(prewarm(urls[start:start + 100]) for start in range(0, len(urls), 100)))
+
+        logger.info(f"🖼️  Pre-warmed {len(resolved)}/{len(urls)} media URLs")
+        return resolved
+
+    def carry_proxied_media(self, threads: List[Dict], previous: Dict[str, Dict]) -> List[Dict]:
+        """Threads reusing the proxied image and avatar URLs of their previous records.
+
+        Changed threads are copies, so the caller's dicts keep their source URLs.
+        """
+        if not self.media_proxy_url:
+            return threads
+
+        carried = []
+        for thread in threads:
+            previous_thread = previous.get(thread['id']) or {}
+            updates = {
+                field: previous_thread[field] for field in ('image', 'avatar')
+                if thread.get(field) and not thread[field].startswith(self.proxied_media_prefix)
+                and (previous_thread.get(field) or '').startswith(self.proxied_media_prefix)
+            }
+            carried.append({**thread, **updates} if updates else thread)
+        return carried
+
+    async def proxy_media(self, threads: List[Dict], previous: Dict[str, Dict]) -> List[Dict]:
+        """Point image and avatar URLs at the media proxy's content-addressed copies.
+
+        Threads published before keep their proxied URLs, so only newly curated
+        media is sent to the proxy. URLs it could not fetch keep pointing at
+        the source. Rewritten threads are copies: the daemon keeps comparing
+        its own records against fetches that bring back the source URLs.
+        """
+        if not self.media_proxy_url:
+            return threads
+
+        threads = self.carry_proxied_media(threads, previous)
+        pending = {
+            thread[field] for thread in threads for field in ('image', 'avatar')
+            if thread.get(field) and not thread[field].startswith(self.proxied_media_prefix)
+        }
 
-                # Save deletion log
-                deletion_log = {
-                    'deletedAt': datetime.now().isoformat(),
-                    'deletedThreads': deleted_threads,
-                    'reason': 'not_found_in_api'
+        if pending:
+            resolved = await self.prewarm_media(sorted(pending))
+            proxied = []
+            for thread in threads:
+                updates = {
+                    field: resolved[thread[field]] for field in ('image', 'avatar')
+                    if thread.get(field) in resolved
                 }
+                proxied.append({**thread, **updates} if updates else thread)
+            threads = proxied
+        return threads
 
-                log_path = f"public/data/deletions-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
-                with open(log_path, 'w') as f:
-                    json.dump(deletion_log, f, indent=2)
+    def publish_threads(self, threads: List[Dict]) -> Tuple[Dict, Dict[str, int]]:
+        """Track deletions, save to the thread store and generate the static files"""
+        with self.timer.stage('dedupe'):
+            threads, dropped = self.drop_near_duplicates(threads)
 
-                logger.info(f"📝 Saved deletion log: {log_path}")
-            else:
-                logger.info("✅ No deletions detected")
+        previous = {t['id']: t for t in self.load_previous_threads()}
+        with self.timer.stage('media'):
+            threads = asyncio.run(self.proxy_media(threads, previous))
 
-        except Exception as e:
-            logger.error(f"❌ Failed to track deletions: {e}")
+        with self.timer.stage('carry_forward'):
+            threads = self.carry_forward_unchanged(threads, previous)
 
-    def run_update(self):
-        """Main update process"""
-        logger.info("🚀 Starting Curated Threads data update...")
+        # 2. Track deletions
+        with self.timer.stage('track_deletions'):
+            self.track_deletions(threads, also_seen=dropped)
+
+        # 3. Save to the thread store (Firebase or local)
+        with self.timer.stage('store_save'):
+            store_result = self.save_threads(threads)
+
+        # 4. Generate static JSON files
+        with self.timer.stage('static_json'):
+            manifest = self.generate_static_json_files(threads)
+            self.save_near_duplicate_copies(dropped)
 
+        # Only advance watermarks once the fetched posts are safely written
+        with self.timer.stage('save_watermarks'):
+            self.save_watermarks()
+
+        return manifest, store_result
+
+    def spool_path(self, account: str, spool_dir: Optional[str] = None) -> str:
+        name = f"{re.sub(r'[^A-Za-z0-9._-]', '_', account)}.ndjson"
+        return os.path.join(spool_dir or self.spool_dir, name)
+
+    @staticmethod
+    def read_ndjson(path: str) -> Iterator[Dict]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def write_ndjson(path: str, records: Iterable[Dict]):
+        """Atomically write records to a local NDJSON file"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def iter_previous_threads(self) -> Iterator[Dict]:
+        """Stream the last dataset, from its NDJSON copy when there is one"""
+        ndjson_path = os.path.join(self.output_dir, 'threads-all.ndjson')
+        if os.path.exists(ndjson_path):
+            return self.read_ndjson(ndjson_path)
+        return iter(self.load_previous_threads())
+
+    def open_artifact(self, filename: str) -> StreamingArtifact:
+        return StreamingArtifact(os.path.join(self.output_dir, filename), self.brotli_quality)
+
+    async def iter_fetched_accounts(self, client: httpx.AsyncClient, accounts: List[str],
+                                    limit: int = 20):
+        """Yield (account, posts) as fetches complete.
+
+        At most `fetch_concurrency` finished results wait to be consumed, so
+        fetched posts never pile up in memory.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.fetch_concurrency)
+        remaining = iter(accounts)
+
+        async def worker():
+            for account in remaining:
+                try:
+                    posts = await self.fetch_account(client, account, limit=limit)
+                except Exception as e:
+                    posts = e
+                await queue.put((account, posts))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.fetch_concurrency, len(accounts)))]
         try:
-            # 1. Fetch fresh threads
-            threads = self.fetch_all_design_threads()
+            for _ in range(len(accounts)):
+                account, posts = await queue.get()
+                if isinstance(posts, Exception):
+                    raise posts
+                yield account, posts
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def spool_account(self, account: str, posts: List[Dict], index: Optional[ThreadIndex],
+                            seen_at: str) -> Dict[str, int]:
+        """Write an account's newest-first threads to its spool file, returning counts by type"""
+        path = self.spool_path(account)
+        previous = {t['id']: t for t in self.read_ndjson(path)} if os.path.exists(path) else {}
+
+        if posts:
+            threads = self.posts_to_design_threads(posts)
+            with self.timer.stage('media'):
+                threads = await self.proxy_media(threads, previous)
+            threads = self.carry_forward_unchanged(threads, previous)
+            if self.incremental:
+                threads = list({**previous, **{t['id']: t for t in threads}}.values())
+            threads.sort(key=lambda x: x['timestamp'], reverse=True)
+            self.write_ndjson(path, threads)
+        else:
+            # An empty response is usually a failed fetch; keep the account's last threads
+            threads = list(previous.values())
+
+        if index is not None:
+            index.record_seen(threads, seen_at)
+        self.timer.record_account(account, design_threads=len(threads))
+
+        image_count = sum(1 for t in threads if t['type'] == 'image')
+        return {'total': len(threads), 'image': image_count, 'text': len(threads) - image_count}
+
+    async def spool_accounts(self, index: Optional[ThreadIndex], seen_at: str) -> Dict[str, int]:
+        """Fetch every target account into its spool file, one account in memory at a time"""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        counts = {'total': 0, 'text': 0, 'image': 0}
+
+        async with self.create_http_client() as client:
+            async for account, posts in self.iter_fetched_accounts(client, self.target_accounts, limit=20):
+                # spool_account() times filtering, transforming and media proxying as their own stages
+                with self.timer.stage('spool', exclude=('media', 'filter', 'transform')):
+                    account_counts = await self.spool_account(account, posts, index, seen_at)
+                for key, value in account_counts.items():
+                    counts[key] += value
+                logger.info(f"🎨 Spooled {account_counts['total']} design threads from @{account}")
+
+        # Spools of accounts that are no longer crawled would otherwise be merged forever
+        current = {os.path.basename(self.spool_path(account)) for account in self.target_accounts}
+        for name in os.listdir(self.spool_dir):
+            if name.endswith('.ndjson') and name not in current:
+                os.remove(os.path.join(self.spool_dir, name))
+
+        return counts
+
+    def merge_spools(self, paths: List[str]) -> Iterator[Dict]:
+        """K-way merge of newest-first spool files into one newest-first stream.
+
+        With more spools than merge_fan_in, groups are first merged into
+        intermediate run files, so no more than merge_fan_in files are open
+        at once.
+        """
+        fan_in = max(2, self.merge_fan_in)
+        runs_dir = None
+        try:
+            level = 0
+            while len(paths) > fan_in:
+                runs_dir = runs_dir or tempfile.mkdtemp(dir=self.state_dir, prefix='merge-')
+                merged = []
+                for start in range(0, len(paths), fan_in):
+                    run_path = os.path.join(runs_dir, f"run-{level}-{start // fan_in}.ndjson")
+                    streams = [self.read_ndjson(path) for path in paths[start:start + fan_in]]
+                    self.write_ndjson(run_path, heapq.merge(*streams, key=lambda x: x['timestamp'], reverse=True))
+                    merged.append(run_path)
+                paths = merged
+                level += 1
+
+            streams = [self.read_ndjson(path) for path in paths]
+            yield from heapq.merge(*streams, key=lambda x: x['timestamp'], reverse=True)
+        finally:
+            if runs_dir:
+                shutil.rmtree(runs_dir, ignore_errors=True)
+
+    def write_stream_outputs(self, counts: Dict[str, int], spools: List[str],
+                             duplicates: Optional[Dict[str, List[Dict]]] = None) -> Tuple[Dict, Dict[str, int]]:
+        """Merge the spools once, feeding every static file, page and store batch as threads go by.
+
+        `counts` must already exclude the near-duplicate copies in `duplicates`, which are skipped.
+        """
+        duplicates = duplicates or {}
+        dropped = {c['id'] for copies in duplicates.values() for c in copies}
+        os.makedirs(os.path.join(self.output_dir, 'pages'), exist_ok=True)
+        previous_manifest = self.load_previous_manifest()
+        # Indexed before the merge replaces the previous NDJSON copy
+        os.makedirs(self.state_dir, exist_ok=True)
+        diff = DatasetDiff(os.path.join(self.state_dir, 'stream-diff.sqlite3'), self.iter_previous_threads())
+        try:
+            return self.write_stream_files(counts, spools, duplicates, dropped, previous_manifest, diff)
+        finally:
+            diff.close()
+
+    def write_stream_files(self, counts: Dict[str, int], spools: List[str], duplicates: Dict[str, List[Dict]],
+                           dropped: set, previous_manifest: Dict, diff: DatasetDiff) -> Tuple[Dict, Dict[str, int]]:
+        """write_stream_outputs() once the previous dataset is indexed in `diff`"""
+        writers = {
+            'threads-all.json': JSONArrayWriter(self.open_artifact('threads-all.json'), self.compact_json),
+            'threads-text.json': JSONArrayWriter(self.open_artifact('threads-text.json'), self.compact_json),
+            'threads-images.json': JSONArrayWriter(self.open_artifact('threads-images.json'), self.compact_json),
+            'threads-all.ndjson': NDJSONWriter(self.open_artifact('threads-all.ndjson'))
+        }
+        view_files = {'text': 'threads-text.json', 'image': 'threads-images.json'}
+        page_plan = {
+            'all': self.page_sizes(counts['total']),
+            'text': self.page_sizes(counts['text']),
+            'images': self.page_sizes(counts['image'])
+        }
+        page_buffers = {view: [] for view in page_plan}
+        pages = {view: [] for view in page_plan}
+        recent_threads = []
 
-            if not threads:
-                logger.error("❌ No threads fetched, aborting update")
-                return False
+        # Whole Firestore batches for every parallel writer
+        store_chunk = 500 * max(1, self.firestore_write_concurrency)
+        store_batch = []
+        store_result = {'written': 0, 'skipped': 0}
 
-            # 2. Track deletions
-            self.track_deletions(threads)
+        def flush_store():
+            result = self.save_threads(store_batch)
+            store_result['written'] += result['written']
+            store_result['skipped'] += result['skipped']
+            store_batch.clear()
 
-            # 3. Save to Firebase
-            self.save_to_firebase(threads)
+        try:
+            for thread in self.merge_spools(spools):
+                if thread['id'] in dropped:
+                    continue
+                thread = self.with_duplicates(thread, duplicates.get(thread['id']))
+
+                writers['threads-all.json'].write(thread)
+                writers['threads-all.ndjson'].write(thread)
+                diff.add(thread)
+                writers[view_files[thread['type']]].write(thread)
+
+                for view in ('all', 'text' if thread['type'] == 'text' else 'images'):
+                    page_buffers[view].append(thread)
+                    if len(page_buffers[view]) == page_plan[view][len(pages[view])]:
+                        pages[view].append(self.write_page(view, page_buffers[view]))
+                        page_buffers[view] = []
+
+                if len(recent_threads) < 10:
+                    recent_threads.append(thread)
+
+                store_batch.append(thread)
+                if len(store_batch) >= store_chunk:
+                    flush_store()
+        except BaseException:
+            for writer in writers.values():
+                writer.artifact.abort()
+            raise
+
+        if store_batch:
+            flush_store()
+
+        files = {filename: writer.close() for filename, writer in writers.items()}
+        for filename, writer in writers.items():
+            logger.info(f"📄 Streamed {os.path.join(self.output_dir, filename)} "
+                        f"({writer.count} threads, {files[filename]['bytes']} bytes)")
+        files['threads-recent.json'] = self.write_json_artifact('threads-recent.json', recent_threads)
+
+        self.prune_pages(pages, previous_manifest)
+        logger.info(f"📚 Generated {sum(len(p) for p in pages.values())} pages of up to {self.page_size} threads")
+
+        versioning = self.extend_delta_chain(
+            previous_manifest, diff.counts(),
+            lambda filename, header: self.write_streamed_delta(filename, header, diff)
+        )
+
+        manifest = self.build_manifest(counts['total'], counts['text'], counts['image'], files, pages, versioning)
+        self.write_json_artifact('manifest.json', manifest)
+        logger.info(f"📋 Generated manifest.json")
 
-            # 4. Generate static JSON files
-            manifest = self.generate_static_json_files(threads)
+        return manifest, store_result
+
+    def record_stream_deletions(self, index: ThreadIndex, seen_at: str):
+        """Tombstone indexed threads that no spooled account still has"""
+        deleted_ids = index.unseen_since(seen_at)
+        if not deleted_ids:
+            logger.info("✅ No deletions detected")
+            return
+
+        deleted = index.mark_deleted(deleted_ids, seen_at)
+        logger.info(f"🗑️  Detected {len(deleted)} deleted threads")
+        self.deletion_log.append([
+            {**record, 'deleted_at': seen_at, 'reason': 'not_found_in_api'}
+            for record in deleted
+        ])
+        logger.info(f"📝 Appended to deletion log: {self.deletion_log.path}")
+
+    def seed_thread_index(self, index: ThreadIndex) -> str:
+        """Seed an empty index from the last published dataset, returning this run's seen_at"""
+        if index.is_empty():
+            seeded_at = datetime.now().isoformat()
+            batch = []
+            for thread in self.iter_previous_threads():
+                batch.append(thread)
+                if len(batch) >= 1000:
+                    index.record_seen(batch, seeded_at)
+                    batch = []
+            index.record_seen(batch, seeded_at)
+        return datetime.now().isoformat()
+
+    def publish_stream(self) -> Optional[Tuple[Dict, Dict[str, int]]]:
+        """Streaming run: fetch into per-account spools, then publish everything in one merge pass.
+
+        Peak memory is bounded by the largest single account plus one page per
+        view, not by the total number of threads. Returns None when no
+        account produced any threads.
+        """
+        self.rate_limiter.retry_budget.reset()
+        index = ThreadIndex(self.thread_index_path)
+        try:
+            seen_at = self.seed_thread_index(index)
+
+            with self.timer.stage('fetch', exclude=self.SPOOL_STAGES):
+                counts = asyncio.run(self.spool_accounts(index, seen_at))
+            logger.info(f"🎉 Total design threads spooled: {counts['total']}")
+            logger.info(f"🚦 API usage: {self.rate_limiter.stats()}")
+            if not counts['total']:
+                return None
+
+            spools = [self.spool_path(account) for account in self.target_accounts
+                      if os.path.exists(self.spool_path(account))]
+            with self.timer.stage('dedupe'):
+                counts, duplicates = self.dedupe_spools(counts, spools)
+            with self.timer.stage('merge_publish'):
+                manifest, store_result = self.write_stream_outputs(counts, spools, duplicates)
+
+            with self.timer.stage('track_deletions'):
+                self.record_stream_deletions(index, seen_at)
+            index.commit()
+        finally:
+            index.close()
+
+        # Only advance watermarks once the fetched posts are safely written
+        with self.timer.stage('save_watermarks'):
+            self.save_watermarks()
+
+        return manifest, store_result
+
+    def run_shard(self) -> bool:
+        """Crawl this shard's accounts into its spool directory for a later merge"""
+        index, count = self.shard
+        logger.info(f"🧩 Crawling shard {index}/{count}: {len(self.target_accounts)} accounts")
+        self.timer = RunTimer()
+        self.rate_limiter.retry_budget.reset()
+
+        # A half-finished shard must never be merged, and stale watermarks never folded in
+        os.makedirs(self.spool_dir, exist_ok=True)
+        shard_manifest_path = os.path.join(self.shard_dir, 'shard.json')
+        for path in (shard_manifest_path, os.path.join(self.shard_dir, 'watermarks.json')):
+            if os.path.exists(path):
+                os.remove(path)
+
+        try:
+            with self.timer.stage('fetch', exclude=self.SPOOL_STAGES):
+                counts = asyncio.run(self.spool_accounts(None, datetime.now().isoformat()))
+            with self.timer.stage('save_watermarks'):
+                self.save_watermarks()
+
+            shard_manifest = {
+                'shard': index,
+                'shards': count,
+                'completedAt': datetime.now().isoformat(),
+                'accounts': self.target_accounts,
+                'counts': counts,
+                'upstream': self.rate_limiter.stats(),
+                'timings': self.timer.report()
+            }
+            self.write_atomic(shard_manifest_path, json.dumps(shard_manifest, indent=2).encode('utf-8'))
+        except Exception as e:
+            logger.error(f"💥 Shard {index}/{count} failed: {e}")
+            return False
+
+        logger.info(
+            f"✅ Shard {index}/{count} spooled {counts['total']} design threads "
+            f"from {len(self.target_accounts)} accounts in {shard_manifest['timings']['total_s']:.2f}s"
+        )
+        return True
+
+    def load_shard_manifests(self) -> List[Dict]:
+        """Manifests of the newest complete set of shards, in shard order"""
+        manifests = []
+        if os.path.isdir(self.shards_dir):
+            for name in sorted(os.listdir(self.shards_dir)):
+                path = os.path.join(self.shards_dir, name, 'shard.json')
+                if os.path.exists(path):
+                    with open(path, 'r') as f:
+                        manifests.append({**json.load(f), 'dir': os.path.join(self.shards_dir, name)})
+
+        if not manifests:
+            raise ValueError(f"No completed shards found in {self.shards_dir}")
+
+        # Directories left over from an earlier shard count are ignored
+        count = max(manifests, key=lambda m: m['completedAt'])['shards']
+        manifests = sorted((m for m in manifests if m['shards'] == count), key=lambda m: m['shard'])
+        missing = sorted(set(range(count)) - {m['shard'] for m in manifests})
+        if missing:
+            raise ValueError(f"Shards {missing} of {count} have not completed, not merging")
+        return manifests
+
+    def merge_shards(self) -> Optional[Tuple[Dict, Dict[str, int]]]:
+        """Publish the combined spools of every shard in one merge pass"""
+        shards = self.load_shard_manifests()
+
+        # Merge in registry order so ties break exactly as in a single-process run
+        registry_order = {account: i for i, account in enumerate(self.target_accounts)}
+        shard_accounts = sorted(
+            ((account, shard['dir']) for shard in shards for account in shard['accounts']),
+            key=lambda entry: registry_order.get(entry[0], len(registry_order))
+        )
+        self.target_accounts = [account for account, _ in shard_accounts]
+
+        counts = {'total': 0, 'text': 0, 'image': 0}
+        for shard in shards:
+            for key in counts:
+                counts[key] += shard['counts'][key]
+        spools = [
+            path for path in (self.spool_path(account, os.path.join(shard_dir, 'spool'))
+                              for account, shard_dir in shard_accounts)
+            if os.path.exists(path)
+        ]
+
+        logger.info(
+            f"🧩 Merging {len(shards)} shards: {len(self.target_accounts)} accounts, {counts['total']} threads"
+        )
+        if not counts['total']:
+            return None
+
+        index = ThreadIndex(self.thread_index_path)
+        try:
+            seen_at = self.seed_thread_index(index)
+            with self.timer.stage('index'):
+                for path in spools:
+                    index.record_seen(list(self.read_ndjson(path)), seen_at)
+
+            with self.timer.stage('dedupe'):
+                counts, duplicates = self.dedupe_spools(counts, spools)
+            with self.timer.stage('merge_publish'):
+                manifest, store_result = self.write_stream_outputs(counts, spools, duplicates)
+
+            with self.timer.stage('track_deletions'):
+                self.record_stream_deletions(index, seen_at)
+            index.commit()
+        finally:
+            index.close()
+
+        # Fold in the watermarks each shard advanced, now that their posts are published
+        self.watermarks = self.load_watermarks()
+        for shard in shards:
+            path = os.path.join(shard['dir'], 'watermarks.json')
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    self.pending_watermarks.update(json.load(f))
+        with self.timer.stage('save_watermarks'):
+            self.save_watermarks()
+
+        return manifest, store_result
+
+    @staticmethod
+    def profile_hotspots_summary(profiler: cProfile.Profile, limit: int) -> List[Dict]:
+        """Functions ranked by time spent in their own code"""
+        stats = pstats.Stats(profiler)
+        rows = []
+        for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append({
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'calls': calls,
+                'own_s': round(own, 4),
+                'cumulative_s': round(cumulative, 4)
+            })
+        rows.sort(key=lambda row: row['own_s'], reverse=True)
+        return rows[:limit]
+
+    def write_run_report(self, manifest: Dict, store_result: Dict[str, int],
+                         profiler: Optional[cProfile.Profile] = None) -> Dict:
+        """Write run-report.json next to manifest.json"""
+        report = {
+            'generatedAt': manifest['generatedAt'],
+            'dataVersion': manifest['dataVersion'],
+            'totalThreads': manifest['totalThreads'],
+            'accounts': len(self.target_accounts),
+            'incremental': self.incremental,
+            'store': {'backend': self.store.name if self.store else None, **store_result},
+            'upstream': self.rate_limiter.stats(),
+            'timings': self.timer.report()
+        }
+
+        if profiler is not None:
+            # Only the main thread is profiled; store writes on worker threads show up as waits
+            os.makedirs(self.state_dir, exist_ok=True)
+            profile_path = os.path.join(self.state_dir, 'run-profile.pstats')
+            profiler.dump_stats(profile_path)
+            report['profile'] = {
+                'pstats': profile_path,
+                'hotspots': self.profile_hotspots_summary(profiler, self.profile_hotspots)
+            }
+
+        self.write_atomic(os.path.join(self.output_dir, 'run-report.json'), json.dumps(report, indent=2).encode('utf-8'))
+        return report
+
+    def log_run_report(self, report: Dict):
+        timings = report['timings']
+        logger.info(f"⏱️  Stage timings ({timings['total_s']:.2f}s total):")
+        for name, stage in sorted(timings['stages'].items(), key=lambda item: item[1]['seconds'], reverse=True):
+            logger.info(f"   • {name}: {stage['seconds']:.3f}s ({stage['share']:.0%})")
+
+        for account, fields in list(timings['accounts'].items())[:5]:
+            logger.info(f"   • slowest fetch @{account}: {fields.get('fetch_s', 0):.3f}s, {fields.get('posts', 0)} posts")
+
+        if 'profile' in report:
+            logger.info(f"🔥 Top CPU hotspots by own time (full profile: {report['profile']['pstats']}):")
+            for row in report['profile']['hotspots'][:10]:
+                logger.info(f"   • {row['own_s']:.3f}s own, {row['cumulative_s']:.3f}s cum, "
+                            f"{row['calls']} calls  {row['function']}")
+
+    def run_update(self):
+        """Main update process"""
+        logger.info("🚀 Starting Curated Threads data update...")
+        self.timer = RunTimer()
+        profiler = cProfile.Profile() if self.profile else None
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                if self.merge_shards_mode or self.stream:
+                    # 1-4. Fetch, spool and publish in a single bounded-memory pass,
+                    # or publish the spools of a sharded crawl
+                    published = self.merge_shards() if self.merge_shards_mode else self.publish_stream()
+                    if published is None:
+                        logger.error("❌ No threads fetched, aborting update")
+                        return False
+                    manifest, store_result = published
+                else:
+                    # 1. Fetch fresh threads
+                    threads = self.fetch_all_design_threads()
+
+                    if not threads:
+                        logger.error("❌ No threads fetched, aborting update")
+                        return False
+
+                    # 2-4. Track deletions, save to the store, generate static JSON files
+                    manifest, store_result = self.publish_threads(threads)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+
+            report = self.write_run_report(manifest, store_result, profiler)
 
             # 5. Summary
             logger.info("✅ Update completed successfully!")
@@ -300,11 +2237,13 @@ class ThreadsDataUpdater:
             logger.info(f"   • Text threads: {manifest['byType']['text']}")
             logger.info(f"   • Image threads: {manifest['byType']['image']}")
             logger.info(f"   • Sources: {', '.join(manifest['sources'])}")
+            logger.info(f"   • Store writes: {store_result['written']} written, {store_result['skipped']} skipped")
             logger.info(f"   • Next update recommended: {manifest['nextUpdateRecommended']}")
+            self.log_run_report(report)
 
             print("\n🎉 Data update complete! Your static JSON files are ready.")
             print("💡 Next steps:")
-            print("   1. Review the generated files in public/data/")
+            print(f"   1. Review the generated files in {self.output_dir}/")
             print("   2. Commit the changes to git")
             print("   3. Push to trigger Netlify deployment")
 
@@ -314,10 +2253,283 @@ class ThreadsDataUpdater:
             logger.error(f"💥 Update failed: {e}")
             return False
 
+class UpdateDaemon:
+    """Long-running scheduler that refreshes each account on its own cadence.
+
+    Keeps one pooled HTTP client and the Firebase client alive between
+    fetches. Each account's refresh interval follows how often it actually
+    posts: roughly the median gap between its recent posts, clamped between
+    a minimum and maximum and backed off when nothing new arrives. Static
+    files are regenerated only when an account's threads changed.
+    """
+
+    # Seconds before retrying the accounts of a failed cycle, doubled per consecutive failure
+    FAILURE_RETRY_DELAY = 60.0
+
+    def __init__(self, updater: 'ThreadsDataUpdater'):
+        self.updater = updater
+        self.min_interval = float(os.getenv('THREADS_DAEMON_MIN_INTERVAL', '900'))
+        self.max_interval = float(os.getenv('THREADS_DAEMON_MAX_INTERVAL', '86400'))
+        self.default_interval = float(os.getenv('THREADS_DAEMON_DEFAULT_INTERVAL', '21600'))
+        self.status_path = os.path.join(updater.state_dir, 'daemon-status.json')
+
+        self.schedule: Dict[str, Dict] = {}
+        self.threads_by_account: Dict[str, Dict[str, Dict]] = {}
+        self.last_published_at: Optional[str] = None
+        self.consecutive_failures = 0
+        self.stop_event: Optional[asyncio.Event] = None
+
+    def load_existing_threads(self):
+        """Start from the published dataset and its dropped copies so unchanged accounts are not dropped"""
+        for thread in itertools.chain(self.updater.load_previous_threads(), self.updater.load_previous_copies()):
+            # `duplicates` is derived when publishing; fetched threads never have it
+            thread = self.updater.with_duplicates(thread, None)
+            self.threads_by_account.setdefault(thread['handle'], {})[thread['id']] = thread
+
+    @staticmethod
+    def parse_timestamp(timestamp: str) -> Optional[float]:
+        try:
+            return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S%z').timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    def next_interval(self, account: str, posts: List[Dict]) -> float:
+        """Refresh interval from the account's posting cadence"""
+        previous = self.schedule.get(account, {}).get('interval', self.default_interval)
+        if not posts:
+            return min(self.max_interval, previous * 2)
+
+        times = sorted(filter(None, (self.parse_timestamp(p.get('timestamp')) for p in posts)), reverse=True)
+        if len(times) < 2:
+            return min(self.max_interval, previous * 1.5)
+
+        median_gap = statistics.median(a - b for a, b in zip(times, times[1:]))
+        return min(self.max_interval, max(self.min_interval, median_gap))
+
+    def apply_account_threads(self, account: str, threads: List[Dict], fetched: bool) -> bool:
+        """Update an account's threads, returning whether anything changed"""
+        # An empty response is usually a failed fetch; keep what we have
+        if not fetched:
+            return False
+
+        current = self.threads_by_account.get(account, {})
+        # Threads loaded from the published dataset have proxied media URLs, while a
+        # fetch brings back the source URLs that publishing would map to them
+        threads = self.updater.carry_proxied_media(threads, current)
+        if self.updater.incremental:
+            updated = {**current, **{t['id']: t for t in threads}}
+        else:
+            updated = {t['id']: t for t in threads}
+
+        def fingerprint(by_id: Dict[str, Dict]) -> Dict[str, str]:
+            return {thread_id: content_hash(t) for thread_id, t in by_id.items()}
+
+        if fingerprint(updated) == fingerprint(current):
+            return False
+
+        self.threads_by_account[account] = updated
+        return True
+
+    def all_threads(self) -> List[Dict]:
+        threads = [t for by_id in self.threads_by_account.values() for t in by_id.values()]
+        threads.sort(key=lambda x: x['timestamp'], reverse=True)
+        return threads
+
+    def due_accounts(self, now: float) -> List[str]:
+        return [account for account, entry in self.schedule.items() if entry['next_fetch'] <= now]
+
+    def write_status(self, now: float):
+        status = {
+            'updatedAt': datetime.fromtimestamp(now).isoformat(),
+            'queueDepth': len(self.due_accounts(now)),
+            'lastPublishedAt': self.last_published_at,
+            'accounts': {
+                account: {
+                    'nextFetchAt': datetime.fromtimestamp(entry['next_fetch']).isoformat(),
+                    'intervalSeconds': round(entry['interval']),
+                    'lastFetchedAt': entry.get('last_fetched'),
+                    'lastPostCount': entry.get('last_post_count'),
+                    'threads': len(self.threads_by_account.get(account, {}))
+                }
+                for account, entry in sorted(self.schedule.items(), key=lambda item: item[1]['next_fetch'])
+            }
+        }
+        os.makedirs(self.updater.state_dir, exist_ok=True)
+        self.updater.write_atomic(self.status_path, json.dumps(status, indent=2).encode('utf-8'))
+
+    def request_stop(self):
+        logger.info("⏹️  Shutdown requested, finishing the current cycle...")
+        self.stop_event.set()
+
+    async def run_cycle(self, client: httpx.AsyncClient, due: List[str]):
+        """Fetch all due accounts, reschedule them and publish if anything changed"""
+        updater = self.updater
+        updater.rate_limiter.retry_budget.reset()
+        # Timings cover one cycle; a timer kept for the daemon's lifetime would grow forever
+        updater.timer = RunTimer()
+        results = await updater.fetch_accounts_posts(due, limit=20, client=client)
+
+        now = time.time()
+        changed = []
+        for account, posts in results.items():
+            if self.apply_account_threads(account, updater.posts_to_design_threads(posts), fetched=bool(posts)):
+                changed.append(account)
+
+            interval = self.next_interval(account, posts)
+            self.schedule[account].update({
+                'interval': interval,
+                'next_fetch': now + interval,
+                'last_fetched': datetime.fromtimestamp(now).isoformat(),
+                'last_post_count': len(posts)
+            })
+
+        if not changed:
+            logger.info(f"💤 No changes from {len(due)} accounts, skipping regeneration")
+            return
+
+        logger.info(f"🔄 Content changed for {', '.join('@' + a for a in changed)}, regenerating")
+        # Blocking file and Firestore work runs off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, updater.publish_threads, self.all_threads())
+        self.last_published_at = datetime.now().isoformat()
+
+    def postpone_failed(self, due: List[str], error: Exception):
+        """Back off the accounts of a failed cycle instead of retrying them straight away"""
+        self.consecutive_failures += 1
+        delay = min(self.max_interval, self.FAILURE_RETRY_DELAY * 2 ** (self.consecutive_failures - 1))
+        logger.error(f"❌ Daemon cycle failed: {error}; retrying {len(due)} accounts in {delay:.0f}s")
+
+        retry_at = time.time() + delay
+        for account in due:
+            entry = self.schedule[account]
+            entry['next_fetch'] = max(entry['next_fetch'], retry_at)
+
+    async def run(self):
+        """Run until SIGINT/SIGTERM, then finish the current cycle and exit"""
+        self.stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.request_stop)
+
+        self.load_existing_threads()
+        now = time.time()
+        for account in self.updater.target_accounts:
+            self.schedule[account] = {'interval': self.default_interval, 'next_fetch': now}
+
+        logger.info(f"🛰️  Daemon started for {len(self.schedule)} accounts")
+        async with self.updater.create_http_client() as client:
+            while not self.stop_event.is_set():
+                now = time.time()
+                due = self.due_accounts(now)
+                self.write_status(now)
+
+                if due:
+                    try:
+                        await self.run_cycle(client, due)
+                        self.consecutive_failures = 0
+                    except Exception as e:
+                        self.postpone_failed(due, e)
+                    continue
+
+                next_fetch = min(entry['next_fetch'] for entry in self.schedule.values())
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), timeout=max(0.0, next_fetch - now))
+                except asyncio.TimeoutError:
+                    pass
+
+        self.write_status(time.time())
+        logger.info("👋 Daemon stopped")
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """argparse type for --shard i/N"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 0 and {count - 1}")
+    return index, count
+
+def crawl_with_workers(args) -> bool:
+    """Run one shard process per worker on this machine and wait for all of them"""
+    forwarded = []
+    if args.incremental:
+        forwarded.append('--incremental')
+    if args.backfill_pages:
+        forwarded += ['--backfill-pages', str(args.backfill_pages)]
+    if args.accounts_file:
+        forwarded += ['--accounts-file', args.accounts_file]
+
+    logger.info(f"🚀 Starting {args.workers} shard workers")
+    workers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--shard', f"{i}/{args.workers}", *forwarded])
+        for i in range(args.workers)
+    ]
+    failed = [i for i, worker in enumerate(workers) if worker.wait() != 0]
+    if failed:
+        logger.error(f"❌ Shards {failed} of {args.workers} failed, not merging")
+        return False
+    return True
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Update curated Threads data")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only fetch posts newer than each account's stored watermark")
+    parser.add_argument('--backfill-pages', type=int, default=0,
+                        help="with --incremental, follow `after` cursors this many pages into older history")
+    parser.add_argument('--compact', action='store_true',
+                        help="write static JSON without pretty-printing")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and refresh each account on its own adaptive schedule")
+    parser.add_argument('--stream', action='store_true',
+                        help="bounded-memory run: spool each account to disk and merge the spools newest-first")
+    parser.add_argument('--profile', action='store_true',
+                        help="capture a CPU profile of the run and report the top hotspots")
+    parser.add_argument('--accounts-file',
+                        help="crawl the handles in this file (one per line, or a JSON list)")
+    parser.add_argument('--register-accounts', metavar='FILE',
+                        help="add the handles in FILE to the thread store's account registry and exit")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help="only crawl the accounts that hash to shard i of N, spooling them for --merge-shards")
+    parser.add_argument('--merge-shards', action='store_true',
+                        help="publish the combined output of a completed sharded crawl")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="crawl with this many local shard processes, then merge")
+    return parser.parse_args()
+
 def main():
     """Main entry point"""
+    args = parse_args()
+
     try:
-        updater = ThreadsDataUpdater()
+        if args.workers and not crawl_with_workers(args):
+            exit(1)
+
+        updater = ThreadsDataUpdater(
+            incremental=args.incremental,
+            backfill_pages=args.backfill_pages,
+            compact_json=args.compact,
+            profile=args.profile,
+            stream=args.stream,
+            accounts_file=args.accounts_file,
+            shard=args.shard,
+            merge_shards=args.merge_shards or bool(args.workers)
+        )
+        if args.register_accounts:
+            if not updater.store:
+                raise ValueError("No thread store configured to hold the account registry")
+            handles = updater.read_accounts_file(args.register_accounts)
+            updater.store.register_accounts(handles)
+            logger.info(f"📒 Registered {len(handles)} accounts in the {updater.store.name} registry")
+            exit(0)
+
+        if args.shard:
+            exit(0 if updater.run_shard() else 1)
+
+        if args.daemon:
+            asyncio.run(UpdateDaemon(updater).run())
+            exit(0)
+
         success = updater.run_update()
         exit(0 if success else 1)
 
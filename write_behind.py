@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Write-Behind Queue for ThreadGems
+
+Takes slow durable writes (Firestore) off the request path. Callers queue a
+value under a key and return immediately; a background task writes queued
+values in batches:
+- Repeated writes to one key before it is flushed collapse into one write of
+  the newest value
+- A batch is written once `batch_size` keys are queued or the oldest has
+  waited `flush_interval` seconds
+- Failed batches go back on the queue and are retried with backoff
+- At most `max_pending` keys are held; put() waits up to `put_timeout`
+  seconds for room beyond that, then writes its value itself
+- close() writes whatever is still queued
+
+Queued values live only in memory until written, so a crash loses at most
+the last `flush_interval` seconds of writes.
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Coalescing, bounded queue flushed in batches by `write_batch` in a worker thread"""
+
+    def __init__(self, name: str, write_batch: Callable[[Dict[Hashable, Any]], None],
+                 max_pending: int = 10000, batch_size: int = 100, flush_interval: float = 0.5,
+                 max_retry_delay: float = 30.0, put_timeout: float = 1.0):
+        self.name = name
+        self.write_batch = write_batch
+        self.max_pending = max(1, max_pending)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+        self.put_timeout = put_timeout
+
+        # key -> (monotonic time first queued, newest value), oldest first
+        self.pending: OrderedDict = OrderedDict()
+        self.inflight = 0
+        self.retry_delay = 0.0
+        self.closing = False
+        self.task: Optional[asyncio.Task] = None
+        # Created on start() so they bind to the running event loop
+        self.wakeup: Optional[asyncio.Event] = None
+        self.room: Optional[asyncio.Event] = None
+
+        self.queued = 0
+        self.coalesced = 0
+        self.written = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.overflow_writes = 0
+
+    async def start(self):
+        """Start the background flusher"""
+        if self.task is None:
+            self.closing = False
+            self.wakeup = asyncio.Event()
+            self.room = asyncio.Event()
+            self.task = asyncio.create_task(self.run())
+
+    async def close(self, timeout: float = 10.0):
+        """Stop accepting writes and flush everything queued, for at most `timeout` seconds"""
+        if self.task is None:
+            return
+        self.closing = True
+        self.wakeup.set()
+        self.room.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(self.task), timeout)
+        except asyncio.TimeoutError:
+            self.task.cancel()
+            logger.error(f"❌ {self.name} queue closed with {len(self.pending) + self.inflight} writes unflushed")
+        self.task = None
+
+    async def put(self, key: Hashable, value: Any):
+        """Queue `value` to be written under `key`, replacing any value still queued for it.
+
+        When the queue stays full for `put_timeout` seconds, the value is
+        written inline instead, so a stalled writer slows callers down rather
+        than holding them forever. Errors from that write reach the caller.
+        """
+        if self.task is None and not self.closing:
+            await self.start()
+
+        # Only new keys take room; coalescing into a queued key never waits
+        deadline = time.monotonic() + self.put_timeout
+        while key not in self.pending and len(self.pending) >= self.max_pending and not self.closing:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                await self.write_inline(key, value)
+                return
+            self.room.clear()
+            try:
+                await asyncio.wait_for(self.room.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        if self.closing:
+            raise RuntimeError(f"{self.name} queue is closed")
+
+        entry = self.pending.get(key)
+        if entry is not None:
+            self.pending[key] = (entry[0], value)
+            self.coalesced += 1
+        else:
+            self.pending[key] = (time.monotonic(), value)
+        self.queued += 1
+        self.wakeup.set()
+
+    async def write_inline(self, key: Hashable, value: Any):
+        """Write one value straight through, for a put() that found no room in time"""
+        self.overflow_writes += 1
+        logger.warning(f"⚠️ {self.name} queue full for {self.put_timeout}s, writing {key} inline")
+        await asyncio.get_running_loop().run_in_executor(None, self.write_batch, {key: value})
+        self.written += 1
+
+    async def run(self):
+        while self.pending or not self.closing:
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            # Wait for a full batch or for the oldest value to come due, whichever is first
+            oldest = next(iter(self.pending.values()))[0]
+            due = oldest + self.flush_interval - time.monotonic()
+            if len(self.pending) < self.batch_size and due > 0 and not self.closing:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), due)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.flush_batch()
+
+    async def flush_batch(self):
+        """Write the oldest `batch_size` queued values, re-queueing them if the write fails"""
+        batch = OrderedDict((key, self.pending.pop(key)) for key in list(islice(self.pending, self.batch_size)))
+        self.room.set()
+        self.inflight = len(batch)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.write_batch, {key: value for key, (_, value) in batch.items()}
+            )
+        except Exception as e:
+            self.failed_batches += 1
+            # Back at the front in their old order, unless a newer value was queued meanwhile
+            for key, entry in reversed(batch.items()):
+                if key not in self.pending:
+                    self.pending[key] = entry
+                    self.pending.move_to_end(key, last=False)
+            self.retry_delay = min(self.max_retry_delay, max(0.5, self.retry_delay * 2))
+            logger.error(f"❌ {self.name} batch of {len(batch)} failed, retrying in {self.retry_delay:.1f}s: {e}")
+            await asyncio.sleep(self.retry_delay)
+        else:
+            self.written += len(batch)
+            self.batches += 1
+            self.retry_delay = 0.0
+        finally:
+            self.inflight = 0
+
+    def stats(self) -> Dict:
+        oldest = next(iter(self.pending.values()))[0] if self.pending else None
+        return {
+            'depth': len(self.pending),
+            'max_pending': self.max_pending,
+            'inflight': self.inflight,
+            'oldest_age_s': round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            'queued': self.queued,
+            'coalesced': self.coalesced,
+            'written': self.written,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'overflow_writes': self.overflow_writes
+        }